@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Адаптивное сканирование: грубый проход и уточнение вокруг лучших кандидатов
+
+Измерения делает трекер; здесь только выбор точек: кандидаты из профиля
+грубого прохода и поиск максимума суммарного RSSI золотым сечением.
+"""
+
+import math
+from typing import List
+
+INV_PHI = (math.sqrt(5.0) - 1.0) / 2.0
+
+
+class GoldenSectionSearch:
+    """Поиск максимума унимодальной функции на [low, high] золотым сечением
+
+    Функцию вычисляет вызывающий: next_point() - где измерить, report(value) -
+    результат. После первых двух точек - одно новое измерение на итерацию,
+    интервал сужается в 1.618 раза; done, когда он не шире tolerance.
+    """
+
+    def __init__(self, low: float, high: float, tolerance: float):
+        self.low = float(low)
+        self.high = float(high)
+        self.tolerance = tolerance
+        self.a = self.high - INV_PHI * (self.high - self.low)
+        self.b = self.low + INV_PHI * (self.high - self.low)
+        self.fa = None
+        self.fb = None
+
+    @property
+    def done(self) -> bool:
+        return self.high - self.low <= self.tolerance
+
+    def next_point(self) -> float:
+        return self.a if self.fa is None else self.b
+
+    def report(self, value: float):
+        if self.fa is None:
+            self.fa = value
+        else:
+            self.fb = value
+        if self.fa is None or self.fb is None:
+            return
+
+        if self.fa > self.fb:
+            # Максимум левее b
+            self.high = self.b
+            self.b, self.fb = self.a, self.fa
+            self.a = self.high - INV_PHI * (self.high - self.low)
+            self.fa = None
+        else:
+            self.low = self.a
+            self.a, self.fa = self.b, self.fb
+            self.b = self.low + INV_PHI * (self.high - self.low)
+            self.fb = None
+
+
+def find_candidates(profile: List[dict], count: int = 2, min_separation: int = 99,
+                    min_ratio: float = 0.8) -> List[dict]:
+    """Локальные максимумы суммарного RSSI профиля, по убыванию
+
+    Берется не больше count максимумов, не ближе min_separation единиц друг к
+    другу и не слабее min_ratio от сильнейшего.
+    """
+    peaks = []
+    for i, point in enumerate(profile):
+        left = profile[i - 1]['total_rssi'] if i > 0 else float('-inf')
+        right = profile[i + 1]['total_rssi'] if i + 1 < len(profile) else float('-inf')
+        if point['total_rssi'] >= left and point['total_rssi'] >= right:
+            peaks.append(point)
+    peaks.sort(key=lambda point: point['total_rssi'], reverse=True)
+
+    candidates = []
+    for point in peaks:
+        if point['total_rssi'] < min_ratio * peaks[0]['total_rssi']:
+            break
+        if all(abs(point['position'] - c['position']) >= min_separation for c in candidates):
+            candidates.append(point)
+            if len(candidates) == count:
+                break
+    return candidates
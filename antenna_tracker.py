@@ -9,10 +9,11 @@ import threading
 import json
 import sys
 import os
+import bisect
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Dict
 
 from flask import Flask, request, jsonify, render_template, Response, send_from_directory
 from flask_cors import CORS
@@ -20,6 +21,14 @@ import requests
 import base64
 import ADS1x15
 from vtx_service import VtxService
+from loop_scheduler import LoopScheduler, OVERRUN_SKIP
+from tracking_controller import StepController, PIDController, PredictiveController, MonopulseController
+from bearing_estimator import BearingEstimator
+from adaptive_scan import GoldenSectionSearch, find_candidates
+from beam_fit import fit_beam
+from monopulse import MonopulseTable
+from reacquisition import ExpandingSearch
+from profile_store import ProfileStore, is_profile_number
 
 # Добавляем путь к библиотеке SCServo
 sys.path.append("..")
@@ -37,6 +46,10 @@ CAMERA_URL = "rtsp://192.168.1.10:554/stream_1"
 # Порт для веб-сервера
 WEB_PORT = 5000
 
+# Допустимая частота цикла управления, Гц
+CONTROL_RATE_MIN_HZ = 50
+CONTROL_RATE_MAX_HZ = 200
+
 
 # ============= КЛАССЫ ANTENNA TRACKER =============
 
@@ -47,13 +60,28 @@ class Mode(Enum):
     SCAN = "scan"
     CALIBRATE_MIN = "calibrate_min"
     CALIBRATE_MAX = "calibrate_max"
+    REACQUIRE = "reacquire"
+
+
+@dataclass
+class AxisConfig:
+    """Дополнительная ось (наклон, вторая антенная решетка)"""
+    name: str
+    id: int
+    center_pos: int = 2047
+    min_pos: int = 0
+    max_pos: int = 4095
+    # Ось может повторять движение основной оси ('pan'): позиция = center_pos ± смещение основной оси
+    follow: Optional[str] = None
+    follow_sign: int = 1
 
 
 @dataclass
 class ServoConfig:
     """Конфигурация сервопривода"""
     port: str = '/dev/servo'
-    baudrate: int = 115200
+    baudrate: int = 115200  # Скорость, с которой начинается поиск сервопривода
+    target_baudrate: int = 1000000  # Рабочая скорость шины, записывается в EEPROM сервопривода
     id: int = 1
     center_pos: int = 2047
     left_limit: int = 1100
@@ -63,12 +91,25 @@ class ServoConfig:
     step_degrees: int = 1  # Шаг в градусах для ручного режима
     step_units: int = 11  # 3 градуса * 11 единиц
     scan_step_units: int = 33  # Шаг сканирования
+    sweep_speed: int = 800  # Скорость непрерывной развертки: весь диапазон за ~2 с
+    sweep_acc: int = 50
     
     # Параметры движения
     default_speed: int = 500  # Скорость по умолчанию
     default_acc: int = 50  # Ускорение по умолчанию
     auto_speed: int = 500  # Скорость для авторежима (плавнее)
     auto_acc: int = 30  # Ускорение для авторежима
+    
+    # Команды движения без ответа сервопривода (уровень ответа SMS_STS_RESPONSE_READ);
+    # правильность проверяется пакетным чтением целевой позиции раз в no_ack_verify_interval секунд
+    no_ack_motion: bool = True
+    no_ack_verify_interval: float = 1.0
+    
+    # Дополнительные оси: за цикл управления все оси получают одну групповую команду записи
+    # и опрашиваются одним групповым чтением. Например:
+    # axes = [AxisConfig('tilt', id=2, min_pos=1700, max_pos=2400),
+    #         AxisConfig('pan2', id=3, follow='pan', follow_sign=-1)]
+    axes: List[AxisConfig] = field(default_factory=list)
 
 
 @dataclass
@@ -84,7 +125,7 @@ class ADCConfig:
 class AntennaTracker:
     """Основной класс управления антенной"""
     
-    def __init__(self):
+    def __init__(self, control_rate_hz: float = 50):
         # Конфигурация
         self.servo_config = ServoConfig()
         self.adc_config = ADCConfig()
@@ -96,6 +137,8 @@ class AntennaTracker:
         self.current_mode = Mode.MANUAL
         self.position = self.servo_config.center_pos
         self.actual_position = self.servo_config.center_pos
+        self.actual_speed = 0  # Скорость из последнего снимка телеметрии, единиц/с
+        self.actual_position_time = None  # time.monotonic() этого снимка
         self.running = True
 
         # VTX service (lazy init)
@@ -107,33 +150,99 @@ class AntennaTracker:
         self.noise_floor_right = 0  # Уровень шума правого канала
         self.rssi_max_left = 4000  # Максимум левого канала
         self.rssi_max_right = 4000  # Максимум правого канала
+        # (L-R)/(L+R) -> смещение цели от оси; калибруется по каждому скану с подгонкой диаграмм
+        self.monopulse_table = MonopulseTable()
         
         # Буферы для фильтрации
         self.rssi_filter_size = 1
         self.left_rssi_buffer = deque(maxlen=self.rssi_filter_size)
         self.right_rssi_buffer = deque(maxlen=self.rssi_filter_size)
         
-        # Параметры автослежения
-        self.rssi_threshold = 15  # Минимальная разница для движения
-        self.auto_step_small = 11  # Малый шаг (1 градус) для точной подстройки
-        self.auto_step_medium = 22  # Средний шаг (2 градуса)
-        self.auto_step_large = 44  # Большой шаг (4 градуса) для быстрого наведения
-        self.auto_deadband = 500  # Мертвая зона, где движение не требуется
+        # Оценка пеленга и скорости цели фильтром Калмана по разнице RSSI и фактической позиции
+        self.bearing_estimator = BearingEstimator(table=self.monopulse_table)
+        
+        # Регулятор автослежения: 'kalman' (наведение в прогноз пеленга), 'monopulse' (прыжок в
+        # пеленг по таблице моноимпульса), 'pid' или 'step' (прежняя таблица шагов),
+        # см. tracking_controller.py; сравнение - controller_bench.py
+        self.auto_controllers = {
+            'step': StepController(speed=self.servo_config.auto_speed),
+            'pid': PIDController(),
+            'kalman': PredictiveController(self.bearing_estimator),
+            'monopulse': MonopulseController(self.monopulse_table),
+        }
+        self.auto_controller = self.auto_controllers['kalman']
+        
+        # Потеря сигнала в авторежиме: расширяющийся поиск вокруг последнего надежного пеленга
+        self.reacquire_enabled = True
+        self.lost_total = 200  # L+R ниже - сигнала нет (как min_total регуляторов)
+        self.lost_timeout = 1.0  # Столько секунд без сигнала - цель потеряна
+        self.found_total = 400  # L+R выше - сигнал вернулся (с гистерезисом)
+        self.found_ticks = 3  # Тактов подряд с сигналом для возврата в AUTO
+        self.search_step_units = 110  # Расширение поиска за круг (10 градусов)
+        self.search_speed = 1500
+        self.low_signal_since: Optional[float] = None
+        self.last_good_bearing: Optional[Tuple[float, float, float]] = None  # (время, пеленг, скорость)
+        self.reacquire_search: Optional[ExpandingSearch] = None
+        self.reacquire_started = 0.0
+        self.waypoint_deadline = 0.0
+        self.found_count = 0
+        self.reacquire_stats = {
+            'losses': 0,
+            'reacquired': 0,
+            'last_latency_s': None,
+            'max_latency_s': None,
+            'total_latency_s': 0.0,
+        }
         
         # Данные сканирования
         self.scan_data = []
         self.scan_position = self.servo_config.left_limit
+        # 'sweep' - непрерывная развертка с привязкой RSSI к позиции по времени, 'adaptive' - быстрая
+        # грубая развертка и уточнение максимума вокруг кандидатов, 'step' - по шагам
+        self.scan_method = 'adaptive'
+        self.sweep_bin_units = 11  # Ширина ячейки профиля развертки (1 градус)
+        self.sweep_rssi = []  # (time.monotonic(), left, right)
+        self.sweep_positions = []  # (time.monotonic(), позиция)
+        self.sweep_deadline = 0.0
+        self.coarse_sweep_speed = 2400  # Грубый проход адаптивного скана
+        self.coarse_bin_units = 33  # Ячейка профиля грубого прохода (3 градуса)
+        self.scan_tolerance_units = 11  # Точность положения максимума (1 градус)
+        self.scan_samples = 3  # Отсчетов RSSI на точку уточнения
+        self.candidate_separation_units = 330  # Кандидаты ближе ширины диаграммы - один лепесток
+        self.scan_candidates = []
+        self.scan_search: Optional[GoldenSectionSearch] = None
+        # Команда scan только ставит запрос, скан запускает поток цикла управления
+        self.scan_requested = False
+        self.scan_best: Optional[dict] = None
         
-        # Хранилище данных
+        # Хранилище данных: общий снимок статуса, в который пишут все стадии
         self.last_status = {}
+        self.status_lock = threading.Lock()
         self.last_scan_results = {}
         
         # Блокировки
         self.position_lock = threading.Lock()
+        # Последняя отправленная команда (позиция, скорость, ускорение) - под position_lock
+        self.last_move_command = None
+        
+        # Цикл управления: фиксированная частота (50-200 Гц) по дедлайнам, а не sleep после работы
+        self.set_control_rate(control_rate_hz)
+        
+        # Многочастотный конвейер: RSSI и наведение - на частоте цикла управления,
+        # позиция сервопривода и здоровье шины/VTX - в отдельном потоке телеметрии
+        self.position_rate_hz = 10
+        self.health_rate_hz = 1
+        self.telemetry_scheduler = LoopScheduler(self.position_rate_hz, OVERRUN_SKIP)
+        self.telemetry_thread: Optional[threading.Thread] = None
         
-        # Таймер для авторежима
-        self.last_auto_move_time = 0
-        self.auto_move_cooldown = 0.1 # Минимальный интервал между движениями
+        # Профиль на диске: калибровка, лимиты, таблица моноимпульса, последний скан и пеленг
+        self.profile_store = ProfileStore(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tracker_profile.json'))
+        self.profile_max_age = 300.0  # Пеленг не старше - старт сразу в AUTO, без скана
+        self.profile_save_interval = 10.0  # Пеленг в авторежиме сохраняется не чаще
+        self.last_profile_save = 0.0
+        self.saved_bearing: Optional[dict] = None  # {'position', 'time' (time.time())}
+        self.load_profile()
         
         print("=== Antenna Tracker инициализирован ===")
         self._print_servo_info()
@@ -152,7 +261,11 @@ class AntennaTracker:
         try:
             # Инициализация сервопривода
             self.portHandler = PortHandler(self.servo_config.port)
-            self.packetHandler = sms_sts(self.portHandler)
+            # shadow=True: неизменившиеся регистры не перезаписываются и не перечитываются
+            self.packetHandler = sms_sts(self.portHandler, shadow=True)
+            # Счетчики и гистограммы времени всех обменов по шине (для /status)
+            self.bus_transactions = TransactionStats()
+            self.packetHandler.addObserver(self.bus_transactions)
             
             # Открытие порта
             if not self.portHandler.openPort():
@@ -162,7 +275,18 @@ class AntennaTracker:
             if not self.portHandler.setBaudRate(self.servo_config.baudrate):
                 raise Exception(f"Не удалось установить скорость {self.servo_config.baudrate}")
                 
-            print(f"✓ Сервопривод подключен: {self.servo_config.port} @ {self.servo_config.baudrate} bps")
+            # Поиск скорости, на которой отвечает сервопривод, и переход на рабочую
+            baudrate = self.packetHandler.FindBaudRate(self.servo_config.id)
+            if baudrate is None:
+                baudrate = self._discover_servo()
+            if baudrate != self.servo_config.target_baudrate:
+                comm_result, error = self.packetHandler.ChangeBaudRate(
+                    self.servo_config.id, self.servo_config.target_baudrate)
+                if comm_result != COMM_SUCCESS:
+                    print(f"✗ Скорость {self.servo_config.target_baudrate} не установлена: "
+                          f"{self.packetHandler.getTxRxResult(comm_result)}")
+                
+            print(f"✓ Сервопривод подключен: {self.servo_config.port} @ {self.portHandler.getBaudRate()} bps")
             
             # Проверка связи с сервоприводом
             model_number, comm_result, error = self.packetHandler.ping(self.servo_config.id)
@@ -171,6 +295,13 @@ class AntennaTracker:
             else:
                 raise Exception(f"Сервопривод ID:{self.servo_config.id} не отвечает")
             
+            # Замер задержки ответа: таймауты пакетов считаются от измеренного времени, а не от 50 мс
+            self.packetHandler.calibrateLatency([self.servo_config.id])
+            
+            # Одно чтение всей таблицы настроек: дальше режим и момент записываются,
+            # только если они действительно отличаются
+            self.packetHandler.PrefetchShadow(self.servo_config.id)
+            
             # Установка режима позиционирования
             comm_result, error = self.packetHandler.write1ByteTxRx(
                 self.servo_config.id, SMS_STS_MODE, 0)
@@ -183,6 +314,16 @@ class AntennaTracker:
             if comm_result == COMM_SUCCESS:
                 print("✓ Момент включен")
             
+            # Отключение ответов на команды записи
+            if self.servo_config.no_ack_motion:
+                comm_result, error = self.packetHandler.SetResponseLevel(
+                    self.servo_config.id, SMS_STS_RESPONSE_READ)
+                if comm_result == COMM_SUCCESS:
+                    print("✓ Команды движения без подтверждения")
+                else:
+                    print(f"✗ Уровень ответа не установлен: {self.packetHandler.getTxRxResult(comm_result)}")
+            self.last_goal_check = time.time()
+            
             # Чтение текущей позиции
             pos, comm_result, error = self.packetHandler.ReadPos(self.servo_config.id)
             if comm_result == COMM_SUCCESS:
@@ -190,6 +331,20 @@ class AntennaTracker:
                 self.actual_position = pos
                 print(f"✓ Текущая позиция: {pos} ({self.position_to_angle(pos)}°)")
             
+            # Дополнительные оси
+            self.axis_targets = {}
+            self.axis_status = {}
+            for axis in self.servo_config.axes:
+                self._init_axis(axis)
+            
+            # Планировщик шины: все обращения к сервоприводу идут через один поток,
+            # команды движения обслуживаются раньше опроса телеметрии
+            self.bus = BusScheduler(self.packetHandler)
+            self.bus.start()
+            self.servo_motion = self.bus.proxy(BUS_PRIORITY_MOTION)
+            self.servo_command = self.bus.proxy(BUS_PRIORITY_COMMAND)
+            self.servo_telemetry = self.bus.proxy(BUS_PRIORITY_TELEMETRY)
+            
             # Инициализация АЦП
             self.ads = ADS1x15.ADS1115(
                 self.adc_config.bus, 
@@ -205,6 +360,38 @@ class AntennaTracker:
             print(f"✗ ОШИБКА инициализации оборудования: {e}")
             raise
     
+    def _init_axis(self, axis: AxisConfig):
+        """Инициализация сервопривода дополнительной оси"""
+        model_number, comm_result, error = self.packetHandler.ping(axis.id)
+        if comm_result != COMM_SUCCESS:
+            raise Exception(f"Сервопривод оси {axis.name} ID:{axis.id} не отвечает")
+        print(f"✓ Ось {axis.name}: ID:{axis.id}, модель {model_number}")
+        
+        self.packetHandler.PrefetchShadow(axis.id)
+        self.packetHandler.write1ByteTxRx(axis.id, SMS_STS_MODE, 0)
+        self.packetHandler.write1ByteTxRx(axis.id, SMS_STS_TORQUE_ENABLE, 1)
+        if self.servo_config.no_ack_motion:
+            self.packetHandler.SetResponseLevel(axis.id, SMS_STS_RESPONSE_READ)
+        
+        pos, comm_result, error = self.packetHandler.ReadPos(axis.id)
+        self.axis_targets[axis.name] = pos if comm_result == COMM_SUCCESS else axis.center_pos
+    
+    def _discover_servo(self) -> int:
+        """Поиск сервопривода с неизвестным ID (например, после замены) на всех скоростях"""
+        for baudrate in sorted(SMS_STS_BAUD_RATES.values(), reverse=True):
+            if not self.portHandler.setBaudRate(baudrate):
+                continue
+            servos = self.packetHandler.scanBus()
+            if len(servos) == 1:
+                scs_id, (model_number, fw_major, fw_minor) = next(iter(servos.items()))
+                print(f"✓ Найден сервопривод ID:{scs_id} @ {baudrate} bps "
+                      f"(модель {model_number}, прошивка {fw_major}.{fw_minor}) вместо ID:{self.servo_config.id}")
+                self.servo_config.id = scs_id
+                return baudrate
+            if servos:
+                raise Exception(f"Сервопривод ID:{self.servo_config.id} не найден, на шине: {sorted(servos)}")
+        raise Exception(f"Сервопривод ID:{self.servo_config.id} не отвечает ни на одной скорости")
+    
     def _print_servo_info(self):
         """Вывод информации о конфигурации сервопривода"""
         print(f"Позиция: {self.position} (центр: {self.servo_config.center_pos})")
@@ -218,43 +405,123 @@ class AntennaTracker:
         status = {}
         
         try:
-            # Позиция и скорость
-            pos, speed, comm_result, error = self.packetHandler.ReadPosSpeed(self.servo_config.id)
-            if comm_result == COMM_SUCCESS:
-                status['position'] = pos
-                status['angle'] = self.position_to_angle(pos)
-                status['speed'] = speed
-                self.actual_position = pos
-            
-            # Напряжение
-            voltage, comm_result, error = self.packetHandler.read1ByteTxRx(
-                self.servo_config.id, SMS_STS_PRESENT_VOLTAGE)
-            if comm_result == COMM_SUCCESS:
-                status['voltage'] = voltage / 10.0
-            
-            # Температура
-            temp, comm_result, error = self.packetHandler.read1ByteTxRx(
-                self.servo_config.id, SMS_STS_PRESENT_TEMPERATURE)
-            if comm_result == COMM_SUCCESS:
-                status['temperature'] = temp
-            
-            # Ток
-            current, comm_result, error = self.packetHandler.read2ByteTxRx(
-                self.servo_config.id, SMS_STS_PRESENT_CURRENT_L)
-            if comm_result == COMM_SUCCESS:
-                current = self.packetHandler.scs_tohost(current, 15)
-                status['current'] = current
+            # Позиция, скорость, напряжение, температура, движение и ток - одним запросом
+            if self.servo_config.axes:
+                # Все оси - одним групповым чтением
+                snapshots, results = self.servo_telemetry.SyncReadSnapshots(self._servo_ids())
+                if self.servo_config.id in snapshots:
+                    status = self._snapshot_to_status(snapshots[self.servo_config.id])
+                self._update_axis_status(snapshots)
+            else:
+                snapshot, comm_result, error = self.servo_telemetry.ReadSnapshot(self.servo_config.id)
+                if comm_result == COMM_SUCCESS:
+                    status = self._snapshot_to_status(snapshot)
             
-            # Статус движения
-            moving, comm_result, error = self.packetHandler.ReadMoving(self.servo_config.id)
-            if comm_result == COMM_SUCCESS:
-                status['moving'] = bool(moving)
+            self._verify_goal()
             
         except Exception as e:
             print(f"Ошибка чтения статуса сервопривода: {e}")
         
         return status
     
+    def _verify_goal(self):
+        """Периодическая проверка команд движения, отправленных без подтверждения"""
+        now = time.time()
+        if now - self.last_goal_check < self.servo_config.no_ack_verify_interval:
+            return
+        self.last_goal_check = now
+        
+        results = self.servo_telemetry.VerifyGoals(self._servo_ids())
+        if COMM_RX_CORRUPT not in results.values():
+            return
+        # Команда потерялась - повторяем последнюю команду целиком, с ее скоростью и ускорением;
+        # под блокировкой, чтобы не обогнать новую команду из цикла управления
+        with self.position_lock:
+            if self.last_move_command is None:
+                return
+            position, speed, acc = self.last_move_command
+            print(f"Целевая позиция не совпала, повтор: {position}")
+            if self.servo_config.axes:
+                self._move_axes(position, speed, acc)
+            else:
+                self.servo_motion.WritePosEx(self.servo_config.id, position, speed, acc)
+    
+    def _servo_ids(self) -> List[int]:
+        """ID всех сервоприводов: основная ось и дополнительные"""
+        return [self.servo_config.id] + [axis.id for axis in self.servo_config.axes]
+    
+    def _update_axis_status(self, snapshots: dict):
+        """Статус дополнительных осей из снимков группового чтения"""
+        for axis in self.servo_config.axes:
+            snapshot = snapshots.get(axis.id)
+            if snapshot is not None:
+                self.axis_status[axis.name] = {
+                    'id': axis.id,
+                    'position': snapshot.position,
+                    'target': self.axis_targets[axis.name],
+                    'load': snapshot.load,
+                    'temperature': snapshot.temperature,
+                    'moving': bool(snapshot.moving),
+                }
+    
+    def _move_axes(self, pan_position: int, speed: int, acc: int) -> int:
+        """Одна групповая запись для всех осей"""
+        positions = {self.servo_config.id: (pan_position, speed, acc)}
+        for axis in self.servo_config.axes:
+            if axis.follow == 'pan':
+                target = axis.center_pos + axis.follow_sign * (pan_position - self.servo_config.center_pos)
+            else:
+                target = self.axis_targets[axis.name]
+            target = max(axis.min_pos, min(axis.max_pos, target))
+            self.axis_targets[axis.name] = target
+            positions[axis.id] = (target, speed, acc)
+        
+        return self.servo_motion.SyncWritePositions(positions)
+    
+    def move_axis(self, name: str, position: int) -> bool:
+        """Перемещает дополнительную ось (вместе с остальными - одной групповой командой)"""
+        axis = next((a for a in self.servo_config.axes if a.name == name), None)
+        if axis is None or axis.follow is not None:
+            print(f"Нет независимой оси {name}")
+            return False
+        
+        with self.position_lock:
+            self.axis_targets[name] = max(axis.min_pos, min(axis.max_pos, position))
+            command = (self.position, self.servo_config.default_speed, self.servo_config.default_acc)
+            comm_result = self._move_axes(*command)
+            if comm_result == COMM_SUCCESS:
+                self.last_move_command = command
+        return comm_result == COMM_SUCCESS
+    
+    def _snapshot_to_status(self, snapshot) -> dict:
+        """Преобразует ServoSnapshot в словарь статуса"""
+        self._record_actual_position(snapshot)
+        return {
+            'position': snapshot.position,
+            'angle': self.position_to_angle(snapshot.position),
+            'speed': snapshot.speed,
+            'load': snapshot.load,
+            'voltage': snapshot.voltage / 10.0,
+            'temperature': snapshot.temperature,
+            'current': snapshot.current,
+            'moving': bool(snapshot.moving),
+        }
+    
+    def _record_actual_position(self, snapshot):
+        """Запоминает фактическую позицию и скорость из снимка телеметрии"""
+        self.actual_position = snapshot.position
+        self.actual_speed = snapshot.speed
+        self.actual_position_time = time.monotonic()
+    
+    def _servo_position_at(self, now: float) -> float:
+        """Фактическая позиция на момент now: последний снимок, продолженный с его скоростью,
+        но не дальше заданной позиции"""
+        if self.actual_position_time is None:
+            return float(self.position)
+        position = self.actual_position + self.actual_speed * min(now - self.actual_position_time, 0.5)
+        low, high = sorted((self.actual_position, self.position))
+        return max(low, min(high, position))
+    
     def read_rssi(self) -> Tuple[float, float]:
         """Читает RSSI с обеих антенн"""
         try:
@@ -299,11 +566,15 @@ class AntennaTracker:
                 return True
                 
             try:
-                comm_result, error = self.packetHandler.WritePosEx(
-                    self.servo_config.id, new_position, speed, acc)
+                if self.servo_config.axes:
+                    comm_result = self._move_axes(new_position, speed, acc)
+                else:
+                    comm_result, error = self.servo_motion.WritePosEx(
+                        self.servo_config.id, new_position, speed, acc)
                 
                 if comm_result == COMM_SUCCESS:
                     self.position = new_position
+                    self.last_move_command = (new_position, speed, acc)
                     angle = self.position_to_angle(new_position)
                     # print(f"→ Позиция: {new_position} ({angle:.1f}°)")
                     return True
@@ -340,36 +611,87 @@ class AntennaTracker:
         return position
     
     def update_status(self, left_rssi: float, right_rssi: float):
-        """Обновляет текущий статус"""
-        # Читаем актуальную позицию из сервопривода
-        servo_status = self.read_servo_status()
+        """Быстрая стадия: публикует RSSI и режим
         
-        self.last_status = {
+        Шину не использует: позицию и здоровье сервопривода публикует поток телеметрии.
+        """
+        fields = {
             "rssi_a": round(left_rssi, 0),
             "rssi_b": round(right_rssi, 0),
-            "angle": servo_status.get('position', self.position),
-            "angle_degrees": servo_status.get('angle', self.position_to_angle(self.position)),
             "mode": self.current_mode.value,
             "auto_mode": self.current_mode == Mode.AUTO,
             "scan_in_progress": self.current_mode == Mode.SCAN,
-            "servo_voltage": servo_status.get('voltage', 0),
-            "servo_temperature": servo_status.get('temperature', 0),
-            "servo_moving": servo_status.get('moving', False),
             "timestamp": time.time()
         }
+        self._publish(fields)
+    
+    def update_servo_telemetry(self):
+        """Средняя стадия: позиция, напряжение, температура и движение сервопривода"""
+        self._publish(self._servo_status_fields(self.read_servo_status()))
+    
+    def update_health_telemetry(self):
+        """Медленная стадия: статистика шины, VTX и VTX-сканирование"""
+        fields = {
+            "bus": self.bus.getStats(),
+            "bus_shadow": self.packetHandler.getShadowStats(),
+            "bus_no_ack": self.packetHandler.getNoAckStats(),
+            "bus_latency": self.portHandler.getLatencyStats(),
+            "bus_transactions": self.bus_transactions.getStats(),
+        }
 
-        # Добавляем VTX статус
+        self._save_bearing_if_due()
+        
         # Добавляем VTX статус (даже если еще не инициализирован)
         try:
-            self.last_status["vtx"] = self.vtx_service.get_status()
+            fields["vtx"] = self.vtx_service.get_status()
         except Exception as _:
             pass
 
         # Добавляем статус VTX-сканирования
         try:
-            self.last_status["vtx_scan"] = self.get_vtx_scan_status()
+            fields["vtx_scan"] = self.get_vtx_scan_status()
         except Exception:
             pass
+        
+        self._publish(fields)
+    
+    def _servo_status_fields(self, servo_status: dict) -> dict:
+        """Поля статуса сервопривода; если чтение не удалось - последняя заданная позиция"""
+        return {
+            "angle": servo_status.get('position', self.position),
+            "angle_degrees": servo_status.get('angle', self.position_to_angle(self.position)),
+            "servo_voltage": servo_status.get('voltage', 0),
+            "servo_temperature": servo_status.get('temperature', 0),
+            "servo_moving": servo_status.get('moving', False),
+            "axes": dict(self.axis_status),
+        }
+    
+    def _publish(self, fields: dict):
+        """Записывает поля стадии в общий снимок статуса"""
+        with self.status_lock:
+            self.last_status.update(fields)
+    
+    def start_telemetry(self):
+        """Запускает поток средней и медленной стадий телеметрии"""
+        if self.telemetry_thread is not None and self.telemetry_thread.is_alive():
+            return
+        self.telemetry_thread = threading.Thread(target=self._telemetry_loop, name='telemetry', daemon=True)
+        self.telemetry_thread.start()
+    
+    def _telemetry_loop(self):
+        """Позиция сервопривода - каждый такт, здоровье - каждый health_every такт"""
+        health_every = max(1, round(self.position_rate_hz / self.health_rate_hz))
+        tick = 0
+        self.telemetry_scheduler.start()
+        while self.running:
+            try:
+                self.update_servo_telemetry()
+                if tick % health_every == 0:
+                    self.update_health_telemetry()
+            except Exception as e:
+                print(f"Ошибка телеметрии: {e}")
+            tick += 1
+            self.telemetry_scheduler.wait()
     
     def process_command(self, command: str, params: dict = None) -> bool:
         """Обрабатывает команду"""
@@ -399,46 +721,78 @@ class AntennaTracker:
                     return self.move_to_angle(angle)
                 return False
                 
+            elif command == "set_axis":
+                # Позиция дополнительной оси: {"axis": "tilt", "position": 2047}
+                if params and 'axis' in params and 'position' in params:
+                    return self.move_axis(params['axis'], int(params['position']))
+                return False
+                
             elif command == "set_center":
                 # Установка текущей позиции как центр
-                pos, comm_result, error = self.packetHandler.ReadPos(self.servo_config.id)
+                pos, comm_result, error = self.servo_command.ReadPos(self.servo_config.id)
                 if comm_result == COMM_SUCCESS:
                     self.servo_config.center_pos = pos
                     print(f"Центр установлен: {pos} ({self.position_to_angle(pos)}°)")
+                    self.save_profile()
                     return True
                 return False
                 
             elif command == "set_left_limit":
                 # Установка текущей позиции как левый лимит
-                pos, comm_result, error = self.packetHandler.ReadPos(self.servo_config.id)
+                pos, comm_result, error = self.servo_command.ReadPos(self.servo_config.id)
                 if comm_result == COMM_SUCCESS:
                     self.servo_config.left_limit = pos
                     print(f"Левый лимит установлен: {pos} ({self.position_to_angle(pos)}°)")
+                    self.save_profile()
                     return True
                 return False
                 
             elif command == "set_right_limit":
                 # Установка текущей позиции как правый лимит
-                pos, comm_result, error = self.packetHandler.ReadPos(self.servo_config.id)
+                pos, comm_result, error = self.servo_command.ReadPos(self.servo_config.id)
                 if comm_result == COMM_SUCCESS:
                     self.servo_config.right_limit = pos
                     print(f"Правый лимит установлен: {pos} ({self.position_to_angle(pos)}°)")
+                    self.save_profile()
                     return True
                 return False
                 
             elif command == "auto":
+                self.bearing_estimator.reset()
+                self.auto_controller.reset()
+                self.low_signal_since = None
                 self.current_mode = Mode.AUTO
                 print("Режим: автоматическое слежение")
                 return True
                 
+            elif command == "set_controller":
+                # Выбор регулятора автослежения: {"name": "pid"} или {"name": "step"}
+                if params and params.get('name') in self.auto_controllers:
+                    self.auto_controller = self.auto_controllers[params['name']]
+                    self.bearing_estimator.reset()
+                    self.auto_controller.reset()
+                    print(f"Регулятор автослежения: {params['name']}")
+                    return True
+                return False
+                
+            elif command == "set_control_rate":
+                # Частота цикла управления: {"rate_hz": 100}
+                if params and 'rate_hz' in params:
+                    self.set_control_rate(float(params['rate_hz']))
+                    return True
+                return False
+                
             elif command == "manual":
                 self.current_mode = Mode.MANUAL
                 print("Режим: ручное управление")
                 return True
                 
             elif command == "scan":
+                # Необязательный метод: {"method": "adaptive"}, {"method": "sweep"} или {"method": "step"}
                 if self.current_mode != Mode.SCAN:
-                    self.start_scan()
+                    if params and params.get('method') in ('adaptive', 'sweep', 'step'):
+                        self.scan_method = params['method']
+                    self.scan_requested = True
                 return True
                 
             elif command == "calibrate":
@@ -459,22 +813,66 @@ class AntennaTracker:
             print(f"Ошибка выполнения команды: {e}")
             return False
 
+    def set_control_rate(self, rate_hz: float):
+        """Задает частоту цикла управления; вне CONTROL_RATE_MIN_HZ-CONTROL_RATE_MAX_HZ - ValueError
+        
+        Планировщик заменяется целиком: цикл подхватывает его на следующем такте,
+        сетка дедлайнов и статистика начинаются заново.
+        """
+        if not CONTROL_RATE_MIN_HZ <= rate_hz <= CONTROL_RATE_MAX_HZ:
+            raise ValueError(f"Частота цикла {rate_hz} Гц вне диапазона "
+                             f"{CONTROL_RATE_MIN_HZ}-{CONTROL_RATE_MAX_HZ} Гц")
+        self.control_rate_hz = rate_hz
+        self.loop_scheduler = LoopScheduler(rate_hz, OVERRUN_SKIP)
+        print(f"Частота цикла управления: {rate_hz} Гц")
+    
     def _get_frequency_mhz(self, band: str, channel: int) -> int:
         # Keep for compatibility where used elsewhere if any
         return self.vtx_service._get_frequency_mhz(band, channel)
     
     def start_scan(self):
-        """Начинает сканирование"""
+        """Начинает сканирование (только из потока цикла управления)
+        
+        Состояние скана сбрасывается и развертка запускается до переключения
+        режима: process_scan никогда не видит состояние прошлого скана.
+        """
         print("\n=== НАЧАЛО СКАНИРОВАНИЯ ===")
-        self.current_mode = Mode.SCAN
+        self.scan_search = None
+        self.scan_candidates = []
         self.scan_data = []
+        self.sweep_rssi = []
+        self.sweep_positions = []
+        self.sweep_deadline = 0.0
         self.last_scan_results = {}
         self.scan_position = self.servo_config.left_limit
         self.move_servo(self.scan_position, speed=1000, acc=50)
-        time.sleep(0.5)
+        if self.scan_method == 'sweep':
+            self._start_sweep(self.servo_config.sweep_speed)
+        elif self.scan_method == 'adaptive':
+            self._start_sweep(self.coarse_sweep_speed)
+        else:
+            time.sleep(0.5)
+        self.current_mode = Mode.SCAN
+    
+    def _start_sweep(self, speed: int):
+        """Запускает непрерывную развертку от левого лимита к правому одной командой"""
+        self.wait_for_movement(timeout=3.0)
+        self.sweep_rssi = []
+        self.sweep_positions = []
+        
+        span = self.servo_config.right_limit - self.servo_config.left_limit
+        self.sweep_deadline = time.monotonic() + 2.0 * span / speed + 1.0
+        self.move_servo(self.servo_config.right_limit, speed=speed, acc=self.servo_config.sweep_acc)
     
     def process_scan(self):
         """Выполняет один шаг сканирования"""
+        if self.scan_search is not None:
+            self._process_refine()
+            return
+        if self.scan_method in ('sweep', 'adaptive'):
+            self._process_sweep()
+            return
+        
         # Проверяем, не вышли ли за пределы
         if self.scan_position > self.servo_config.right_limit:
             self.finish_scan()
@@ -497,14 +895,7 @@ class AntennaTracker:
         
         # Сохраняем данные
         angle = self.position_to_angle(self.scan_position)
-        self.scan_data.append({
-            'position': self.scan_position,
-            'angle': angle,
-            'left_rssi': avg_left,
-            'right_rssi': avg_right,
-            'total_rssi': total_rssi,
-            'difference': abs(avg_left - avg_right)
-        })
+        self.scan_data.append(self._scan_entry(self.scan_position, avg_left, avg_right))
         
         print(f"Скан {angle:5.1f}°: L={avg_left:4.0f} R={avg_right:4.0f} Σ={total_rssi:4.0f}")
         
@@ -515,8 +906,123 @@ class AntennaTracker:
         self.scan_position += self.servo_config.scan_step_units
         self.move_servo(self.scan_position, speed=1000, acc=50)
     
-    def finish_scan(self):
-        """Завершает сканирование и анализирует результаты"""
+    def _process_sweep(self):
+        """Один отсчет развертки: RSSI и позиция, каждый со своей меткой времени"""
+        t0 = time.monotonic()
+        left, right = self.read_rssi()
+        t1 = time.monotonic()
+        self.sweep_rssi.append(((t0 + t1) / 2, left, right))
+        
+        pos, comm_result, error = self.servo_command.ReadPos(self.servo_config.id)
+        t2 = time.monotonic()
+        if comm_result == COMM_SUCCESS:
+            self.sweep_positions.append(((t1 + t2) / 2, pos))
+        
+        self.update_status(left, right)
+        
+        arrived = comm_result == COMM_SUCCESS and abs(pos - self.servo_config.right_limit) <= 2
+        if arrived or t2 > self.sweep_deadline:
+            duration = t2 - self.sweep_rssi[0][0]
+            adaptive = self.scan_method == 'adaptive'
+            self.scan_data = self._sweep_profile(self.coarse_bin_units if adaptive else self.sweep_bin_units)
+            print(f"Развертка: {len(self.sweep_rssi)} отсчетов RSSI, {len(self.sweep_positions)} позиций "
+                  f"за {duration:.1f} с, {len(self.scan_data)} ячеек")
+            if adaptive and not self._scan_resolved():
+                self._start_refine()
+            else:
+                self.finish_scan()
+    
+    def _scan_resolved(self) -> bool:
+        """Подгонка по грубому проходу уже дает пеленг с точностью scan_tolerance_units"""
+        fit = self._fit_scan()
+        if fit is None:
+            return False
+        units_per_degree = (self.servo_config.right_limit - self.servo_config.left_limit) / 146.0
+        return 1.96 * fit['sigma_deg'] * units_per_degree <= self.scan_tolerance_units
+    
+    def _start_refine(self):
+        """Кандидаты - максимумы суммарного RSSI грубого профиля; каждый уточняется отдельно"""
+        self.scan_candidates = find_candidates(self.scan_data, min_separation=self.candidate_separation_units)
+        self.scan_best = None
+        print("Кандидаты: " + ", ".join(f"{c['angle']}°" for c in self.scan_candidates))
+        self._next_candidate()
+    
+    def _next_candidate(self):
+        """Поиск золотым сечением в окрестности следующего кандидата или завершение скана"""
+        if not self.scan_candidates:
+            self.scan_search = None
+            self.scan_data.sort(key=lambda d: d['position'])
+            self.finish_scan(self.scan_best)
+            return
+        
+        center = self.scan_candidates.pop(0)['position']
+        half = 1.5 * self.coarse_bin_units
+        self.scan_search = GoldenSectionSearch(max(self.servo_config.left_limit, center - half),
+                                               min(self.servo_config.right_limit, center + half),
+                                               self.scan_tolerance_units)
+    
+    def _process_refine(self):
+        """Одна точка уточнения: движение, успокоение, усреднение RSSI"""
+        position = int(round(self.scan_search.next_point()))
+        self.move_servo(position, speed=1500, acc=50)
+        self.wait_for_movement(timeout=0.5)
+        
+        readings = [self.read_rssi() for _ in range(self.scan_samples)]
+        avg_left = sum(r[0] for r in readings) / len(readings)
+        avg_right = sum(r[1] for r in readings) / len(readings)
+        self.update_status(avg_left, avg_right)
+        
+        entry = self._scan_entry(position, avg_left, avg_right)
+        self.scan_data.append(entry)
+        if self.scan_best is None or entry['total_rssi'] > self.scan_best['total_rssi']:
+            self.scan_best = entry
+        
+        self.scan_search.report(entry['total_rssi'])
+        if self.scan_search.done:
+            self._next_candidate()
+    
+    def _scan_entry(self, position: int, left_rssi: float, right_rssi: float) -> dict:
+        """Точка профиля сканирования"""
+        return {
+            'position': position,
+            'angle': self.position_to_angle(position),
+            'left_rssi': left_rssi,
+            'right_rssi': right_rssi,
+            'total_rssi': left_rssi + right_rssi,
+            'difference': abs(left_rssi - right_rssi)
+        }
+    
+    def _sweep_profile(self, bin_units: int) -> List[dict]:
+        """Профиль развертки: позиция каждого отсчета RSSI - линейная интерполяция
+        между соседними по времени чтениями позиции, усреднение по ячейкам bin_units"""
+        times = [t for t, _ in self.sweep_positions]
+        left_limit = self.servo_config.left_limit
+        bins = {}
+        for t, left, right in self.sweep_rssi:
+            i = bisect.bisect_left(times, t)
+            if i == 0 or i == len(times):
+                continue  # Вне интервала, где позиция известна
+            (ta, pa), (tb, pb) = self.sweep_positions[i - 1], self.sweep_positions[i]
+            position = pa + (pb - pa) * (t - ta) / (tb - ta) if tb > ta else pb
+            cell = bins.setdefault(int(round((position - left_limit) / bin_units)), [0.0, 0.0, 0])
+            cell[0] += left
+            cell[1] += right
+            cell[2] += 1
+        
+        profile = []
+        for index in sorted(bins):
+            left_sum, right_sum, count = bins[index]
+            position = int(round(left_limit + index * bin_units))
+            profile.append(self._scan_entry(position, left_sum / count, right_sum / count))
+        return profile
+    
+    def finish_scan(self, best_data: Optional[dict] = None):
+        """Завершает сканирование и анализирует результаты
+        
+        best_data - точка, уже выбранная стратегией сканирования; иначе берется
+        точка с минимальной разницей RSSI. Если модель диаграмм подгоняется к
+        главному лепестку (beam_fit), пеленг берется из подгонки.
+        """
         print("\n=== АНАЛИЗ РЕЗУЛЬТАТОВ ===")
         
         if len(self.scan_data) < 3:
@@ -525,7 +1031,8 @@ class AntennaTracker:
             return
         
         # Находим позицию с минимальной разницей RSSI
-        best_data = min(self.scan_data, key=lambda x: x['difference'])
+        if best_data is None:
+            best_data = min(self.scan_data, key=lambda x: x['difference'])
         best_position = best_data['position']
         best_angle = best_data['angle']
         min_difference = best_data['difference']
@@ -533,6 +1040,16 @@ class AntennaTracker:
         print(f"Лучшая позиция: {best_position} ({best_angle}°)")
         print(f"Минимальная разница: {min_difference:.0f}")
         
+        fit = self._fit_scan()
+        if fit is not None:
+            best_angle = fit['angle']
+            best_position = self.angle_to_position(best_angle)
+            print(f"Подгонка диаграмм: {best_angle}° (95%: {fit['ci95'][0]}-{fit['ci95'][1]}°), "
+                  f"{fit['points']} точек лепестка")
+            # Пеленг известен точнее шага скана - калибруем по нему таблицу моноимпульса
+            if self.monopulse_table.build(self.scan_data, fit['position'], time.time(), fit['lobe']):
+                print(f"Таблица моноимпульса: {len(self.monopulse_table.offsets)} точек")
+        
         # Сохраняем результаты
         self.last_scan_results = {
             'scan_complete': True,
@@ -540,6 +1057,8 @@ class AntennaTracker:
             'best_position': best_position,
             'best_angle': best_angle,
             'min_difference': min_difference,
+            'fit': fit,
+            'monopulse': self.monopulse_table.to_dict(),
             'scan_data': [
                 {
                     'angle': d['angle'],
@@ -552,73 +1071,156 @@ class AntennaTracker:
             ]
         }
         
+        self.saved_bearing = {'position': best_position, 'time': time.time()}
+        self.save_profile()
+        
         # Перемещаемся в лучшую позицию
         print("Перемещение в оптимальную позицию...")
         self.move_servo(best_position, speed=1500, acc=50)
         self.wait_for_movement()
         
         # Переходим в автоматический режим
+        self.low_signal_since = None
         self.current_mode = Mode.AUTO
         print("Переход в автоматический режим")
     
-    def process_auto_tracking(self):
-        """Автоматическое слежение с плавным движением"""
-        # Проверяем время с последнего движения
-        current_time = time.time()
-        if current_time - self.last_auto_move_time < self.auto_move_cooldown:
-            # Слишком рано для следующего движения
-            left_rssi, right_rssi = self.read_rssi()
-            self.update_status(left_rssi, right_rssi)
-            return
+    def _fit_scan(self) -> Optional[dict]:
+        """Подгонка модели диаграмм к данным скана, результат в градусах"""
+        try:
+            fit = fit_beam(self.scan_data)
+        except (ValueError, ArithmeticError) as e:
+            print(f"Ошибка подгонки диаграмм: {e}")
+            return None
+        if fit is None:
+            return None
         
+        degrees_per_unit = 146.0 / (self.servo_config.right_limit - self.servo_config.left_limit)
+        result = {
+            'position': round(fit['position'], 1),
+            'lobe': fit['lobe'],
+            'angle': self.position_to_angle(fit['position']),
+            'sigma_deg': round(fit['sigma'] * degrees_per_unit, 2),
+            'ci95': [self.position_to_angle(fit['ci95'][0]), self.position_to_angle(fit['ci95'][1])],
+            'points': fit['points'],
+        }
+        for name in ('peak', 'crossing'):
+            if name in fit:
+                result[name] = {
+                    'angle': self.position_to_angle(fit[name]['position']),
+                    'sigma_deg': round(fit[name]['sigma'] * degrees_per_unit, 2),
+                    'r2': round(fit[name]['r2'], 3),
+                }
+        return result
+    
+    def process_auto_tracking(self):
+        """Автоматическое слежение: шаг регулятора self.auto_controller"""
         # Читаем RSSI
         left_rssi, right_rssi = self.read_rssi()
-        self.update_status(left_rssi, right_rssi)
-        
-        # Вычисляем разницу
-        difference = left_rssi - right_rssi
-        abs_difference = abs(difference)
-        
-        # Если разница в пределах мертвой зоны - не двигаемся
-        if abs_difference < self.auto_deadband:
-            return
         
-        # Определяем размер шага в зависимости от разницы RSSI
-        if abs_difference < self.rssi_threshold:
-            # Малая разница - не двигаемся
+        now = time.monotonic()
+        self.bearing_estimator.update(left_rssi, right_rssi, self._servo_position_at(now), now)
+        if self._signal_lost(left_rssi + right_rssi, now):
+            self.start_reacquire(now)
+            self.update_status(left_rssi, right_rssi)
             return
-        elif abs_difference < self.rssi_threshold * 2:
-            # Средняя разница - малый шаг
-            step = self.auto_step_small
-            speed = self.servo_config.auto_speed
-        elif abs_difference < self.rssi_threshold * 4:
-            # Большая разница - средний шаг
-            step = self.auto_step_medium
-            speed = self.servo_config.auto_speed + 200
+        command = self.auto_controller.update(left_rssi, right_rssi, self.position, now)
+        if command is not None:
+            new_position, speed = command
+            # По шине уходит только команда движения, позицию читает поток телеметрии
+            if self.move_servo(new_position, speed=speed, acc=self.servo_config.auto_acc):
+                self.auto_controller.confirm(now)
+        self.update_status(left_rssi, right_rssi)
+    
+    def _signal_lost(self, total_rssi: float, now: float) -> bool:
+        """Запоминает последний надежный пеленг; True - сигнала нет дольше lost_timeout"""
+        if total_rssi >= self.lost_total:
+            self.low_signal_since = None
+            if self.bearing_estimator.initialized:
+                bearing, rate = self.bearing_estimator.predict(now)
+            else:
+                bearing, rate = float(self.position), 0.0
+            self.last_good_bearing = (now, bearing, rate)
+            return False
+        if self.low_signal_since is None:
+            self.low_signal_since = now
+        return self.reacquire_enabled and now - self.low_signal_since >= self.lost_timeout
+    
+    def start_reacquire(self, now: float):
+        """Поиск цели вокруг последнего надежного пеленга с учетом ее скорости"""
+        if self.last_good_bearing is not None:
+            seen, bearing, rate = self.last_good_bearing
         else:
-            # Очень большая разница - большой шаг
-            step = self.auto_step_large
-            speed = self.servo_config.auto_speed + 400
-        
-        # Определяем направление
-        if difference > 0:
-            # Левая сильнее - поворачиваем влево
-            new_position = self.position - step
+            seen, bearing, rate = now, float(self.position), 0.0
+        self.reacquire_search = ExpandingSearch(bearing, rate, self.servo_config.left_limit,
+                                                self.servo_config.right_limit,
+                                                step=self.search_step_units, lead=now - seen)
+        self.reacquire_started = now
+        self.waypoint_deadline = 0.0
+        self.found_count = 0
+        self.reacquire_stats['losses'] += 1
+        self.current_mode = Mode.REACQUIRE
+        print(f"Сигнал потерян: поиск от {self.position_to_angle(self.reacquire_search.center)}°")
+    
+    def process_reacquire(self):
+        """Один такт поиска: RSSI на ходу, следующая точка поворота по прибытии"""
+        left_rssi, right_rssi = self.read_rssi()
+        now = time.monotonic()
+        
+        if left_rssi + right_rssi >= self.found_total:
+            self.found_count += 1
+            if self.found_count >= self.found_ticks:
+                self._finish_reacquire(now)
+                self.update_status(left_rssi, right_rssi)
+                return
         else:
-            # Правая сильнее - поворачиваем вправо
-            new_position = self.position + step
+            self.found_count = 0
+        
+        if now >= self.waypoint_deadline:
+            point = self.reacquire_search.next_point()
+            if point is None:
+                print("Поиск: диапазон пройден, повтор")
+                point = self.reacquire_search.next_point()
+            point = int(round(point))
+            # Время переезда плюс разгон и торможение
+            self.waypoint_deadline = now + abs(point - self.position) / self.search_speed + 0.3
+            self.move_servo(point, speed=self.search_speed, acc=50)
+        self.update_status(left_rssi, right_rssi)
+    
+    def _finish_reacquire(self, now: float):
+        """Сигнал вернулся: остановка на месте и возврат в AUTO, учет задержки"""
+        lost_at = self.low_signal_since if self.low_signal_since is not None else self.reacquire_started
+        latency = now - lost_at
+        stats = self.reacquire_stats
+        stats['reacquired'] += 1
+        stats['last_latency_s'] = round(latency, 2)
+        stats['max_latency_s'] = round(max(latency, stats['max_latency_s'] or 0.0), 2)
+        stats['total_latency_s'] += latency
         
-        # Двигаемся плавно
-        if self.move_servo(new_position, speed=speed, acc=self.servo_config.auto_acc):
-            self.last_auto_move_time = current_time
+        self.move_servo(int(round(self._servo_position_at(now))), speed=self.search_speed, acc=50)
+        self.bearing_estimator.reset()
+        self.auto_controller.reset()
+        self.reacquire_search = None
+        self.low_signal_since = None
+        self.current_mode = Mode.AUTO
+        print(f"Сигнал найден за {latency:.1f} с (поиск {now - self.reacquire_started:.1f} с)")
     
     def wait_for_movement(self, timeout: float = 2.0):
         """Ожидание завершения движения с таймаутом"""
         start_time = time.time()
         while time.time() - start_time < timeout:
-            moving, comm_result, error = self.packetHandler.ReadMoving(self.servo_config.id)
-            if comm_result == COMM_SUCCESS and moving == 0:
-                break
+            if self.servo_config.axes:
+                snapshots, results = self.servo_command.SyncReadSnapshots(self._servo_ids())
+                self._update_axis_status(snapshots)
+                if self.servo_config.id in snapshots:
+                    self._record_actual_position(snapshots[self.servo_config.id])
+                if len(snapshots) == len(results) and not any(s.moving for s in snapshots.values()):
+                    break
+            else:
+                snapshot, comm_result, error = self.servo_command.ReadSnapshot(self.servo_config.id)
+                if comm_result == COMM_SUCCESS:
+                    self._record_actual_position(snapshot)
+                    if snapshot.moving == 0:
+                        break
             time.sleep(0.01)
     
     def calibrate_minimum(self):
@@ -667,6 +1269,7 @@ class AntennaTracker:
         print(f"  Смещение каналов:   {self.rssi_offset:.0f}")
         
         self.current_mode = Mode.MANUAL
+        self.save_profile()
         print("Калибровка минимума завершена")
     
     def calibrate_maximum(self):
@@ -720,23 +1323,36 @@ class AntennaTracker:
         print(f"    Правый: {range_right:.0f}")
         
         self.current_mode = Mode.MANUAL
+        self.save_profile()
         print("Калибровка максимума завершена")
     
     def run(self):
         """Основной цикл"""
         print("\n=== ЗАПУСК СЕРВИСА ===")
+        self.start_telemetry()
         
-        # Начальная позиция
-        self.move_servo(self.servo_config.center_pos, speed=1500, acc=50)
-        self.wait_for_movement()
-        
-        # Автоматический запуск сканирования
-        print("Автозапуск сканирования...")
-        self.start_scan()
+        if not self.warm_start():
+            # Начальная позиция
+            self.move_servo(self.servo_config.center_pos, speed=1500, acc=50)
+            self.wait_for_movement()
+            
+            # Автоматический запуск сканирования
+            print("Автозапуск сканирования...")
+            self.start_scan()
         
         try:
+            self.loop_scheduler.start()
             while self.running:
                 try:
+                    if self.scan_requested:
+                        self.scan_requested = False
+                        self.start_scan()
+                        self.loop_scheduler.resync()
+                        continue
+                    
+                    # Сканирование и калибровка сами задают темп - их шаги не считаются перегрузкой цикла
+                    paced = self.current_mode in (Mode.AUTO, Mode.MANUAL, Mode.REACQUIRE)
+                    
                     # Выполняем действия в зависимости от режима
                     if self.current_mode == Mode.SCAN:
                         self.process_scan()
@@ -744,6 +1360,9 @@ class AntennaTracker:
                     elif self.current_mode == Mode.AUTO:
                         self.process_auto_tracking()
                         
+                    elif self.current_mode == Mode.REACQUIRE:
+                        self.process_reacquire()
+                        
                     elif self.current_mode == Mode.CALIBRATE_MIN:
                         self.calibrate_minimum()
                         
@@ -755,30 +1374,142 @@ class AntennaTracker:
                         left_rssi, right_rssi = self.read_rssi()
                         self.update_status(left_rssi, right_rssi)
                     
-                    time.sleep(0.1)
+                    if paced:
+                        self.loop_scheduler.wait()
+                    else:
+                        self.loop_scheduler.resync()
                     
                 except Exception as e:
                     print(f"ОШИБКА в основном цикле: {e}")
                     self.current_mode = Mode.MANUAL
                     time.sleep(1)
+                    self.loop_scheduler.resync()
                     
         except KeyboardInterrupt:
             print("\nОстановка по Ctrl+C")
         finally:
             self.cleanup()
     
+    def _profile_data(self) -> dict:
+        return {
+            'calibration': {
+                'noise_floor_left': self.noise_floor_left,
+                'noise_floor_right': self.noise_floor_right,
+                'rssi_offset': self.rssi_offset,
+                'rssi_max_left': self.rssi_max_left,
+                'rssi_max_right': self.rssi_max_right,
+            },
+            'servo': {
+                'center_pos': self.servo_config.center_pos,
+                'left_limit': self.servo_config.left_limit,
+                'right_limit': self.servo_config.right_limit,
+            },
+            'monopulse': self.monopulse_table.to_dict(),
+            'last_scan': self.last_scan_results or None,
+            'bearing': self.saved_bearing,
+        }
+    
+    def save_profile(self) -> bool:
+        """Сохраняет калибровку, лимиты, последний скан и пеленг"""
+        self.last_profile_save = time.monotonic()
+        return self.profile_store.save(self._profile_data())
+    
+    def load_profile(self) -> bool:
+        """Восстанавливает профиль с диска; поля, которых нет, остаются по умолчанию"""
+        data = self.profile_store.load()
+        if data is None:
+            return False
+        
+        for name, value in (data.get('calibration') or {}).items():
+            if name in ('noise_floor_left', 'noise_floor_right', 'rssi_offset',
+                        'rssi_max_left', 'rssi_max_right') and is_profile_number(value):
+                setattr(self, name, value)
+        servo = data.get('servo') or {}
+        limits = [servo.get(name, getattr(self.servo_config, name))
+                  for name in ('left_limit', 'center_pos', 'right_limit')]
+        if all(type(v) is int for v in limits) and 0 <= limits[0] < limits[1] < limits[2] <= 4095:
+            self.servo_config.left_limit, self.servo_config.center_pos, self.servo_config.right_limit = limits
+        else:
+            # Иначе деление на ноль в position_to_angle и подгонке скана, теплый старт вне диапазона
+            print(f"Профиль: лимиты {limits} не подходят (нужно 0 <= левый < центр < правый <= 4095) - не используются")
+        if data.get('monopulse'):
+            self.monopulse_table.load(data['monopulse'])
+        if data.get('last_scan'):
+            self.last_scan_results = data['last_scan']
+        if data.get('bearing'):
+            self.saved_bearing = data['bearing']
+        
+        print(f"✓ Профиль загружен: {self.profile_store.path}")
+        return True
+    
+    def _save_bearing_if_due(self):
+        """Пеленг из авторежима - в профиль, если он сдвинулся или запись устаревает"""
+        if self.current_mode != Mode.AUTO or self.last_good_bearing is None:
+            return
+        now = time.monotonic()
+        seen, bearing, rate = self.last_good_bearing
+        if now - self.last_profile_save < self.profile_save_interval or now - seen > self.profile_save_interval:
+            return
+        
+        position = int(round(bearing))
+        seen_time = time.time() - (now - seen)
+        if self.saved_bearing is not None:
+            moved = abs(position - self.saved_bearing['position']) >= self.servo_config.step_units
+            aging = seen_time - self.saved_bearing.get('time', 0) > self.profile_max_age / 2
+            if not (moved or aging):
+                return
+        self.saved_bearing = {'position': position, 'time': seen_time}
+        self.save_profile()
+    
+    def warm_start(self) -> bool:
+        """Сразу в AUTO на сохраненный пеленг, если он не старше profile_max_age"""
+        if self.saved_bearing is None:
+            return False
+        age = time.time() - self.saved_bearing.get('time', 0)
+        if not 0 <= age <= self.profile_max_age:
+            return False
+        
+        position = self.saved_bearing['position']
+        print(f"Теплый старт: пеленг {self.position_to_angle(position)}° ({age:.0f} с назад), без сканирования")
+        self.move_servo(position, speed=1500, acc=50)
+        # Нет сигнала - поиск начнется от этого пеленга
+        self.last_good_bearing = (time.monotonic(), float(self.position), 0.0)
+        self.bearing_estimator.reset()
+        self.auto_controller.reset()
+        self.low_signal_since = None
+        self.current_mode = Mode.AUTO
+        return True
+    
     def cleanup(self):
         """Очистка ресурсов"""
         self.running = False
         
         # Выключаем момент перед закрытием
         try:
-            self.packetHandler.write1ByteTxRx(
-                self.servo_config.id, SMS_STS_TORQUE_ENABLE, 0)
+            for scs_id in self._servo_ids():
+                self.servo_command.write1ByteTxRx(scs_id, SMS_STS_TORQUE_ENABLE, 0)
             print("✓ Момент выключен")
         except:
             pass
         
+        # Возвращаем ответы на запись для других программ
+        try:
+            for scs_id in self._servo_ids():
+                if scs_id in self.packetHandler.no_ack_ids:
+                    self.servo_command.SetResponseLevel(scs_id, SMS_STS_RESPONSE_ALL)
+        except:
+            pass
+        
+        # Дожидаемся потока телеметрии, пока шина еще работает
+        if self.telemetry_thread is not None:
+            self.telemetry_thread.join(timeout=1.0)
+        
+        # Останавливаем планировщик шины
+        try:
+            self.bus.stop(timeout=1.0)
+        except:
+            pass
+        
         # Закрываем порт
         try:
             self.portHandler.closePort()
@@ -860,7 +1591,25 @@ class AntennaTracker:
     
     def get_status(self) -> dict:
         """Возвращает текущий статус"""
-        return self.last_status.copy()
+        with self.status_lock:
+            status = self.last_status.copy()
+        status["loop"] = self.loop_scheduler.get_stats()
+        status["telemetry_loop"] = self.telemetry_scheduler.get_stats()
+        status["controller"] = self.auto_controller.get_state()
+        status["bearing"] = self.bearing_estimator.get_state()
+        if status["bearing"]["initialized"]:
+            status["bearing"]["angle"] = self.position_to_angle(status["bearing"]["bearing"])
+        status["reacquire"] = self.get_reacquire_stats()
+        status["profile"] = dict(self.profile_store.get_stats(), bearing=self.saved_bearing)
+        return status
+    
+    def get_reacquire_stats(self) -> dict:
+        """Потери сигнала и задержка повторного захвата (от потери до возврата в AUTO)"""
+        stats = dict(self.reacquire_stats)
+        total = stats.pop('total_latency_s')
+        stats['mean_latency_s'] = round(total / stats['reacquired'], 2) if stats['reacquired'] else None
+        stats['searching'] = self.current_mode == Mode.REACQUIRE
+        return stats
     
     def get_scan_results(self) -> dict:
         """Возвращает результаты сканирования"""
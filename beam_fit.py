@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Уточнение пеленга по данным сканирования подгонкой модели диаграмм
+
+Две независимые оценки главного лепестка методом наименьших квадратов:
+- суммарный RSSI - гауссов пик: ln(L+R) - парабола по позиции (метод
+  Каруаны, веса пропорциональны сигналу), вершина - пеленг;
+- нормированная разница d = (L-R)/(L+R) - для гауссовых диаграмм atanh(d)
+  линеен по позиции, ноль прямой - пеленг.
+Оценки объединяются с весами, обратными дисперсиям, которые получены из
+ковариации коэффициентов через линеаризацию. Единицы позиции - те же, что в
+переданных данных.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+Z95 = 1.96
+
+
+def _lstsq(design: np.ndarray, values: np.ndarray, weights: np.ndarray):
+    """Взвешенный МНК: коэффициенты, их ковариация и R^2"""
+    a = design * weights[:, None]
+    b = values * weights
+    coef, _, rank, _ = np.linalg.lstsq(a, b, rcond=None)
+    dof = len(values) - design.shape[1]
+    if rank < design.shape[1] or dof <= 0:
+        return None
+    residual = b - a @ coef
+    ss_res = float(residual @ residual)
+    centered = b - np.average(b)
+    ss_tot = float(centered @ centered)
+    cov = ss_res / dof * np.linalg.inv(a.T @ a)
+    r2 = 1.0 - ss_res / ss_tot if ss_tot > 0 else 0.0
+    return coef, cov, r2
+
+
+def _main_lobe(total: np.ndarray, level: float) -> slice:
+    """Непрерывный участок вокруг максимума, где сигнал не ниже level от максимума"""
+    peak = int(np.argmax(total))
+    below = total < level * total[peak]
+    left = np.flatnonzero(below[:peak])
+    right = np.flatnonzero(below[peak:])
+    start = left[-1] + 1 if len(left) else 0
+    stop = peak + right[0] if len(right) else len(total)
+    return slice(start, stop)
+
+
+def fit_peak(position: np.ndarray, total: np.ndarray) -> Optional[dict]:
+    """Вершина гауссова пика суммарного RSSI"""
+    x0 = position.mean()
+    x = position - x0  # центрирование - обусловленность матрицы
+    design = np.column_stack((np.ones_like(x), x, x * x))
+    fit = _lstsq(design, np.log(total), total)
+    if fit is None:
+        return None
+    (c0, c1, c2), cov, r2 = fit
+    if c2 >= 0:
+        return None  # не пик
+    vertex = -c1 / (2.0 * c2)
+    gradient = np.array([0.0, -1.0 / (2.0 * c2), c1 / (2.0 * c2 * c2)])
+    return {
+        'position': x0 + vertex,
+        'sigma': float(np.sqrt(gradient @ cov @ gradient)),
+        'width': float(np.sqrt(-1.0 / (2.0 * c2))),  # СКО гауссианы
+        'r2': r2,
+    }
+
+
+def fit_crossing(position: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 max_difference: float) -> Optional[dict]:
+    """Ноль нормированной разницы RSSI"""
+    difference = (left - right) / (left + right)
+    usable = np.abs(difference) < max_difference
+    if np.count_nonzero(usable) < 3:
+        return None
+    x0 = position[usable].mean()
+    x = position[usable] - x0
+    total = (left + right)[usable]
+    # Шум atanh(d) ~ (1 - d^2) / (L+R), веса - обратные ему
+    d = difference[usable]
+    design = np.column_stack((np.ones_like(x), x))
+    fit = _lstsq(design, np.arctanh(d), total * (1.0 - d * d))
+    if fit is None:
+        return None
+    (c0, c1), cov, r2 = fit
+    if c1 == 0:
+        return None
+    gradient = np.array([-1.0 / c1, c0 / (c1 * c1)])
+    return {
+        'position': x0 - c0 / c1,
+        'sigma': float(np.sqrt(gradient @ cov @ gradient)),
+        'slope': float(c1),
+        'r2': r2,
+    }
+
+
+def fit_beam(scan_data: list, lobe_level: float = 0.5, max_difference: float = 0.9,
+             min_points: int = 5) -> Optional[dict]:
+    """Пеленг главного лепестка по точкам сканирования (position, left_rssi, right_rssi)
+
+    Возвращает None, если в лепестке меньше min_points точек или ни одна
+    модель не подошла. Оценка вне диапазона точек лепестка отбрасывается.
+    """
+    points = sorted(scan_data, key=lambda d: d['position'])
+    position = np.array([d['position'] for d in points], dtype=float)
+    left = np.array([d['left_rssi'] for d in points], dtype=float)
+    right = np.array([d['right_rssi'] for d in points], dtype=float)
+    total = left + right
+    if len(points) < min_points or total.max() <= 0:
+        return None
+
+    lobe = _main_lobe(total, lobe_level)
+    position, left, right, total = position[lobe], left[lobe], right[lobe], total[lobe]
+    if len(position) < min_points or np.any(total <= 0):
+        return None
+    low, high = position[0], position[-1]
+
+    estimates = {}
+    peak = fit_peak(position, total)
+    if peak is not None and low <= peak['position'] <= high:
+        estimates['peak'] = peak
+    crossing = fit_crossing(position, left, right, max_difference)
+    if crossing is not None and low <= crossing['position'] <= high:
+        estimates['crossing'] = crossing
+    if not estimates:
+        return None
+
+    # Объединение с весами 1/sigma^2; нулевая sigma (точная подгонка) - берем как есть
+    weights = {name: 1.0 / max(e['sigma'], 1e-6) ** 2 for name, e in estimates.items()}
+    weight_sum = sum(weights.values())
+    bearing = sum(weights[name] * e['position'] for name, e in estimates.items()) / weight_sum
+    sigma = 1.0 / np.sqrt(weight_sum)
+
+    result = {
+        'position': float(bearing),
+        'sigma': float(sigma),
+        'ci95': (float(bearing - Z95 * sigma), float(bearing + Z95 * sigma)),
+        'points': len(position),
+        'lobe': (float(low), float(high)),
+    }
+    for name, e in estimates.items():
+        result[name] = {k: float(v) for k, v in e.items()}
+    return result
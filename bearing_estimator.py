@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Оценка пеленга цели фильтром Калмана
+
+Состояние - пеленг цели b (единицы позиции сервопривода) и угловая скорость
+v (единиц/с), модель постоянной скорости. Измерение пеленга - фактическая
+позиция сервопривода плюс смещение цели от оси, пересчитанное из
+нормированной разницы RSSI d = (L-R)/(L+R). Для гауссовых диаграмм
+atanh(d) = ln(L/R)/2 линеен по смещению, поэтому пересчет идет через atanh,
+а не напрямую по d, которая насыщается вдали от оси. После калибровки
+таблицы моноимпульса (monopulse.MonopulseTable) пересчет идет по ней.
+"""
+
+import math
+from typing import Optional, Tuple
+
+
+class BearingEstimator:
+    """Фильтр Калмана постоянной скорости со стробированием обновлений
+
+    - СКО измерения - шум RSSI, пересчитанный через d и atanh: растет при
+      слабом сигнале и вдали от оси; плюс model_sigma на неточность модели диаграмм;
+    - измерение с квадратом нормированной невязки больше gate^2 отбрасывается
+      (многолучевость, всплески); после max_rejects отброшенных подряд фильтр
+      перезапускается по измерению - цель действительно ушла;
+    - без сигнала (L+R < min_total) только прогноз.
+    """
+
+    def __init__(self, units_per_difference: float = 340.0, max_difference: float = 0.95,
+                 rssi_noise: float = 30.0, model_sigma: float = 5.0, accel_sigma: float = 600.0,
+                 gate: float = 3.0, max_rejects: int = 10, min_total: float = 200.0, table=None):
+        # Смещение цели от оси на единицу atanh(d): sigma^2 / squint диаграмм, в единицах позиции
+        self.units_per_difference = units_per_difference
+        self.max_difference = max_difference  # |d| ограничивается, atanh(1) бесконечен
+        self.rssi_noise = rssi_noise  # СКО шума одного канала RSSI
+        self.model_sigma = model_sigma  # СКО ошибки модели диаграмм, единиц
+        self.accel_sigma = accel_sigma  # СКО углового ускорения цели, единиц/с^2
+        self.gate = gate
+        self.max_rejects = max_rejects
+        self.min_total = min_total
+        self.table = table  # MonopulseTable; используется, когда откалибрована
+        self.reset()
+
+    def reset(self):
+        self.x = None  # [пеленг, скорость]
+        self.p = None  # ковариация 2x2: [[p00, p01], [p01, p11]]
+        self.time = None
+        self.accepted = 0
+        self.rejected = 0
+        self.consecutive_rejects = 0
+        self.last_innovation = 0.0
+
+    @property
+    def initialized(self) -> bool:
+        return self.x is not None
+
+    def measure(self, left_rssi: float, right_rssi: float, servo_position: float) -> Optional[Tuple[float, float]]:
+        """Пеленг и дисперсия измерения по RSSI, None - сигнала нет"""
+        total = left_rssi + right_rssi
+        if total < self.min_total:
+            return None
+        difference = (left_rssi - right_rssi) / total
+        difference = max(-self.max_difference, min(self.max_difference, difference))
+        # СКО d от шума двух каналов; d(atanh d)/dd = 1 / (1 - d^2)
+        difference_sigma = self.rssi_noise * math.sqrt(2.0) / total
+        if self.table is not None and self.table.calibrated:
+            sigma = abs(self.table.slope(difference)) * difference_sigma
+            variance = sigma * sigma + self.model_sigma ** 2
+            return servo_position + self.table.offset(difference), variance
+        sigma = self.units_per_difference * difference_sigma / (1.0 - difference * difference)
+        variance = sigma * sigma + self.model_sigma ** 2
+        # Левая антенна сильнее - цель левее оси, в сторону меньших позиций
+        return servo_position - math.atanh(difference) * self.units_per_difference, variance
+
+    def predict(self, now: float) -> Tuple[float, float]:
+        """Прогноз (пеленг, скорость) на момент now, состояние не меняется"""
+        dt = now - self.time
+        return self.x[0] + self.x[1] * dt, self.x[1]
+
+    def _propagate(self, now: float):
+        dt = max(0.0, now - self.time)
+        self.time = now
+        if dt == 0.0:
+            return
+        q = self.accel_sigma ** 2
+        (p00, p01), (_, p11) = self.p
+        self.x = [self.x[0] + self.x[1] * dt, self.x[1]]
+        p00 = p00 + 2.0 * dt * p01 + dt * dt * p11 + q * dt ** 4 / 4.0
+        p01 = p01 + dt * p11 + q * dt ** 3 / 2.0
+        p11 = p11 + q * dt * dt
+        self.p = [[p00, p01], [p01, p11]]
+
+    def update(self, left_rssi: float, right_rssi: float, servo_position: float, now: float) -> bool:
+        """Один шаг фильтра; True, если измерение принято"""
+        measurement = self.measure(left_rssi, right_rssi, servo_position)
+        if self.x is None:
+            if measurement is None:
+                return False
+            bearing, variance = measurement
+            self.x = [bearing, 0.0]
+            self.p = [[variance, 0.0], [0.0, self.accel_sigma ** 2]]
+            self.time = now
+            self.accepted += 1
+            return True
+
+        self._propagate(now)
+        if measurement is None:
+            return False
+
+        bearing, variance = measurement
+        (p00, p01), (_, p11) = self.p
+        innovation = bearing - self.x[0]
+        s = p00 + variance
+        self.last_innovation = innovation / math.sqrt(s)
+        if innovation * innovation > self.gate * self.gate * s:
+            self.rejected += 1
+            self.consecutive_rejects += 1
+            if self.consecutive_rejects >= self.max_rejects:
+                # Стабильно другое место - это не выброс, начинаем заново
+                self.x = [bearing, 0.0]
+                self.p = [[variance, 0.0], [0.0, self.accel_sigma ** 2]]
+                self.consecutive_rejects = 0
+            return False
+
+        k0 = p00 / s
+        k1 = p01 / s
+        self.x = [self.x[0] + k0 * innovation, self.x[1] + k1 * innovation]
+        self.p = [[(1.0 - k0) * p00, (1.0 - k0) * p01], [(1.0 - k0) * p01, p11 - k1 * p01]]
+        self.accepted += 1
+        self.consecutive_rejects = 0
+        return True
+
+    def sigma(self) -> float:
+        """СКО оценки пеленга, единиц"""
+        return math.sqrt(self.p[0][0]) if self.p is not None else float('inf')
+
+    def get_state(self) -> dict:
+        if self.x is None:
+            return {'initialized': False, 'accepted': self.accepted, 'rejected': self.rejected}
+        return {
+            'initialized': True,
+            'bearing': round(self.x[0], 1),
+            'rate': round(self.x[1], 1),
+            'sigma': round(self.sigma(), 1),
+            'innovation': round(self.last_innovation, 2),
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Стенд регуляторов автослежения (tracking_controller.py)
+
+Симуляция в модельном времени, без железа: две антенны с разведенными
+гауссовыми диаграммами, шум АЦП, сервопривод с моделью скорости и ускорения
+из scservo_sdk.virtual_servo. Для каждого сценария и регулятора печатает
+время установления, установившуюся и среднеквадратичную ошибку и число
+команд движения.
+
+    python3 controller_bench.py [--rate 50] [--noise 30] [--duration 10] [--seed 1]
+"""
+
+import argparse
+import math
+import random
+
+from scservo_sdk import *
+from scservo_sdk.virtual_servo import VirtualServo
+from bearing_estimator import BearingEstimator
+from monopulse import MonopulseTable
+from tracking_controller import CONTROLLERS, PredictiveController, MonopulseController
+
+# Геометрия как в ServoConfig: 1600 единиц на ~146 градусов
+CENTER_POS = 2047
+LEFT_LIMIT = 1100
+RIGHT_LIMIT = 2700
+UNITS_PER_DEGREE = (RIGHT_LIMIT - LEFT_LIMIT) / 146.0
+AUTO_ACC = 30
+
+# Антенны: оси разведены на ±SQUINT от направления сервопривода
+SQUINT_DEG = 20.0
+BEAM_SIGMA_DEG = 25.0
+
+SETTLE_TOLERANCE_DEG = 2.0
+STEADY_WINDOW_S = 2.0
+
+
+def ramp(start_deg, end_deg, rate_deg_s, t0=0.5):
+    """Цель движется от start_deg к end_deg с постоянной скоростью, начиная с t0"""
+    def bearing(t):
+        travel = max(0.0, t - t0) * rate_deg_s
+        return start_deg + math.copysign(min(travel, abs(end_deg - start_deg)), end_deg - start_deg)
+    return bearing
+
+
+# Сценарии: (пеленг цели в градусах от центра как функция времени, амплитуда сигнала)
+SCENARIOS = {
+    'step_30deg': (lambda t: 30.0, 3000.0),
+    'weak_step_30deg': (lambda t: 30.0, 600.0),
+    'crossing_20deg_s': (ramp(-40.0, 40.0, 20.0), 3000.0),
+    'crossing_60deg_s': (ramp(-50.0, 50.0, 60.0), 3000.0),
+}
+
+
+def rssi(amplitude, offset_deg, noise, rng):
+    """RSSI антенны, ось которой отстоит от цели на offset_deg"""
+    level = amplitude * math.exp(-0.5 * (offset_deg / BEAM_SIGMA_DEG) ** 2)
+    return level + rng.gauss(0.0, noise)
+
+
+def simulate(controller, estimator, bearing, amplitude, rate, duration, noise, seed):
+    rng = random.Random(seed)
+    codec = sms_sts(None)
+
+    servo = VirtualServo(1, position=CENTER_POS)
+    servo.last_time = 0.0
+    servo.write(SMS_STS_TORQUE_ENABLE, b'\x01', 0.0)
+    commanded = CENTER_POS
+    controller.reset()
+    estimator.reset()
+
+    dt = 1.0 / rate
+    errors = []
+    moves = 0
+    for k in range(int(duration * rate)):
+        t = k * dt
+        servo.advance(t)
+        servo_deg = (servo.position - CENTER_POS) / UNITS_PER_DEGREE
+        target_deg = bearing(t)
+        errors.append((t, servo_deg - target_deg))
+
+        # Левая антенна смотрит левее (в сторону меньших позиций)
+        left = rssi(amplitude, target_deg - (servo_deg - SQUINT_DEG), noise, rng)
+        right = rssi(amplitude, target_deg - (servo_deg + SQUINT_DEG), noise, rng)
+
+        # Как AntennaTracker.process_auto_tracking: фильтр по фактической позиции, затем регулятор
+        estimator.update(left, right, servo.position, t)
+        command = controller.update(left, right, commanded, t)
+        if command is None:
+            continue
+        position, speed = command
+        # Как AntennaTracker.move_servo: лимиты и игнорирование микро-движений (тоже успех)
+        position = max(LEFT_LIMIT, min(RIGHT_LIMIT, position))
+        if abs(position - commanded) >= 2:
+            servo.write(SMS_STS_ACC, codec.packPosEx(position, speed, AUTO_ACC), t)
+            commanded = position
+            moves += 1
+        controller.confirm(t)
+
+    settle = 0.0
+    for t, error in errors:
+        if abs(error) > SETTLE_TOLERANCE_DEG:
+            settle = t + dt
+    settled = settle < duration - STEADY_WINDOW_S
+
+    steady = [abs(error) for t, error in errors if t >= duration - STEADY_WINDOW_S]
+    return {
+        'settle_s': settle if settled else None,
+        'steady_error_deg': sum(steady) / len(steady),
+        'rms_error_deg': math.sqrt(sum(error * error for t, error in errors) / len(errors)),
+        'moves': moves,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стенд регуляторов автослежения")
+    parser.add_argument('--rate', type=float, default=50.0, help="частота цикла управления, Гц")
+    parser.add_argument('--noise', type=float, default=30.0, help="шум RSSI (СКО, единицы АЦП)")
+    parser.add_argument('--duration', type=float, default=10.0, help="длительность сценария, с")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print("%-18s %-9s %10s %12s %10s %7s" % ("сценарий", "рег.", "устан., с", "уст. ош., °", "СКО, °", "команд"))
+    for scenario, (bearing, amplitude) in SCENARIOS.items():
+        for name, controller_class in CONTROLLERS.items():
+            estimator = BearingEstimator(rssi_noise=args.noise)
+            if controller_class is PredictiveController:
+                controller = controller_class(estimator)
+            elif controller_class is MonopulseController:
+                # Модель диаграмм стенда совпадает с моделью таблицы по умолчанию
+                controller = controller_class(MonopulseTable(), rssi_noise=args.noise)
+            else:
+                controller = controller_class()
+            result = simulate(controller, estimator, bearing, amplitude, args.rate, args.duration,
+                              args.noise, args.seed)
+            settle = "%.2f" % result['settle_s'] if result['settle_s'] is not None else "-"
+            print("%-18s %-9s %10s %12.2f %10.2f %7d" % (
+                scenario, name, settle, result['steady_error_deg'], result['rms_error_deg'], result['moves']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Планировщик цикла управления с фиксированной частотой
+"""
+
+import threading
+import time
+from collections import deque
+
+# Что делать, если итерация не уложилась в период
+OVERRUN_SKIP = "skip"  # пропустить опоздавшие такты и продолжить по сетке дедлайнов
+OVERRUN_CATCH_UP = "catch_up"  # выполнить опоздавшие такты подряд, без ожидания
+
+
+class LoopScheduler:
+    """Задает темп цикла по дедлайнам time.monotonic_ns()
+
+    Дедлайны идут по сетке start + k * period, поэтому время работы итерации
+    (обмен с сервоприводом, АЦП) не накапливается в дрейф периода, как при
+    time.sleep() после работы. Использование:
+
+        scheduler.start()
+        while running:
+            step()
+            scheduler.wait()
+    """
+
+    def __init__(self, rate_hz: float = 50.0, policy: str = OVERRUN_SKIP,
+                 max_catch_up: int = 5, window: int = 500):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz должна быть больше нуля")
+        if policy not in (OVERRUN_SKIP, OVERRUN_CATCH_UP):
+            raise ValueError(f"Неизвестная политика: {policy}")
+
+        self.rate_hz = rate_hz
+        self.period_ns = int(1e9 / rate_hz)
+        self.policy = policy
+        self.max_catch_up = max_catch_up  # при большем отставании сетка сдвигается, а не догоняется
+
+        self._lock = threading.Lock()
+        self._window = window
+        self.reset_stats()
+        self.start()
+
+    def start(self):
+        """Начинает сетку дедлайнов с текущего момента"""
+        now = time.monotonic_ns()
+        self._deadline = now
+        self._tick_start = now
+        self._last_start = None
+
+    def resync(self):
+        """Сдвигает сетку после намеренно долгого шага (сканирование, калибровка),
+        не считая его перегрузкой"""
+        self.start()
+        with self._lock:
+            self.resyncs += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.ticks = 0
+            self.overruns = 0
+            self.skipped = 0
+            self.resyncs = 0
+            self._periods = deque(maxlen=self._window)  # нс между началами итераций
+            self._lateness = deque(maxlen=self._window)  # нс от дедлайна до начала итерации
+            self._work = deque(maxlen=self._window)  # нс работы итерации
+
+    def wait(self):
+        """Завершает итерацию и ждет дедлайна следующей"""
+        now = time.monotonic_ns()
+        work = now - self._tick_start
+        deadline = self._deadline + self.period_ns
+
+        overrun = now > deadline
+        skipped = 0
+        if overrun:
+            behind = (now - deadline) // self.period_ns
+            if self.policy == OVERRUN_SKIP or behind >= self.max_catch_up:
+                # следующий дедлайн - ближайший на сетке после текущего момента
+                skipped = behind + 1
+                deadline += skipped * self.period_ns
+
+        delay = deadline - time.monotonic_ns()
+        if delay > 0:
+            time.sleep(delay / 1e9)
+
+        start = time.monotonic_ns()
+        with self._lock:
+            self.ticks += 1
+            self.overruns += overrun
+            self.skipped += skipped
+            self._work.append(work)
+            self._lateness.append(max(start - deadline, 0))
+            if self._last_start is not None:
+                self._periods.append(start - self._last_start)
+
+        self._deadline = deadline
+        self._tick_start = start
+        self._last_start = start
+
+    def get_stats(self) -> dict:
+        """Статистика периода, джиттера и перегрузок за последние итерации"""
+        def percentiles(samples, scale):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return {
+                'mean': round(sum(ordered) / len(ordered) / scale, 3),
+                'p50': round(ordered[len(ordered) // 2] / scale, 3),
+                'p99': round(ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)] / scale, 3),
+                'max': round(ordered[-1] / scale, 3),
+            }
+
+        with self._lock:
+            periods = list(self._periods)
+            lateness = list(self._lateness)
+            work = list(self._work)
+            stats = {
+                'rate_hz': self.rate_hz,
+                'period_target_ms': round(self.period_ns / 1e6, 3),
+                'policy': self.policy,
+                'ticks': self.ticks,
+                'overruns': self.overruns,
+                'skipped': self.skipped,
+                'resyncs': self.resyncs,
+            }
+
+        stats['period_ms'] = percentiles(periods, 1e6)
+        stats['jitter_us'] = percentiles(lateness, 1e3)
+        stats['work_ms'] = percentiles(work, 1e6)
+        stats['load'] = round(sum(work) / len(work) / self.period_ns, 3) if work else 0.0
+        return stats
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Таблица моноимпульсной пеленгации
+
+Отображает нормированную разницу d = (L-R)/(L+R) в смещение цели от оси
+антенн (единицы позиции сервопривода; > 0 - цель в сторону больших позиций).
+До калибровки - модель гауссовых диаграмм, смещение = -atanh(d) * k, как в
+BearingEstimator; после скана - таблица по точкам главного лепестка
+относительно пеленга, найденного подгонкой (beam_fit).
+"""
+
+import math
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+
+class MonopulseTable:
+    """Монотонная кусочно-линейная зависимость смещения от d
+
+    Вне диапазона таблицы смещение ограничивается крайними значениями: цель
+    дальше, чем видно по калибровке, и следующий шаг уточнит смещение.
+    Списки differences и offsets не меняются на месте, а заменяются парой
+    под блокировкой: профиль сохраняется из другого потока.
+    """
+
+    def __init__(self, units_per_difference: float = 340.0, max_difference: float = 0.95,
+                 model_points: int = 21):
+        self.units_per_difference = units_per_difference
+        self.max_difference = max_difference
+        self.model_points = model_points
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Возврат к модели гауссовых диаграмм"""
+        differences = np.linspace(-self.max_difference, self.max_difference, self.model_points)
+        self._set(differences.tolist(), (-np.arctanh(differences) * self.units_per_difference).tolist(),
+                  False, None)
+
+    def _set(self, differences: List[float], offsets: List[float], calibrated: bool,
+             timestamp: Optional[float]):
+        with self._lock:
+            self.differences = differences
+            self.offsets = offsets
+            self.calibrated = calibrated
+            self.timestamp = timestamp
+
+    def _points(self):
+        with self._lock:
+            return self.differences, self.offsets
+
+    def offset(self, difference: float) -> float:
+        """Смещение цели от оси по нормированной разнице"""
+        differences, offsets = self._points()
+        return float(np.interp(difference, differences, offsets))
+
+    def slope(self, difference: float) -> float:
+        """Производная смещения по d в точке (для пересчета шума)"""
+        differences, offsets = self._points()
+        index = int(np.clip(np.searchsorted(differences, difference), 1, len(differences) - 1))
+        dd = differences[index] - differences[index - 1]
+        return (offsets[index] - offsets[index - 1]) / dd if dd > 0 else 0.0
+
+    def build(self, scan_data: List[dict], bearing: float, timestamp: Optional[float] = None,
+              lobe: Optional[tuple] = None, bins: int = 12, min_points: int = 8) -> bool:
+        """Калибровка по точкам скана (position, left_rssi, right_rssi) и пеленгу
+
+        Берутся точки в пределах lobe (позиции главного лепестка) с L+R > 0;
+        они сортируются по d и усредняются группами. Смещение должно убывать с
+        ростом d - нарушения монотонности (шум) срезаются. False - точек мало,
+        таблица не меняется.
+        """
+        points = [d for d in scan_data
+                  if d['left_rssi'] + d['right_rssi'] > 0
+                  and (lobe is None or lobe[0] <= d['position'] <= lobe[1])]
+        if len(points) < min_points:
+            return False
+
+        left = np.array([d['left_rssi'] for d in points], dtype=float)
+        right = np.array([d['right_rssi'] for d in points], dtype=float)
+        position = np.array([d['position'] for d in points], dtype=float)
+        difference = np.clip((left - right) / (left + right), -1.0, 1.0)
+        # Ось антенн в точке position, цель в bearing
+        offset = bearing - position
+
+        order = np.argsort(difference)
+        groups = np.array_split(order, min(bins, len(points) // 2))
+        differences = np.array([difference[g].mean() for g in groups])
+        offsets = np.minimum.accumulate(np.array([offset[g].mean() for g in groups]))
+        if differences[-1] - differences[0] <= 0:
+            return False
+
+        self._set(differences.tolist(), offsets.tolist(), True, timestamp)
+        return True
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            calibrated, timestamp = self.calibrated, self.timestamp
+            differences, offsets = self.differences, self.offsets
+        return {
+            'calibrated': calibrated,
+            'timestamp': timestamp,
+            'differences': [round(d, 4) for d in differences],
+            'offsets': [round(o, 1) for o in offsets],
+        }
+
+    def load(self, data: dict) -> bool:
+        """Загрузка калибровки из to_dict(); False - данные не подходят"""
+        if not isinstance(data, dict):
+            return False
+        differences = data.get('differences') or []
+        offsets = data.get('offsets') or []
+        if not isinstance(differences, list) or not isinstance(offsets, list):
+            return False
+        if len(differences) < 2 or len(differences) != len(offsets):
+            return False
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+                   for v in differences + offsets):
+            return False
+        if any(b < a for a, b in zip(differences, differences[1:])):
+            return False
+        timestamp = data.get('timestamp')
+        if timestamp is not None and not isinstance(timestamp, (int, float)):
+            return False
+        self._set([float(d) for d in differences], [float(o) for o in offsets],
+                  bool(data.get('calibrated', True)), timestamp)
+        return True
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Хранилище профиля трекера: калибровка, лимиты и последний пеленг на диске
+
+Один JSON-файл с номером версии формата. Запись атомарная: временный файл
+в том же каталоге, fsync и os.replace, поэтому при пропаже питания на диске
+остается либо старый, либо новый профиль целиком. При чтении секции
+неверного типа отбрасываются: испорченный файл не должен ронять трекер при
+каждом запуске.
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+PROFILE_VERSION = 1
+
+
+def is_profile_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _valid_bearing(bearing) -> bool:
+    return (isinstance(bearing, dict) and type(bearing.get('position')) is int
+            and is_profile_number(bearing.get('time')))
+
+
+# Проверка типа каждой секции; значения внутри секций проверяет владелец (лимиты, таблица)
+PROFILE_SECTIONS = {
+    'calibration': lambda v: isinstance(v, dict),
+    'servo': lambda v: isinstance(v, dict),
+    'monopulse': lambda v: isinstance(v, dict),
+    'last_scan': lambda v: isinstance(v, dict),
+    'bearing': _valid_bearing,
+}
+
+
+class ProfileStore:
+    """Чтение и атомарная запись профиля; профиль другой версии игнорируется"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.last_save_time = None
+        self.last_error = None
+
+    def load(self) -> Optional[dict]:
+        """Профиль или None (нет файла, поврежден, другая версия); поврежденные секции удаляются"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            print(f"Профиль {self.path} не прочитан: {e}")
+            return None
+
+        if not isinstance(data, dict) or data.get('version') != PROFILE_VERSION:
+            version = data.get('version') if isinstance(data, dict) else None
+            print(f"Профиль {self.path}: версия {version}, ожидается {PROFILE_VERSION} - не используется")
+            return None
+
+        for name, valid in PROFILE_SECTIONS.items():
+            if data.get(name) is not None and not valid(data[name]):
+                print(f"Профиль {self.path}: секция {name} повреждена - не используется")
+                del data[name]
+        return data
+
+    def save(self, data: dict) -> bool:
+        """Атомарная запись; version и saved_at добавляются автоматически"""
+        profile = dict(data, version=PROFILE_VERSION, saved_at=time.time())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory,
+                                                 prefix='.profile-', suffix='.tmp', delete=False) as f:
+                    tmp_path = f.name
+                    json.dump(profile, f, ensure_ascii=False, indent=1)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                tmp_path = None
+                # Переименование тоже должно пережить пропажу питания
+                dir_fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            except (OSError, TypeError, ValueError) as e:
+                self.last_error = str(e)
+                print(f"Профиль {self.path} не сохранен: {e}")
+                return False
+            finally:
+                if tmp_path is not None:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+            self.saves += 1
+            self.last_save_time = profile['saved_at']
+            self.last_error = None
+        return True
+
+    def get_stats(self) -> dict:
+        return {
+            'path': self.path,
+            'version': PROFILE_VERSION,
+            'saves': self.saves,
+            'last_save_time': self.last_save_time,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Поиск цели после потери сигнала
+
+Расширяющийся поиск вокруг последнего надежного пеленга: точки поворота
+чередуются по сторонам, с каждым кругом дальше от центра. Сторона, куда
+двигалась цель, проверяется первой и с большим шагом. Измерения и движение
+делает трекер; здесь только выбор точек.
+"""
+
+from typing import List, Optional
+
+
+class ExpandingSearch:
+    """Точки поворота расширяющегося поиска в пределах [low, high]
+
+    center - последний надежный пеленг, velocity - угловая скорость цели
+    (единиц/с) перед потерей, lead - сколько секунд цель летела без
+    сопровождения: центр сдвигается на velocity * lead. Шаги вперед (по
+    скорости) и назад относятся как (1 + skew) / (1 - skew), skew растет со
+    скоростью до max_skew. Когда пройдены обе стороны, next_point() один раз
+    возвращает None и поиск начинается сначала.
+    """
+
+    def __init__(self, center: float, velocity: float, low: float, high: float,
+                 step: float = 110.0, lead: float = 1.0, velocity_scale: float = 300.0,
+                 max_skew: float = 0.5):
+        self.center = max(low, min(high, center + velocity * lead))
+        self.direction = 1 if velocity >= 0 else -1  # Сторона, куда летела цель
+        self.skew = min(max_skew, abs(velocity) / velocity_scale)
+        self.points = self._waypoints(low, high, step)
+        self.index = 0
+        self.passes = 0
+
+    def _waypoints(self, low: float, high: float, step: float) -> List[float]:
+        points = []
+        steps = {1: step * (1.0 + self.skew), -1: step * (1.0 - self.skew)}
+        done = {1: False, -1: False}
+        ring = 1
+        while not (done[1] and done[-1]):
+            for side in (1, -1):
+                if done[side]:
+                    continue
+                point = self.center + self.direction * side * ring * steps[side]
+                if not low < point < high:
+                    point = max(low, min(high, point))
+                    done[side] = True
+                points.append(point)
+            ring += 1
+        return points
+
+    def next_point(self) -> Optional[float]:
+        """Следующая точка поворота; None - диапазон пройден"""
+        if self.index >= len(self.points):
+            self.index = 0
+            self.passes += 1
+            return None
+        point = self.points[self.index]
+        self.index += 1
+        return point
@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 
+from .latency_estimator import *
 from .port_handler import *
 from .protocol_packet_handler import *
+from .transaction_stats import *
 from .group_sync_write import *
 from .group_sync_read import *
+from .control_table_shadow import *
 from .sms_sts import *
 from .scscl import *
+from .bus_scheduler import *
+from .async_sms_sts import *
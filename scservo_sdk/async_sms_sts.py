@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+
+import asyncio
+
+from .scservo_def import *
+from .port_handler import *
+from .protocol_packet_handler import *
+from .sms_sts import *
+
+
+class AsyncPortHandler(object):
+    # asyncio side of a PortHandler: the serial descriptor is watched with loop.add_reader()
+    # (POSIX event loops only) and incoming bytes are collected into `rxbuf`
+    def __init__(self, port_name):
+        self.portHandler = PortHandler(port_name, RX_MODE_SPIN)
+        self.rxbuf = bytearray()
+        self.rx_event = None
+        self.loop = None
+        self.lock = None
+
+    def openPort(self, baudrate=None):
+        if baudrate is not None:
+            self.portHandler.baudrate = baudrate
+        if not self.portHandler.openPort():
+            return False
+
+        self.loop = asyncio.get_running_loop()
+        self.rx_event = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.loop.add_reader(self.portHandler.ser.fileno(), self.onReadable)
+        return True
+
+    def closePort(self):
+        if self.loop is not None:
+            self.loop.remove_reader(self.portHandler.ser.fileno())
+            self.loop = None
+        self.portHandler.closePort()
+
+    def setBaudRate(self, baudrate):
+        was_open = self.loop is not None
+        if was_open:
+            self.loop.remove_reader(self.portHandler.ser.fileno())
+        result = self.portHandler.setBaudRate(baudrate)
+        if was_open and self.portHandler.is_open:
+            self.loop.add_reader(self.portHandler.ser.fileno(), self.onReadable)
+        return result
+
+    def getBaudRate(self):
+        return self.portHandler.getBaudRate()
+
+    def onReadable(self):
+        data = self.portHandler.ser.read(self.portHandler.ser.in_waiting or 1)
+        if data:
+            self.rxbuf.extend(data)
+            self.rx_event.set()
+
+    def clearRx(self):
+        del self.rxbuf[:]
+        self.rx_event.clear()
+
+    def writePort(self, packet):
+        return self.portHandler.writePort(packet)
+
+    def packetTimeout(self, packet_length, scs_id=None):
+        # same budget as PortHandler.setPacketTimeout(), in seconds
+        ph = self.portHandler
+        return ((ph.tx_time_per_byte * packet_length) + (ph.tx_time_per_byte * 3.0) + ph.latency.getMargin(scs_id)) / 1000.0
+
+    async def waitData(self):
+        self.rx_event.clear()
+        await self.rx_event.wait()
+
+    async def rxPacket(self):
+        # status packet parser over `rxbuf`; cancel it (asyncio.wait_for) to bound the wait
+        rxbuf = self.rxbuf
+        while True:
+            if len(rxbuf) >= 6:
+                idx = rxbuf.find(PACKET_HEADER)
+                if idx != 0:
+                    # drop noise in front of the header; without any header keep the last byte
+                    del rxbuf[0: idx if idx > 0 else len(rxbuf) - 1]
+                    continue
+
+                if (rxbuf[PKT_ID] > 0xFD) or (rxbuf[PKT_LENGTH] > RXPACKET_MAX_LEN) or (rxbuf[PKT_ERROR] > 0x7F):
+                    del rxbuf[0]
+                    continue
+
+                wait_length = rxbuf[PKT_LENGTH] + PKT_LENGTH + 1
+                if len(rxbuf) >= wait_length:
+                    rxpacket = rxbuf[0:wait_length]
+                    del rxbuf[0:wait_length]
+                    if rxpacket[wait_length - 1] == ~sum(rxpacket[2:wait_length - 1]) & 0xFF:
+                        return rxpacket, COMM_SUCCESS
+                    return rxpacket, COMM_RX_CORRUPT
+
+            await self.waitData()
+
+
+class async_sms_sts(object):
+    # coroutine counterpart of sms_sts; packets are built and decoded by a port-less sms_sts
+    def __init__(self, asyncPortHandler):
+        self.port = asyncPortHandler
+        self.codec = sms_sts(None)
+
+    async def txRxPacket(self, txpacket, timeout=None, expect_reply=True):
+        total_packet_length = txpacket[PKT_LENGTH] + 4
+        if total_packet_length > TXPACKET_MAX_LEN:
+            return None, COMM_TX_ERROR, 0
+
+        txpacket[PKT_HEADER0] = 0xFF
+        txpacket[PKT_HEADER1] = 0xFF
+        txpacket[total_packet_length - 1] = ~sum(txpacket[2:total_packet_length - 1]) & 0xFF
+
+        async with self.port.lock:
+            # anything still buffered belongs to an earlier, abandoned transaction
+            self.port.clearRx()
+            if self.port.writePort(txpacket) != total_packet_length:
+                return None, COMM_TX_FAIL, 0
+
+            if not expect_reply or txpacket[PKT_ID] == BROADCAST_ID:
+                return None, COMM_SUCCESS, 0
+
+            reply_length = txpacket[PKT_PARAMETER0 + 1] + 6 if txpacket[PKT_INSTRUCTION] == INST_READ else 6
+            if timeout is None:
+                timeout = self.port.packetTimeout(total_packet_length + reply_length, txpacket[PKT_ID])
+
+            return await self.rxStatus(txpacket[PKT_ID], timeout, total_packet_length + reply_length)
+
+    async def rxStatus(self, scs_id, timeout, packet_length=0):
+        async def matching():
+            while True:
+                rxpacket, result = await self.port.rxPacket()
+                if result != COMM_SUCCESS or rxpacket[PKT_ID] == scs_id:
+                    return rxpacket, result
+
+        ph = self.port.portHandler
+        start = ph.getCurrentTime()
+        try:
+            rxpacket, result = await asyncio.wait_for(matching(), timeout)
+        except asyncio.TimeoutError:
+            if not self.port.rxbuf:
+                ph.recordTimeout(scs_id)
+                return None, COMM_RX_TIMEOUT, 0
+            return None, COMM_RX_CORRUPT, 0
+
+        if result == COMM_SUCCESS:
+            latency = ph.getCurrentTime() - start - ph.tx_time_per_byte * packet_length
+            ph.latency.record(scs_id, max(latency, 0.0))
+
+        error = rxpacket[PKT_ERROR] if result == COMM_SUCCESS else 0
+        return rxpacket, result, error
+
+    async def ping(self, scs_id, timeout=None):
+        if scs_id >= BROADCAST_ID:
+            return 0, COMM_NOT_AVAILABLE, 0
+
+        txpacket = bytearray((0xFF, 0xFF, scs_id, 2, INST_PING, 0))
+        _, result, error = await self.txRxPacket(txpacket, timeout)
+        if result != COMM_SUCCESS:
+            return 0, result, error
+
+        data, result, error = await self.readTxRx(scs_id, SMS_STS_MODEL_L, 2, timeout)
+        model_number = self.codec.scs_makeword(data[0], data[1]) if result == COMM_SUCCESS else 0
+        return model_number, result, error
+
+    async def readTxRx(self, scs_id, address, length, timeout=None):
+        if scs_id >= BROADCAST_ID:
+            return bytearray(), COMM_NOT_AVAILABLE, 0
+
+        txpacket = bytearray((0xFF, 0xFF, scs_id, 4, INST_READ, address, length, 0))
+        rxpacket, result, error = await self.txRxPacket(txpacket, timeout)
+        if result != COMM_SUCCESS:
+            return bytearray(), result, error
+        return rxpacket[PKT_PARAMETER0: PKT_PARAMETER0 + length], result, error
+
+    async def writeTxRx(self, scs_id, address, length, data, timeout=None):
+        txpacket = self.codec.makePacket(scs_id, INST_WRITE, (address,), data, length)
+        _, result, error = await self.txRxPacket(txpacket, timeout)
+        return result, error
+
+    async def writeTxOnly(self, scs_id, address, length, data):
+        txpacket = self.codec.makePacket(scs_id, INST_WRITE, (address,), data, length)
+        _, result, _ = await self.txRxPacket(txpacket, expect_reply=False)
+        return result
+
+    async def read1ByteTxRx(self, scs_id, address, timeout=None):
+        data, result, error = await self.readTxRx(scs_id, address, 1, timeout)
+        return (data[0] if result == COMM_SUCCESS else 0), result, error
+
+    async def read2ByteTxRx(self, scs_id, address, timeout=None):
+        data, result, error = await self.readTxRx(scs_id, address, 2, timeout)
+        return (self.codec.scs_makeword(data[0], data[1]) if result == COMM_SUCCESS else 0), result, error
+
+    async def write1ByteTxRx(self, scs_id, address, data, timeout=None):
+        return await self.writeTxRx(scs_id, address, 1, [data], timeout)
+
+    async def WritePosEx(self, scs_id, position, speed, acc, timeout=None):
+        txpacket = self.codec.packPosEx(position, speed, acc)
+        return await self.writeTxRx(scs_id, SMS_STS_ACC, len(txpacket), txpacket, timeout)
+
+    async def ReadPos(self, scs_id, timeout=None):
+        position, result, error = await self.read2ByteTxRx(scs_id, SMS_STS_PRESENT_POSITION_L, timeout)
+        return self.codec.scs_tohost(position, 15), result, error
+
+    async def ReadPosSpeed(self, scs_id, timeout=None):
+        data, result, error = await self.readTxRx(scs_id, SMS_STS_PRESENT_POSITION_L, 4, timeout)
+        if result != COMM_SUCCESS:
+            return 0, 0, result, error
+        position = self.codec.scs_makeword(data[0], data[1])
+        speed = self.codec.scs_makeword(data[2], data[3])
+        return self.codec.scs_tohost(position, 15), self.codec.scs_tohost(speed, 15), result, error
+
+    async def ReadMoving(self, scs_id, timeout=None):
+        return await self.read1ByteTxRx(scs_id, SMS_STS_MOVING, timeout)
+
+    async def ReadSnapshot(self, scs_id, timeout=None):
+        data, result, error = await self.readTxRx(scs_id, SMS_STS_PRESENT_POSITION_L, SMS_STS_SNAPSHOT_LEN, timeout)
+        if result != COMM_SUCCESS:
+            return None, result, error
+        return self.codec.decodeSnapshot(data), result, error
+
+    async def SyncWrite(self, start_address, data_length, data_dict):
+        # data_dict: {scs_id: bytes of data_length}, sent as one broadcast GroupSyncWrite packet
+        param = bytearray()
+        for scs_id, data in data_dict.items():
+            param.append(scs_id)
+            param.extend(data[0: data_length])
+        txpacket = self.codec.makePacket(BROADCAST_ID, INST_SYNC_WRITE, (start_address, data_length),
+                                         param, len(param))
+        _, result, _ = await self.txRxPacket(txpacket, expect_reply=False)
+        return result
+
+    async def SyncWritePosEx(self, positions):
+        # positions: {scs_id: (position, speed, acc)}
+        return await self.SyncWrite(SMS_STS_ACC, SMS_STS_POS_EX.size,
+                                    dict((scs_id, self.codec.packPosEx(*args)) for scs_id, args in positions.items()))
+
+    async def SyncRead(self, start_address, data_length, scs_ids, timeout=None):
+        # returns ({scs_id: data}, {scs_id: result}); servos that did not answer are missing from data
+        scs_ids = list(scs_ids)
+        txpacket = self.codec.makePacket(BROADCAST_ID, INST_SYNC_READ, (start_address, data_length),
+                                         scs_ids, len(scs_ids))
+        if timeout is None:
+            timeout = self.port.packetTimeout(len(txpacket) + (6 + data_length) * len(scs_ids))
+
+        data_dict = {}
+        results = dict((scs_id, COMM_RX_TIMEOUT) for scs_id in scs_ids)
+        async with self.port.lock:
+            self.port.clearRx()
+            txpacket[-1] = ~sum(txpacket[2:-1]) & 0xFF
+            if self.port.writePort(txpacket) != len(txpacket):
+                return data_dict, dict((scs_id, COMM_TX_FAIL) for scs_id in scs_ids)
+
+            async def collect():
+                while len(data_dict) < len(scs_ids):
+                    rxpacket, result = await self.port.rxPacket()
+                    scs_id = rxpacket[PKT_ID]
+                    if scs_id not in results or scs_id in data_dict:
+                        continue
+                    results[scs_id] = result
+                    if result == COMM_SUCCESS:
+                        data_dict[scs_id] = rxpacket[PKT_PARAMETER0: PKT_PARAMETER0 + data_length]
+
+            try:
+                await asyncio.wait_for(collect(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        return data_dict, results
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+# transaction priorities, lower value is served first
+BUS_PRIORITY_MOTION = 0
+BUS_PRIORITY_COMMAND = 1
+BUS_PRIORITY_TELEMETRY = 2
+
+_STOP = object()
+
+
+class BusScheduler(object):
+    # Owns the servo bus: every transaction runs on one worker thread, taken from a
+    # priority queue, so callers on different threads never collide on the port.
+    def __init__(self, ph, name='scservo-bus'):
+        self.ph = ph
+        self.name = name
+
+        self.queue = queue.PriorityQueue()
+        self.seq = itertools.count()
+        self.thread = None
+        self.stats_lock = threading.Lock()
+        self.resetStats()
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.run, name=self.name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        if self.thread is None:
+            return
+        # behind everything already queued, so pending transactions still complete
+        self.queue.put((float('inf'), next(self.seq), 0.0, _STOP, (), {}, None))
+        self.thread.join(timeout)
+        self.thread = None
+
+    def isRunning(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def submit(self, priority, fn, *args, **kwargs):
+        future = Future()
+        self.queue.put((priority, next(self.seq), time.monotonic(), fn, args, kwargs, future))
+        with self.stats_lock:
+            depth = self.queue.qsize()
+            if depth > self.stats['max_queue_depth']:
+                self.stats['max_queue_depth'] = depth
+        return future
+
+    def call(self, priority, fn, *args, **kwargs):
+        # run fn(*args) on the bus thread and wait for its result
+        if threading.current_thread() is self.thread:
+            # already on the bus (nested call), run inline instead of deadlocking
+            return fn(*args, **kwargs)
+        if not self.isRunning():
+            raise RuntimeError("bus scheduler is not running")
+        return self.submit(priority, fn, *args, **kwargs).result()
+
+    def proxy(self, priority):
+        return BusProxy(self, priority)
+
+    def run(self):
+        while True:
+            priority, _, queued_at, fn, args, kwargs, future = self.queue.get()
+            if fn is _STOP:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            wait = time.monotonic() - queued_at
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                # a transaction is complete once fn returns; never leave the port marked busy
+                self.ph.portHandler.is_using = False
+            self.recordStats(priority, wait, time.monotonic() - start)
+
+    def resetStats(self):
+        with self.stats_lock:
+            self.stats = {
+                'max_queue_depth': 0,
+                'priorities': {},
+            }
+
+    def recordStats(self, priority, wait, busy):
+        with self.stats_lock:
+            entry = self.stats['priorities'].get(priority)
+            if entry is None:
+                entry = {'count': 0, 'wait_total': 0.0, 'wait_max': 0.0, 'busy_total': 0.0}
+                self.stats['priorities'][priority] = entry
+            entry['count'] += 1
+            entry['wait_total'] += wait
+            entry['busy_total'] += busy
+            if wait > entry['wait_max']:
+                entry['wait_max'] = wait
+
+    def getQueueDepth(self):
+        return self.queue.qsize()
+
+    def getStats(self):
+        # wait: time between submit and the start of the transaction; times in milliseconds
+        with self.stats_lock:
+            priorities = {}
+            for priority, entry in self.stats['priorities'].items():
+                count = entry['count']
+                priorities[priority] = {
+                    'count': count,
+                    'wait_avg_ms': round(entry['wait_total'] / count * 1000.0, 3) if count else 0.0,
+                    'wait_max_ms': round(entry['wait_max'] * 1000.0, 3),
+                    'busy_avg_ms': round(entry['busy_total'] / count * 1000.0, 3) if count else 0.0,
+                }
+            return {
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.stats['max_queue_depth'],
+                'priorities': priorities,
+            }
+
+
+class BusProxy(object):
+    # packet handler look-alike: proxy.ReadPos(1) runs ph.ReadPos(1) through the scheduler
+    def __init__(self, scheduler, priority):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def __getattr__(self, name):
+        attr = getattr(self.scheduler.ph, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.scheduler.call(self.priority, attr, *args, **kwargs)
+        return call
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+
+class ControlTableShadow(object):
+    # Host-side copy of one servo's control table. Only bytes marked valid are trusted;
+    # everything else has to come from the servo.
+    def __init__(self, size=256):
+        self.values = bytearray(size)
+        self.valid = bytearray(size)  # 1 = values[address] matches the servo
+
+    def isValid(self, address, length):
+        return self.valid.count(1, address, address + length) == length
+
+    def get(self, address, length):
+        return self.values[address:address + length]
+
+    def update(self, address, data):
+        length = len(data)
+        self.values[address:address + length] = data
+        self.valid[address:address + length] = b'\x01' * length
+
+    def invalidate(self, address=None, length=None):
+        if address is None:
+            self.valid[:] = bytearray(len(self.valid))
+        else:
+            self.valid[address:address + length] = bytearray(length)
+
+    def dirtyRange(self, address, data):
+        # (first, last) offsets into data of the bytes that differ from (or are unknown in)
+        # the shadow, or None if the servo already holds all of data
+        first = None
+        last = None
+        for offset in range(len(data)):
+            if not self.valid[address + offset] or self.values[address + offset] != data[offset]:
+                if first is None:
+                    first = offset
+                last = offset
+        if first is None:
+            return None
+        return first, last
@@ -11,7 +11,9 @@ class GroupSyncRead:
         self.last_result = False
         self.is_param_changed = False
         self.param = []
-        self.data_dict = {}
+        self.data_dict = {}  # scs_id: data bytes of the last successful read
+        self.error_dict = {}  # scs_id: servo error byte
+        self.result_dict = {}  # scs_id: COMM_* result of the last read
 
         self.clearParam()
 
@@ -28,7 +30,9 @@ class GroupSyncRead:
         if scs_id in self.data_dict:  # scs_id already exist
             return False
 
-        self.data_dict[scs_id] = []  # [0] * self.data_length
+        self.data_dict[scs_id] = None
+        self.error_dict[scs_id] = 0
+        self.result_dict[scs_id] = COMM_RX_WAITING
 
         self.is_param_changed = True
         return True
@@ -38,11 +42,15 @@ class GroupSyncRead:
             return
 
         del self.data_dict[scs_id]
+        del self.error_dict[scs_id]
+        del self.result_dict[scs_id]
 
         self.is_param_changed = True
 
     def clearParam(self):
         self.data_dict.clear()
+        self.error_dict.clear()
+        self.result_dict.clear()
 
     def txPacket(self):
         if len(self.data_dict.keys()) == 0:
@@ -55,25 +63,24 @@ class GroupSyncRead:
         return self.ph.syncReadTx(self.start_address, self.data_length, self.param, len(self.data_dict.keys()))
 
     def rxPacket(self):
-        self.last_result = True
-
-        result = COMM_RX_FAIL
+        self.last_result = False
 
         if len(self.data_dict.keys()) == 0:
             return COMM_NOT_AVAILABLE
 
         result, rxpacket = self.ph.syncReadRx(self.data_length, len(self.data_dict.keys()))
         # print(rxpacket)
-        if len(rxpacket) >= (self.data_length+6):
-            for scs_id in self.data_dict:
-                self.data_dict[scs_id], result = self.readRx(rxpacket, scs_id, self.data_length)
-                if result != COMM_SUCCESS:
-                    self.last_result = False
-                # print(scs_id)
-        else:
-            self.last_result = False
-        # print(self.last_result)
-        return result
+        for scs_id in self.result_dict:
+            self.result_dict[scs_id] = COMM_RX_TIMEOUT
+        self.parse(rxpacket)
+
+        # COMM_SUCCESS only if every servo answered; the others keep their own result code
+        for scs_id in self.result_dict:
+            if self.result_dict[scs_id] != COMM_SUCCESS:
+                return self.result_dict[scs_id]
+
+        self.last_result = True
+        return COMM_SUCCESS
 
     def txRxPacket(self):
         result = self.txPacket()
@@ -82,70 +89,63 @@ class GroupSyncRead:
 
         return self.rxPacket()
 
-    def readRx(self, rxpacket, scs_id, data_length):
-        # print(scs_id)
-        # print(rxpacket)
-        data = []
+    def parse(self, rxpacket):
+        # one pass over the concatenated status packets; a corrupt frame only costs its own servo
+        packet_length = self.data_length + 6  # HEADER0 HEADER1 ID LENGTH ERROR data... CHKSUM
         rx_length = len(rxpacket)
-        # print(rx_length)
-        rx_index = 0;
-        while (rx_index+6+data_length) <= rx_length:
-            headpacket = [0x00, 0x00, 0x00]
-            while rx_index < rx_length:
-                headpacket[2] = headpacket[1];
-                headpacket[1] = headpacket[0];
-                headpacket[0] = rxpacket[rx_index];
+        rx_index = 0
+        while True:
+            rx_index = rxpacket.find(b'\xff\xff', rx_index)
+            if rx_index < 0 or rx_index + packet_length > rx_length:
+                break
+
+            scs_id = rxpacket[rx_index + 2]
+            if (scs_id not in self.result_dict) or (rxpacket[rx_index + 3] != self.data_length + 2):
                 rx_index += 1
-                if (headpacket[2] == 0xFF) and (headpacket[1] == 0xFF) and headpacket[0] == scs_id:
-                    # print(rx_index)
-                    break
-            # print(rx_index+3+data_length)
-            if (rx_index+3+data_length) > rx_length:
-                break;
-            if rxpacket[rx_index] != (data_length+2):
-                rx_index += 1
-                # print(rx_index)
                 continue
-            rx_index += 1
-            Error = rxpacket[rx_index]
-            rx_index += 1
-            calSum = scs_id + (data_length+2) + Error
-            data = [Error]
-            data.extend(rxpacket[rx_index : rx_index+data_length])
-            for i in range(0, data_length):
-                calSum += rxpacket[rx_index]
+
+            chksum_index = rx_index + packet_length - 1
+            if rxpacket[chksum_index] != ~sum(rxpacket[rx_index + 2:chksum_index]) & 0xFF:
+                if self.result_dict[scs_id] != COMM_SUCCESS:
+                    self.result_dict[scs_id] = COMM_RX_CORRUPT
                 rx_index += 1
-            calSum = ~calSum & 0xFF
-            # print(calSum)
-            if calSum != rxpacket[rx_index]:
-                return None, COMM_RX_CORRUPT
-            return data, COMM_SUCCESS 
-        # print(rx_index)
-        return None, COMM_RX_CORRUPT
+                continue
+
+            self.data_dict[scs_id] = rxpacket[rx_index + 5:chksum_index]
+            self.error_dict[scs_id] = rxpacket[rx_index + 4]
+            self.result_dict[scs_id] = COMM_SUCCESS
+            rx_index = chksum_index + 1
+
+    def getResult(self, scs_id):
+        return self.result_dict.get(scs_id, COMM_NOT_AVAILABLE)
 
     def isAvailable(self, scs_id, address, data_length):
-        #if self.last_result is False or scs_id not in self.data_dict:
         if scs_id not in self.data_dict:
             return False, 0
 
         if (address < self.start_address) or (self.start_address + self.data_length - data_length < address):
             return False, 0
-        if not self.data_dict[scs_id]:
-            return False, 0
-        if len(self.data_dict[scs_id])<(data_length+1):
+        if self.result_dict[scs_id] != COMM_SUCCESS:
             return False, 0
-        return True, self.data_dict[scs_id][0]
+        return True, self.error_dict[scs_id]
 
     def getData(self, scs_id, address, data_length):
+        data = self.data_dict[scs_id]
+        offset = address - self.start_address
         if data_length == 1:
-            return self.data_dict[scs_id][address-self.start_address+1]
+            return data[offset]
         elif data_length == 2:
-            return self.ph.scs_makeword(self.data_dict[scs_id][address-self.start_address+1],
-                                self.data_dict[scs_id][address-self.start_address+2])
+            return self.ph.scs_makeword(data[offset], data[offset + 1])
         elif data_length == 4:
-            return self.ph.scs_makedword(self.ph.scs_makeword(self.data_dict[scs_id][address-self.start_address+1],
-                                              self.data_dict[scs_id][address-self.start_address+2]),
-                                 self.ph.scs_makeword(self.data_dict[scs_id][address-self.start_address+3],
-                                              self.data_dict[scs_id][address-self.start_address+4]))
+            return self.ph.scs_makedword(self.ph.scs_makeword(data[offset], data[offset + 1]),
+                                         self.ph.scs_makeword(data[offset + 2], data[offset + 3]))
         else:
             return 0
+
+    def getDataDict(self, address, data_length):
+        # {scs_id: value} for every servo whose last read succeeded
+        values = {}
+        for scs_id in self.data_dict:
+            if self.result_dict[scs_id] == COMM_SUCCESS:
+                values[scs_id] = self.getData(scs_id, address, data_length)
+        return values
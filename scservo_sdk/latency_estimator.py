@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import bisect
+import threading
+from collections import deque
+
+LATENCY_FLOOR = 2.0  # ms, shortest reply margin ever used
+LATENCY_CEILING = 50.0  # ms, longest reply margin; also used until a servo has been measured
+LATENCY_WINDOW = 256  # samples kept per servo for percentiles
+LATENCY_HISTOGRAM_BINS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)  # ms, upper bounds
+
+
+class LatencyEstimator(object):
+    # Reply latency of each servo: round trip time minus the wire time of both packets, i.e.
+    # servo return delay + USB-serial adapter latency. Smoothed like a TCP retransmission timer
+    # (RFC 6298): srtt/rttvar EWMAs, margin = srtt + 4 * rttvar (but at least 1.5 * srtt, a
+    # steady adapter has next to no variance), clamped to [floor, ceiling].
+    # The margin replaces the fixed LATENCY_TIMER in the packet timeout.
+    def __init__(self, floor=LATENCY_FLOOR, ceiling=LATENCY_CEILING, window=LATENCY_WINDOW):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.servos = {}  # scs_id: entry, None: every servo together
+            self.rtt_histogram = [0] * (len(LATENCY_HISTOGRAM_BINS) + 1)
+            self.timeout_histogram = [0] * (len(LATENCY_HISTOGRAM_BINS) + 1)
+
+    def getEntry(self, scs_id):
+        entry = self.servos.get(scs_id)
+        if entry is None:
+            entry = self.servos[scs_id] = {
+                'srtt': 0.0,
+                'rttvar': 0.0,
+                'samples': 0,
+                'timeouts': 0,
+                'consecutive_timeouts': 0,
+                'window': deque(maxlen=self.window),
+            }
+        return entry
+
+    def record(self, scs_id, latency):
+        with self.lock:
+            self.rtt_histogram[bisect.bisect_left(LATENCY_HISTOGRAM_BINS, latency)] += 1
+            for key in (scs_id, None):
+                entry = self.getEntry(key)
+                if entry['samples'] == 0:
+                    entry['srtt'] = latency
+                    entry['rttvar'] = latency / 2.0
+                else:
+                    entry['rttvar'] = 0.75 * entry['rttvar'] + 0.25 * abs(entry['srtt'] - latency)
+                    entry['srtt'] = 0.875 * entry['srtt'] + 0.125 * latency
+                entry['samples'] += 1
+                entry['consecutive_timeouts'] = 0
+                entry['window'].append(latency)
+
+    def recordTimeout(self, scs_id):
+        with self.lock:
+            entry = self.getEntry(scs_id)
+            entry['timeouts'] += 1
+            entry['consecutive_timeouts'] += 1
+            # a missing servo must not slow down the rest of the bus: no backoff for the total
+            self.getEntry(None)['timeouts'] += 1
+
+    def computeMargin(self, entry):
+        return entry['srtt'] + max(4.0 * entry['rttvar'], 0.5 * entry['srtt'])
+
+    def getMargin(self, scs_id=None):
+        with self.lock:
+            entry = self.servos.get(scs_id)
+            if entry is None or entry['samples'] == 0:
+                entry = self.servos.get(None)
+            if entry is None or entry['samples'] == 0:
+                margin = self.ceiling
+            else:
+                # back off while the servo keeps missing its deadline (slow adapter, baud change)
+                margin = self.computeMargin(entry) * (2 ** min(entry['consecutive_timeouts'], 8))
+            margin = max(self.floor, min(self.ceiling, margin))
+            self.timeout_histogram[bisect.bisect_left(LATENCY_HISTOGRAM_BINS, margin)] += 1
+            return margin
+
+    def getStats(self):
+        # times in milliseconds; histograms map a bin's upper bound to its count
+        with self.lock:
+            servos = {}
+            for scs_id, entry in self.servos.items():
+                window = sorted(entry['window'])
+                stats = {
+                    'samples': entry['samples'],
+                    'timeouts': entry['timeouts'],
+                    'srtt_ms': round(entry['srtt'], 3),
+                    'rttvar_ms': round(entry['rttvar'], 3),
+                    'margin_ms': round(max(self.floor, min(self.ceiling, self.computeMargin(entry)))
+                                       if entry['samples'] else self.ceiling, 3),
+                }
+                for p in (50, 95, 99):
+                    stats['p%d_ms' % p] = round(window[min(len(window) - 1, len(window) * p // 100)], 3) if window else None
+                servos['all' if scs_id is None else str(scs_id)] = stats
+
+            labels = ['<=%g' % b for b in LATENCY_HISTOGRAM_BINS] + ['>%g' % LATENCY_HISTOGRAM_BINS[-1]]
+            return {
+                'floor_ms': self.floor,
+                'ceiling_ms': self.ceiling,
+                'servos': servos,
+                'rtt_histogram': dict(zip(labels, self.rtt_histogram)),
+                'timeout_histogram': dict(zip(labels, self.timeout_histogram)),
+            }
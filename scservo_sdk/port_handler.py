@@ -2,14 +2,21 @@
 
 import time
 import serial
+import select
 import sys
 import platform
 
+from .latency_estimator import *
+
 DEFAULT_BAUDRATE = 1000000
-LATENCY_TIMER = 50 
+LATENCY_TIMER = LATENCY_CEILING  # reply margin (ms) before any latency has been measured
+
+# receive modes
+RX_MODE_SPIN = 0  # poll readPort() in a busy loop until the packet timeout
+RX_MODE_BLOCKING = 1  # sleep in poll() on the port descriptor until data or the packet deadline
 
 class PortHandler(object):
-    def __init__(self, port_name):
+    def __init__(self, port_name, rx_mode=RX_MODE_BLOCKING):
         self.is_open = False
         self.baudrate = DEFAULT_BAUDRATE
         self.packet_start_time = 0.0
@@ -20,15 +27,23 @@ class PortHandler(object):
         self.port_name = port_name
         self.ser = None
 
+        self.rx_mode = rx_mode
+        self.poller = None
+
+        self.latency = LatencyEstimator()
+
     def openPort(self):
         return self.setBaudRate(self.baudrate)
 
     def closePort(self):
+        self.poller = None
         self.ser.close()
         self.is_open = False
 
     def clearPort(self):
         self.ser.flush()
+        # a status packet that missed its deadline must not be taken for the next one
+        self.ser.reset_input_buffer()
 
     def setPortName(self, port_name):
         self.port_name = port_name
@@ -40,31 +55,82 @@ class PortHandler(object):
         baud = self.getCFlagBaud(baudrate)
 
         if baud <= 0:
-            # self.setupPort(38400)
-            # self.baudrate = baudrate
-            return False  # TODO: setCustomBaudrate(baudrate)
+            return self.setCustomBaudrate(baudrate)
         else:
             self.baudrate = baudrate
             return self.setupPort(baud)
 
+    def setCustomBaudrate(self, baudrate):
+        # rates outside the termios table need BOTHER (termios2), which pyserial only does on Linux
+        if platform.system() != 'Linux':
+            return False
+
+        previous = self.baudrate
+        self.baudrate = baudrate
+        try:
+            return self.setupPort(baudrate)
+        except (serial.SerialException, ValueError, OSError):
+            self.baudrate = previous
+            self.is_open = False
+            return False
+
     def getBaudRate(self):
         return self.baudrate
 
     def getBytesAvailable(self):
         return self.ser.in_waiting
 
+    def setRxMode(self, rx_mode):
+        self.rx_mode = rx_mode
+
+    def getRxMode(self):
+        return self.rx_mode
+
     def readPort(self, length):
+        if self.rx_mode == RX_MODE_BLOCKING and self.poller is not None:
+            data = self.readPortBlocking(length)
+        else:
+            data = self.ser.read(length)
+
         if (sys.version_info > (3, 0)):
-            return self.ser.read(length)
+            return data
         else:
-            return [ord(ch) for ch in self.ser.read(length)]
+            return [ord(ch) for ch in data]
+
+    def readPortBlocking(self, length):
+        # wait on the descriptor until `length` bytes arrived or the packet deadline passed
+        data = b''
+        while len(data) < length:
+            remaining = self.packet_timeout - self.getTimeSinceStart()
+            if remaining <= 0:
+                break
+            if not self.poller.poll(remaining):
+                break
+            chunk = self.ser.read(length - len(data))
+            if not chunk:
+                break
+            data += chunk
+
+        return data
 
     def writePort(self, packet):
         return self.ser.write(packet)
 
-    def setPacketTimeout(self, packet_length):
+    def setPacketTimeout(self, packet_length, scs_id=None):
+        # wire time of packet_length bytes (request + reply) + the reply margin measured for scs_id (or for the bus)
         self.packet_start_time = self.getCurrentTime()
-        self.packet_timeout = (self.tx_time_per_byte * packet_length) + (self.tx_time_per_byte * 3.0) + LATENCY_TIMER
+        self.packet_timeout = (self.tx_time_per_byte * packet_length) + (self.tx_time_per_byte * 3.0) + self.latency.getMargin(scs_id)
+
+    def recordLatency(self, scs_id, packet_length):
+        # a status packet of packet_length bytes completed the transaction started with setPacketTimeout()
+        latency = self.getTimeSinceStart() - self.tx_time_per_byte * packet_length
+        self.latency.record(scs_id, max(latency, 0.0))
+
+    def recordTimeout(self, scs_id):
+        self.latency.recordTimeout(scs_id)
+
+    def getLatencyStats(self):
+        return self.latency.getStats()
 
     def setPacketTimeoutMillis(self, msec):
         self.packet_start_time = self.getCurrentTime()
@@ -104,6 +170,15 @@ class PortHandler(object):
 
         self.ser.reset_input_buffer()
 
+        self.poller = None
+        if hasattr(select, 'poll'):
+            try:
+                self.poller = select.poll()
+                self.poller.register(self.ser.fileno(), select.POLLIN)
+            except (AttributeError, ValueError, OSError):
+                # no pollable descriptor (e.g. Windows COM port): fall back to spinning
+                self.poller = None
+
         self.tx_time_per_byte = (1000.0 / self.baudrate) * 10.0
 
         return True
@@ -1,10 +1,14 @@
 #!/usr/bin/env python
 
+import time
+
 from .scservo_def import *
 
 TXPACKET_MAX_LEN = 250
 RXPACKET_MAX_LEN = 250
 
+PACKET_HEADER = b'\xff\xff'
+
 # for Protocol Packet
 PKT_HEADER0 = 0
 PKT_HEADER1 = 1
@@ -28,6 +32,25 @@ class protocol_packet_handler(object):
         self.portHandler = portHandler
         self.scs_end = protocol_end
 
+        # transaction observers, see addObserver()
+        self.observers = []
+        self.tx_length = 0
+        self.tx_start = 0.0
+        self.tx_end = 0.0
+        self.rx_start = None
+
+        # packets are built in txbuffer and parsed in rxbuffer, no allocation per transaction;
+        # the views returned by bufferPacket() and rxPacket() are valid until the next call.
+        # rxbuffer[rx_next:rx_length] holds bytes received past the last packet.
+        self.txbuffer = bytearray(TXPACKET_MAX_LEN)
+        self.txview = memoryview(self.txbuffer)
+        self.txbuffer[PKT_HEADER0] = 0xFF
+        self.txbuffer[PKT_HEADER1] = 0xFF
+        self.rxbuffer = bytearray(RXPACKET_MAX_LEN + 4)
+        self.rxview = memoryview(self.rxbuffer)
+        self.rx_next = 0
+        self.rx_length = 0
+
     def scs_getend(self):
         return self.scs_end
 
@@ -116,8 +139,53 @@ class protocol_packet_handler(object):
 
         return ""
 
+    def addObserver(self, observer):
+        # observer.onTransaction(instruction, scs_id, tx_bytes, rx_bytes, tx_time, wait_time, rx_time, result)
+        # is called on the bus thread after every transaction, times in seconds
+        if observer not in self.observers:
+            self.observers.append(observer)
+
+    def removeObserver(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def notifyTransaction(self, instruction, scs_id, rx_bytes, result):
+        if self.tx_end:
+            now = time.perf_counter()
+            rx_start = self.rx_start or now
+            times = (self.tx_end - self.tx_start, rx_start - self.tx_end, now - rx_start)
+            tx_length = self.tx_length
+        else:
+            # nothing was sent (port busy, packet too long)
+            times = (0.0, 0.0, 0.0)
+            tx_length = 0
+        for observer in self.observers:
+            observer.onTransaction(instruction, scs_id, tx_length, rx_bytes, times[0], times[1], times[2], result)
+        self.tx_end = 0.0
+
+    def makePacket(self, scs_id, instruction, params, data=None, length=0):
+        # HEADER0 HEADER1 ID LENGTH INSTRUCTION params... data[0:length] CHKSUM (filled in by txPacket)
+        # a packet of its own, for callers that keep several (txRxBatch)
+        txpacket = bytearray((0xFF, 0xFF, scs_id, len(params) + length + 2, instruction))
+        txpacket.extend(params)
+        if length:
+            txpacket.extend(data[0: length])
+        txpacket.append(0)
+        return txpacket
+
+    def bufferPacket(self, scs_id, instruction, params, data=None, length=0):
+        # the same packet in txbuffer, for a transaction sent right away
+        end = PKT_PARAMETER0 + len(params) + length
+        if end >= TXPACKET_MAX_LEN:
+            # txPacket() rejects it with COMM_TX_ERROR
+            return self.makePacket(scs_id, instruction, params, data, length)
+        # params is a tuple here
+        self.txbuffer[PKT_ID:end - length] = (scs_id, len(params) + length + 2, instruction) + params
+        if length:
+            self.txbuffer[end - length:end] = data[0: length]
+        return self.txview[0:end + 1]
+
     def txPacket(self, txpacket):
-        checksum = 0
         total_packet_length = txpacket[PKT_LENGTH] + 4  # 4: HEADER0 HEADER1 ID LENGTH
 
         if self.portHandler.is_using:
@@ -133,46 +201,59 @@ class protocol_packet_handler(object):
         txpacket[PKT_HEADER0] = 0xFF
         txpacket[PKT_HEADER1] = 0xFF
 
-        # add a checksum to the packet
-        for idx in range(2, total_packet_length - 1):  # except header, checksum
-            checksum += txpacket[idx]
-
-        txpacket[total_packet_length - 1] = ~checksum & 0xFF
+        # add a checksum to the packet (except header, checksum)
+        txpacket[total_packet_length - 1] = ~sum(txpacket[2:total_packet_length - 1]) & 0xFF
 
         #print "[TxPacket] %r" % txpacket
 
         # tx packet
+        if self.observers:
+            self.tx_length = total_packet_length
+            self.tx_start = time.perf_counter()
+            self.rx_start = None
         self.portHandler.clearPort()
+        self.rx_next = self.rx_length = 0
         written_packet_length = self.portHandler.writePort(txpacket)
+        if self.observers:
+            self.tx_end = time.perf_counter()
         if total_packet_length != written_packet_length:
             self.portHandler.is_using = False
             return COMM_TX_FAIL
 
         return COMM_SUCCESS
 
-    def rxPacket(self):
-        rxpacket = []
+    def rxPacket(self, wait_length=6):
+        # wait_length: the expected packet length, read in one go (minimum 6: HEADER0 HEADER1 ID
+        # LENGTH ERROR CHKSUM). The packet is assembled in rxbuffer and returned as a view of
+        # it, valid until the next rxPacket(): copy what is kept. Bytes past the packet stay
+        # in the buffer for the next call, dropped bytes are moved down within it.
+        rxpacket = self.rxbuffer
+        rxview = self.rxview
 
         result = COMM_TX_FAIL
-        checksum = 0
-        rx_length = 0
-        wait_length = 6  # minimum length (HEADER0 HEADER1 ID LENGTH ERROR CHKSUM)
+        rx_length = self.rx_length - self.rx_next
+        if rx_length:
+            rxview[0:rx_length] = rxview[self.rx_next:self.rx_length]
+        wait_length = min(wait_length, RXPACKET_MAX_LEN + 4)
 
         while True:
-            rxpacket.extend(self.portHandler.readPort(wait_length - rx_length))
-            rx_length = len(rxpacket)
+            if rx_length < wait_length:
+                data = self.portHandler.readPort(wait_length - rx_length)
+                if data:
+                    rxpacket[rx_length:rx_length + len(data)] = data
+                    rx_length += len(data)
+                    if self.rx_start is None and self.observers:
+                        self.rx_start = time.perf_counter()
             if rx_length >= wait_length:
                 # find packet header
-                for idx in range(0, (rx_length - 1)):
-                    if (rxpacket[idx] == 0xFF) and (rxpacket[idx + 1] == 0xFF):
-                        break
+                idx = rxpacket.find(PACKET_HEADER, 0, rx_length)
 
                 if idx == 0:  # found at the beginning of the packet
                     if (rxpacket[PKT_ID] > 0xFD) or (rxpacket[PKT_LENGTH] > RXPACKET_MAX_LEN) or (
                             rxpacket[PKT_ERROR] > 0x7F):
                         # unavailable ID or unavailable Length or unavailable Error
                         # remove the first byte in the packet
-                        del rxpacket[0]
+                        rxview[0:rx_length - 1] = rxview[1:rx_length]
                         rx_length -= 1
                         continue
 
@@ -181,33 +262,19 @@ class protocol_packet_handler(object):
                         wait_length = rxpacket[PKT_LENGTH] + PKT_LENGTH + 1
                         continue
 
-                    if rx_length < wait_length:
-                        # check timeout
-                        if self.portHandler.isPacketTimeout():
-                            if rx_length == 0:
-                                result = COMM_RX_TIMEOUT
-                            else:
-                                result = COMM_RX_CORRUPT
-                            break
-                        else:
-                            continue
-
-                    # calculate checksum
-                    for i in range(2, wait_length - 1):  # except header, checksum
-                        checksum += rxpacket[i]
-                    checksum = ~checksum & 0xFF
-
-                    # verify checksum
-                    if rxpacket[wait_length - 1] == checksum:
+                    # verify checksum (except header, checksum)
+                    if rxpacket[wait_length - 1] == ~sum(rxview[2:wait_length - 1]) & 0xFF:
                         result = COMM_SUCCESS
                     else:
                         result = COMM_RX_CORRUPT
+                    self.rx_next = wait_length
                     break
 
                 else:
-                    # remove unnecessary packets
-                    del rxpacket[0: idx]
-                    rx_length -= idx
+                    # remove unnecessary packets; without any header keep the last byte, it may start one
+                    drop = idx if idx > 0 else rx_length - 1
+                    rxview[0:rx_length - drop] = rxview[drop:rx_length]
+                    rx_length -= drop
 
             else:
                 # check timeout
@@ -216,10 +283,12 @@ class protocol_packet_handler(object):
                         result = COMM_RX_TIMEOUT
                     else:
                         result = COMM_RX_CORRUPT
+                    self.rx_next = rx_length
                     break
 
+        self.rx_length = rx_length
         self.portHandler.is_using = False
-        return rxpacket, result
+        return rxview[0:self.rx_next], result
 
     def txRxPacket(self, txpacket):
         rxpacket = None
@@ -228,42 +297,176 @@ class protocol_packet_handler(object):
         # tx packet
         result = self.txPacket(txpacket)
         if result != COMM_SUCCESS:
+            if self.observers:
+                self.notifyTransaction(txpacket[PKT_INSTRUCTION], txpacket[PKT_ID], 0, result)
             return rxpacket, result, error
 
         # (ID == Broadcast ID) == no need to wait for status packet or not available
         if (txpacket[PKT_ID] == BROADCAST_ID):
             self.portHandler.is_using = False
+            if self.observers:
+                self.notifyTransaction(txpacket[PKT_INSTRUCTION], txpacket[PKT_ID], 0, result)
             return rxpacket, result, error
 
         # set packet timeout
         if txpacket[PKT_INSTRUCTION] == INST_READ:
-            self.portHandler.setPacketTimeout(txpacket[PKT_PARAMETER0 + 1] + 6)
+            reply_length = txpacket[PKT_PARAMETER0 + 1] + 6
         else:
-            self.portHandler.setPacketTimeout(6)  # HEADER0 HEADER1 ID LENGTH ERROR CHECKSUM
+            reply_length = 6  # HEADER0 HEADER1 ID LENGTH ERROR CHECKSUM
+        # the clock starts before the request is on the wire: budget request + reply
+        self.portHandler.setPacketTimeout(txpacket[PKT_LENGTH] + 4 + reply_length, txpacket[PKT_ID])
 
         # rx packet
         while True:
-            rxpacket, result = self.rxPacket()
+            rxpacket, result = self.rxPacket(reply_length)
             if result != COMM_SUCCESS or txpacket[PKT_ID] == rxpacket[PKT_ID]:
                 break
 
         if result == COMM_SUCCESS and txpacket[PKT_ID] == rxpacket[PKT_ID]:
             error = rxpacket[PKT_ERROR]
+            self.portHandler.recordLatency(txpacket[PKT_ID], txpacket[PKT_LENGTH] + 4 + reply_length)
+        elif result == COMM_RX_TIMEOUT:
+            self.portHandler.recordTimeout(txpacket[PKT_ID])
+
+        if self.observers:
+            self.notifyTransaction(txpacket[PKT_INSTRUCTION], txpacket[PKT_ID], len(rxpacket), result)
 
         return rxpacket, result, error
 
+    def txRxBatch(self, txpackets, pipeline_depth=1):
+        # Pipelined transactions: packets are written back-to-back and their status packets
+        # are collected in one receive pass, matched by ID in request order.
+        # Packets without a status packet (broadcast ID: sync write, action) ride along in
+        # front of the next one that has one. At most `pipeline_depth` status packets are
+        # outstanding per write; keep 1 on a half-duplex bus so host and servo never talk at once.
+        results = [None] * len(txpackets)
+        burst = []
+        replies = 0
+
+        for idx, txpacket in enumerate(txpackets):
+            burst.append(idx)
+            if txpacket[PKT_ID] != BROADCAST_ID:
+                replies += 1
+                if replies >= pipeline_depth:
+                    self.txRxBurst(txpackets, burst, results)
+                    burst = []
+                    replies = 0
+
+        if burst:
+            self.txRxBurst(txpackets, burst, results)
+
+        return results
+
+    def txRxBurst(self, txpackets, burst, results):
+        if self.portHandler.is_using:
+            for idx in burst:
+                results[idx] = (None, COMM_PORT_BUSY, 0)
+            return
+        self.portHandler.is_using = True
+
+        data = bytearray()
+        pending = []
+        reply_length = 0
+        reply_end = {}  # idx: status bytes on the wire up to the end of its status packet
+        for idx in burst:
+            txpacket = txpackets[idx]
+            total_packet_length = txpacket[PKT_LENGTH] + 4
+            if total_packet_length > TXPACKET_MAX_LEN:
+                results[idx] = (None, COMM_TX_ERROR, 0)
+                continue
+
+            txpacket[PKT_HEADER0] = 0xFF
+            txpacket[PKT_HEADER1] = 0xFF
+            txpacket[total_packet_length - 1] = ~sum(txpacket[2:total_packet_length - 1]) & 0xFF
+            data.extend(txpacket[0:total_packet_length])
+
+            if txpacket[PKT_ID] == BROADCAST_ID:
+                results[idx] = (None, COMM_SUCCESS, 0)
+            else:
+                pending.append(idx)
+                if txpacket[PKT_INSTRUCTION] == INST_READ:
+                    reply_length += txpacket[PKT_PARAMETER0 + 1] + 6
+                else:
+                    reply_length += 6
+                reply_end[idx] = reply_length
+
+        if self.observers:
+            self.tx_length = len(data)
+            self.tx_start = time.perf_counter()
+            self.rx_start = None
+        self.portHandler.clearPort()
+        self.rx_next = self.rx_length = 0
+        written_length = self.portHandler.writePort(data)
+        if self.observers:
+            self.tx_end = time.perf_counter()
+        if written_length != len(data):
+            for idx in burst:
+                results[idx] = (None, COMM_TX_FAIL, 0)
+            self.portHandler.is_using = False
+            if self.observers:
+                self.notifyTransaction(txpackets[burst[-1]][PKT_INSTRUCTION], txpackets[burst[-1]][PKT_ID], 0, COMM_TX_FAIL)
+            return
+
+        # one deadline for the burst: the bytes we sent plus every expected status packet
+        self.portHandler.setPacketTimeout(len(data) + reply_length)
+
+        rx_bytes = 0
+        received = 0
+        while pending:
+            rxpacket, result = self.rxPacket(reply_end[pending[0]] - received)
+            self.portHandler.is_using = True
+            rx_bytes += len(rxpacket)
+
+            if result == COMM_RX_TIMEOUT:
+                for idx in pending:
+                    results[idx] = (None, COMM_RX_TIMEOUT, 0)
+                    self.portHandler.recordTimeout(txpackets[idx][PKT_ID])
+                break
+
+            # the request with the packet's ID; a corrupt packet without a usable ID goes
+            # to the oldest one
+            n = 0
+            if len(rxpacket) > PKT_ID:
+                for i, idx in enumerate(pending):
+                    if txpackets[idx][PKT_ID] == rxpacket[PKT_ID]:
+                        n = i
+                        break
+                else:
+                    if result == COMM_SUCCESS:
+                        # not one of ours
+                        continue
+            idx = pending[n]
+            # servos queued in front of this one did not answer
+            for skipped in pending[:n]:
+                results[skipped] = (None, COMM_RX_TIMEOUT, 0)
+                self.portHandler.recordTimeout(txpackets[skipped][PKT_ID])
+            del pending[:n + 1]
+            received = reply_end[idx]
+
+            if result == COMM_SUCCESS:
+                results[idx] = (bytearray(rxpacket), COMM_SUCCESS, rxpacket[PKT_ERROR])
+                self.portHandler.recordLatency(txpackets[idx][PKT_ID], len(data) + reply_end[idx])
+            else:
+                results[idx] = (bytearray(rxpacket), result, 0)
+
+        self.portHandler.is_using = False
+        if self.observers:
+            # one transaction for the whole burst, reported with its first failure
+            result = COMM_SUCCESS
+            for idx in burst:
+                if results[idx][1] != COMM_SUCCESS:
+                    result = results[idx][1]
+                    break
+            self.notifyTransaction(txpackets[burst[-1]][PKT_INSTRUCTION], txpackets[burst[-1]][PKT_ID], rx_bytes, result)
+
     def ping(self, scs_id):
         model_number = 0
         error = 0
 
-        txpacket = [0] * 6
-
         if scs_id >= BROADCAST_ID:
             return model_number, COMM_NOT_AVAILABLE, error
 
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = 2
-        txpacket[PKT_INSTRUCTION] = INST_PING
+        txpacket = self.bufferPacket(scs_id, INST_PING, ())
 
         rxpacket, result, error = self.txRxPacket(txpacket)
 
@@ -274,35 +477,151 @@ class protocol_packet_handler(object):
 
         return model_number, result, error
 
-    def action(self, scs_id):
-        txpacket = [0] * 6
+    def calibrateLatency(self, scs_ids, count=10):
+        # seed the reply margins with `count` pings per servo; returns {scs_id: COMM_* of the last ping}
+        results = {}
+        for scs_id in scs_ids:
+            txpacket = self.bufferPacket(scs_id, INST_PING, ())
+            for _ in range(count):
+                _, results[scs_id], _ = self.txRxPacket(txpacket)
+        return results
+
+    def scanBus(self, scs_ids=None, slot=None, guard=0.5, retries=3):
+        # Finds the servos on the bus; returns {scs_id: (model_number, firmware_major, firmware_minor)}.
+        # Pings go out back to back, one per slot of `slot` ms (default: wire time of ping and
+        # status packet + `guard` ms of servo return delay), without waiting out a reply timeout
+        # per ID: the servo answers on the wire within its slot, however late the adapter hands
+        # the bytes over, and status packets are matched to IDs by their ID field. After the
+        # sweep the bus reply margin is waited once for stragglers.
+        # Slots are timed from writePort() returning, not from the wire, so a late reply can
+        # collide with the next one: slots that got a corrupt packet (and the slot before) are
+        # pinged again, and every ID found is confirmed with a unicast ping before it is reported
+        # (up to `retries` pings while the reply comes back corrupt).
+        if scs_ids is None:
+            scs_ids = range(0, MAX_ID + 1)
+        if slot is None:
+            slot = self.portHandler.tx_time_per_byte * (6 + 6) + guard
 
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = 2
-        txpacket[PKT_INSTRUCTION] = INST_ACTION
+        if self.portHandler.is_using:
+            return {}
+        self.portHandler.is_using = True
+
+        found = []
+        retry = []
+        rxbuf = bytearray()
+        tx_bytes = 0
+        rx_bytes = 0
+        corrupt = 0
+        previous_id = None
+        if self.observers:
+            self.tx_start = time.perf_counter()
+        self.portHandler.clearPort()
+        for scs_id in scs_ids:
+            txpacket = self.bufferPacket(scs_id, INST_PING, ())
+            txpacket[5] = ~sum(txpacket[2:5]) & 0xFF
+            tx_bytes += self.portHandler.writePort(txpacket)
+            self.portHandler.setPacketTimeoutMillis(slot)
+            while True:
+                data = self.portHandler.readPort(64)
+                rx_bytes += len(data)
+                rxbuf.extend(data)
+                if self.portHandler.isPacketTimeout():
+                    break
+            dropped = self.parseStatusPackets(rxbuf, found)
+            if dropped:
+                corrupt += dropped
+                retry.extend(i for i in (previous_id, scs_id) if i is not None)
+            previous_id = scs_id
+
+        # for the observers the sweep is the sending time, the wait for stragglers the reply time
+        if self.observers:
+            self.tx_length = tx_bytes
+            self.tx_end = time.perf_counter()
+            self.rx_start = None
+        self.portHandler.setPacketTimeoutMillis(self.portHandler.latency.getMargin())
+        while True:
+            data = self.portHandler.readPort(64)
+            if data:
+                rx_bytes += len(data)
+                rxbuf.extend(data)
+                if self.rx_start is None and self.observers:
+                    self.rx_start = time.perf_counter()
+            if self.portHandler.isPacketTimeout():
+                break
+        dropped = self.parseStatusPackets(rxbuf, found)
+        corrupt += dropped
+        if dropped and previous_id is not None:
+            retry.append(previous_id)
+        self.portHandler.is_using = False
+        if self.observers:
+            if found:
+                result = COMM_SUCCESS
+            elif corrupt:
+                result = COMM_RX_CORRUPT
+            else:
+                result = COMM_RX_TIMEOUT
+            self.notifyTransaction(INST_PING, BROADCAST_ID, rx_bytes, result)
+
+        # unicast ping (full reply timeout) confirms the ID, then firmware version
+        # (addresses 0, 1) and model number (3, 4) in one read per servo
+        servos = {}
+        for scs_id in sorted(set(found) | set(retry)):
+            for _ in range(retries):
+                _, result, _ = self.txRxPacket(self.bufferPacket(scs_id, INST_PING, ()))
+                if result != COMM_RX_CORRUPT:
+                    break
+            if result != COMM_SUCCESS:
+                continue
+            data, result, error = self.readTxRx(scs_id, 0, 5)
+            if result == COMM_SUCCESS and len(data) == 5:
+                servos[scs_id] = (self.scs_makeword(data[3], data[4]), data[0], data[1])
+            else:
+                servos[scs_id] = (0, 0, 0)
+        return servos
+
+    def parseStatusPackets(self, rxbuf, found):
+        # moves the IDs of the complete, valid status packets at the front of rxbuf into found,
+        # returns the number of complete packets dropped for a bad checksum
+        corrupt = 0
+        while True:
+            idx = rxbuf.find(PACKET_HEADER)
+            if idx < 0:
+                del rxbuf[:-1]
+                return corrupt
+            del rxbuf[:idx]
+            if len(rxbuf) < 6:
+                return corrupt
+            length = rxbuf[PKT_LENGTH] + 4
+            if rxbuf[PKT_ID] > 0xFD or length > RXPACKET_MAX_LEN:
+                del rxbuf[0]
+                continue
+            if len(rxbuf) < length:
+                return corrupt
+            if rxbuf[length - 1] == ~sum(rxbuf[2:length - 1]) & 0xFF:
+                found.append(rxbuf[PKT_ID])
+                del rxbuf[:length]
+            else:
+                corrupt += 1
+                del rxbuf[0]
+
+    def action(self, scs_id):
+        txpacket = self.bufferPacket(scs_id, INST_ACTION, ())
 
         _, result, _ = self.txRxPacket(txpacket)
 
         return result
 
     def readTx(self, scs_id, address, length):
-
-        txpacket = [0] * 8
-
         if scs_id >= BROADCAST_ID:
             return COMM_NOT_AVAILABLE
 
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = 4
-        txpacket[PKT_INSTRUCTION] = INST_READ
-        txpacket[PKT_PARAMETER0 + 0] = address
-        txpacket[PKT_PARAMETER0 + 1] = length
+        txpacket = self.bufferPacket(scs_id, INST_READ, (address, length))
 
         result = self.txPacket(txpacket)
 
         # set packet timeout
         if result == COMM_SUCCESS:
-            self.portHandler.setPacketTimeout(length + 6)
+            self.portHandler.setPacketTimeout(len(txpacket) + length + 6, scs_id)
 
         return result
 
@@ -311,10 +630,10 @@ class protocol_packet_handler(object):
         error = 0
 
         rxpacket = None
-        data = []
+        data = bytearray()
 
         while True:
-            rxpacket, result = self.rxPacket()
+            rxpacket, result = self.rxPacket(length + 6)
 
             if result != COMM_SUCCESS or rxpacket[PKT_ID] == scs_id:
                 break
@@ -322,28 +641,27 @@ class protocol_packet_handler(object):
         if result == COMM_SUCCESS and rxpacket[PKT_ID] == scs_id:
             error = rxpacket[PKT_ERROR]
 
-            data.extend(rxpacket[PKT_PARAMETER0 : PKT_PARAMETER0+length])
+            # rxpacket starts at rxbuffer[0]: slicing the buffer copies the data out in one step
+            data = self.rxbuffer[PKT_PARAMETER0 : PKT_PARAMETER0+length]
 
+        if self.observers:
+            self.notifyTransaction(INST_READ, scs_id, len(rxpacket), result)
         return data, result, error
 
     def readTxRx(self, scs_id, address, length):
-        txpacket = [0] * 8
-        data = []
+        data = bytearray()
 
         if scs_id >= BROADCAST_ID:
             return data, COMM_NOT_AVAILABLE, 0
 
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = 4
-        txpacket[PKT_INSTRUCTION] = INST_READ
-        txpacket[PKT_PARAMETER0 + 0] = address
-        txpacket[PKT_PARAMETER0 + 1] = length
+        txpacket = self.bufferPacket(scs_id, INST_READ, (address, length))
 
         rxpacket, result, error = self.txRxPacket(txpacket)
         if result == COMM_SUCCESS:
             error = rxpacket[PKT_ERROR]
 
-            data.extend(rxpacket[PKT_PARAMETER0 : PKT_PARAMETER0+length])
+            # rxpacket starts at rxbuffer[0]: slicing the buffer copies the data out in one step
+            data = self.rxbuffer[PKT_PARAMETER0 : PKT_PARAMETER0+length]
 
         return data, result, error
 
@@ -389,29 +707,17 @@ class protocol_packet_handler(object):
         return data_read, result, error
 
     def writeTxOnly(self, scs_id, address, length, data):
-        txpacket = [0] * (length + 7)
-
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_WRITE
-        txpacket[PKT_PARAMETER0] = address
-
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+        txpacket = self.bufferPacket(scs_id, INST_WRITE, (address,), data, length)
 
         result = self.txPacket(txpacket)
         self.portHandler.is_using = False
+        if self.observers:
+            self.notifyTransaction(INST_WRITE, scs_id, 0, result)
 
         return result
 
     def writeTxRx(self, scs_id, address, length, data):
-        txpacket = [0] * (length + 7)
-
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_WRITE
-        txpacket[PKT_PARAMETER0] = address
-
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+        txpacket = self.bufferPacket(scs_id, INST_WRITE, (address,), data, length)
         rxpacket, result, error = self.txRxPacket(txpacket)
 
         return result, error
@@ -447,45 +753,24 @@ class protocol_packet_handler(object):
         return self.writeTxRx(scs_id, address, 4, data_write)
 
     def regWriteTxOnly(self, scs_id, address, length, data):
-        txpacket = [0] * (length + 7)
-
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_REG_WRITE
-        txpacket[PKT_PARAMETER0] = address
-
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+        txpacket = self.bufferPacket(scs_id, INST_REG_WRITE, (address,), data, length)
 
         result = self.txPacket(txpacket)
         self.portHandler.is_using = False
+        if self.observers:
+            self.notifyTransaction(INST_REG_WRITE, scs_id, 0, result)
 
         return result
 
     def regWriteTxRx(self, scs_id, address, length, data):
-        txpacket = [0] * (length + 7)
-
-        txpacket[PKT_ID] = scs_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_REG_WRITE
-        txpacket[PKT_PARAMETER0] = address
-
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+        txpacket = self.bufferPacket(scs_id, INST_REG_WRITE, (address,), data, length)
 
         _, result, error = self.txRxPacket(txpacket)
 
         return result, error
 
     def syncReadTx(self, start_address, data_length, param, param_length):
-        txpacket = [0] * (param_length + 8)
-        # 8: HEADER0 HEADER1 ID LEN INST START_ADDR DATA_LEN CHKSUM
-
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH] = param_length + 4  # 7: INST START_ADDR DATA_LEN CHKSUM
-        txpacket[PKT_INSTRUCTION] = INST_SYNC_READ
-        txpacket[PKT_PARAMETER0 + 0] = start_address
-        txpacket[PKT_PARAMETER0 + 1] = data_length
-
-        txpacket[PKT_PARAMETER0 + 2: PKT_PARAMETER0 + 2 + param_length] = param[0: param_length]
+        txpacket = self.bufferPacket(BROADCAST_ID, INST_SYNC_READ, (start_address, data_length), param, param_length)
 
         # print(txpacket)
         result = self.txPacket(txpacket)
@@ -493,12 +778,15 @@ class protocol_packet_handler(object):
 
     def syncReadRx(self, data_length, param_length):
         wait_length = (6 + data_length) * param_length
-        self.portHandler.setPacketTimeout(wait_length)
-        rxpacket = []
+        # request (8 + param_length bytes) + replies
+        self.portHandler.setPacketTimeout(8 + param_length + wait_length)
+        rxpacket = bytearray()
         rx_length = 0
         while True:
             rxpacket.extend(self.portHandler.readPort(wait_length - rx_length))
             rx_length = len(rxpacket)
+            if rx_length and self.rx_start is None and self.observers:
+                self.rx_start = time.perf_counter()
             if rx_length >= wait_length:
                 result = COMM_SUCCESS
                 break
@@ -511,19 +799,12 @@ class protocol_packet_handler(object):
                         result = COMM_RX_CORRUPT
                     break
         self.portHandler.is_using = False
+        if self.observers:
+            self.notifyTransaction(INST_SYNC_READ, BROADCAST_ID, rx_length, result)
         return result, rxpacket
 
     def syncWriteTxOnly(self, start_address, data_length, param, param_length):
-        txpacket = [0] * (param_length + 8)
-        # 8: HEADER0 HEADER1 ID LEN INST START_ADDR DATA_LEN ... CHKSUM
-
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH] = param_length + 4  # 4: INST START_ADDR DATA_LEN ... CHKSUM
-        txpacket[PKT_INSTRUCTION] = INST_SYNC_WRITE
-        txpacket[PKT_PARAMETER0 + 0] = start_address
-        txpacket[PKT_PARAMETER0 + 1] = data_length
-
-        txpacket[PKT_PARAMETER0 + 2: PKT_PARAMETER0 + 2 + param_length] = param[0: param_length]
+        txpacket = self.bufferPacket(BROADCAST_ID, INST_SYNC_WRITE, (start_address, data_length), param, param_length)
 
         _, result, _ = self.txRxPacket(txpacket)
 
@@ -1,9 +1,13 @@
 #!/usr/bin/env python
 
+import struct
+import time
+
 from .scservo_def import *
 from .protocol_packet_handler import *
 from .group_sync_read import *
 from .group_sync_write import *
+from .control_table_shadow import *
 
 # define baud rate
 SMS_STS_1M = 0
@@ -15,6 +19,21 @@ SMS_STS_76800 = 5
 SMS_STS_57600 = 6
 SMS_STS_38400 = 7
 
+SMS_STS_BAUD_RATES = {
+    SMS_STS_1M: 1000000,
+    SMS_STS_0_5M: 500000,
+    SMS_STS_250K: 250000,
+    SMS_STS_128K: 128000,
+    SMS_STS_115200: 115200,
+    SMS_STS_76800: 76800,
+    SMS_STS_57600: 57600,
+    SMS_STS_38400: 38400,
+}
+
+# define response level
+SMS_STS_RESPONSE_READ = 0  # status packets for PING and READ only
+SMS_STS_RESPONSE_ALL = 1
+
 # define memory table
 #-------EPROM(read only)--------
 SMS_STS_MODEL_L = 3
@@ -23,6 +42,7 @@ SMS_STS_MODEL_H = 4
 #-------EPROM(read & write)--------
 SMS_STS_ID = 5
 SMS_STS_BAUD_RATE = 6
+SMS_STS_RESPONSE_LEVEL = 8
 SMS_STS_MIN_ANGLE_LIMIT_L = 9
 SMS_STS_MIN_ANGLE_LIMIT_H = 10
 SMS_STS_MAX_ANGLE_LIMIT_L = 11
@@ -57,13 +77,282 @@ SMS_STS_MOVING = 66
 SMS_STS_PRESENT_CURRENT_L = 69
 SMS_STS_PRESENT_CURRENT_H = 70
 
+# ACC, GOAL_POSITION, GOAL_TIME, GOAL_SPEED block written by the *PosEx instructions
+SMS_STS_POS_EX = struct.Struct('<BHHH')
+
+# contiguous telemetry block: PRESENT_POSITION_L .. PRESENT_CURRENT_H
+SMS_STS_SNAPSHOT_LEN = SMS_STS_PRESENT_CURRENT_H - SMS_STS_PRESENT_POSITION_L + 1
+
+# EEPROM and configuration registers, i.e. everything the servo does not change on its own,
+# may be kept in a ControlTableShadow
+SMS_STS_SHADOW_END = SMS_STS_PRESENT_POSITION_L
+
+# status errors after which the servo may have dropped torque by itself
+SMS_STS_TORQUE_ERRORS = ERRBIT_OVERHEAT | ERRBIT_OVERELE | ERRBIT_OVERLOAD
+
+
+class ServoSnapshot(object):
+    __slots__ = ('position', 'speed', 'load', 'voltage', 'temperature', 'moving', 'current')
+
+    def __init__(self, position=0, speed=0, load=0, voltage=0, temperature=0, moving=0, current=0):
+        self.position = position
+        self.speed = speed
+        self.load = load
+        self.voltage = voltage  # 0.1 V units
+        self.temperature = temperature  # degrees C
+        self.moving = moving
+        self.current = current
+
+    def __repr__(self):
+        return "ServoSnapshot(position=%d, speed=%d, load=%d, voltage=%d, temperature=%d, moving=%d, current=%d)" % (
+            self.position, self.speed, self.load, self.voltage, self.temperature, self.moving, self.current)
+
+
 class sms_sts(protocol_packet_handler):
-    def __init__(self, portHandler):
+    def __init__(self, portHandler, shadow=False):
         protocol_packet_handler.__init__(self, portHandler, 0)
         self.groupSyncWrite = GroupSyncWrite(self, SMS_STS_ACC, 7)
 
+        # with shadow=True, reads of registers below SMS_STS_SHADOW_END are answered from a
+        # per-servo copy of the control table and writes only send the bytes that changed
+        self.shadow_enabled = shadow
+        self.shadows = {}
+        self.resetShadowStats()
+
+        # servos set to SMS_STS_RESPONSE_READ: their writes go out TxOnly and are checked
+        # afterwards with VerifyGoals()
+        self.no_ack_ids = set()
+        self.no_ack_goals = {}
+        self.no_ack_stats = {
+            'writes': 0,
+            'verified': 0,
+            'mismatches': 0,
+            'lost': 0,
+        }
+
+    def getShadow(self, scs_id):
+        shadow = self.shadows.get(scs_id)
+        if shadow is None:
+            shadow = self.shadows[scs_id] = ControlTableShadow()
+        return shadow
+
+    def isShadowed(self, scs_id, address, length):
+        return self.shadow_enabled and scs_id < BROADCAST_ID and address + length <= SMS_STS_SHADOW_END
+
+    def invalidateShadow(self, scs_id=None, address=None, length=None):
+        # drop cached registers of one servo (or of all servos with scs_id=None)
+        shadows = self.shadows.values() if scs_id is None else [self.shadows.get(scs_id)]
+        for shadow in shadows:
+            if shadow is not None:
+                shadow.invalidate(address, length)
+                self.shadow_stats['invalidations'] += 1
+
+    def resetShadowStats(self):
+        self.shadow_stats = {
+            'reads_avoided': 0,
+            'writes_avoided': 0,
+            'bytes_avoided': 0,
+            'invalidations': 0,
+        }
+
+    def getShadowStats(self):
+        return dict(self.shadow_stats)
+
+    def PrefetchShadow(self, scs_id):
+        # fill the whole shadow of one servo with a single read
+        if not self.shadow_enabled:
+            return COMM_NOT_AVAILABLE, 0
+        self.invalidateShadow(scs_id)
+        _, result, error = self.readTxRx(scs_id, 0, SMS_STS_SHADOW_END)
+        return result, error
+
+    def shadowWritten(self, scs_id, address, length, data):
+        # the write reached the servo: remember it, then apply the servo's own reaction to it
+        self.getShadow(scs_id).update(address, data[0: length])
+        self.shadowReacted(scs_id, address, length, data)
+
+    def shadowSent(self, scs_id, address, length, data):
+        # the write went out without a status packet (TxOnly, sync write): the frame may have
+        # been lost, so the bytes are not trusted until they are read back
+        self.invalidateShadow(scs_id, address, length)
+        self.shadowReacted(scs_id, address, length, data)
+
+    def shadowReacted(self, scs_id, address, length, data):
+        end = address + length
+        if address <= SMS_STS_ID < end or address <= SMS_STS_BAUD_RATE < end:
+            # the servo answers under a new ID / at a new baud rate from now on
+            self.invalidateShadow(scs_id)
+            self.invalidateShadow(data[SMS_STS_ID - address] if address <= SMS_STS_ID < end else scs_id)
+        elif address <= SMS_STS_TORQUE_ENABLE < end or address <= SMS_STS_MODE < end:
+            # enabling torque (and switching mode) makes the servo hold its present position,
+            # torque value 128 also recalibrates the position offset
+            self.invalidateShadow(scs_id, SMS_STS_GOAL_POSITION_L, 2)
+            self.invalidateShadow(scs_id, SMS_STS_OFS_L, 2)
+
+    def shadowChecked(self, scs_id, result, error):
+        if result == COMM_RX_TIMEOUT:
+            # power cycled or gone, nothing cached about it can be trusted any more
+            self.invalidateShadow(scs_id)
+        elif result == COMM_SUCCESS and error & SMS_STS_TORQUE_ERRORS:
+            self.invalidateShadow(scs_id, SMS_STS_TORQUE_ENABLE, 1)
+
+    def SetResponseLevel(self, scs_id, level):
+        # the register is written TxOnly since the servo may or may not acknowledge the write
+        # that switches its own response level, then it is read back; a status packet of the
+        # write (no parameters) arriving first is skipped
+        result = protocol_packet_handler.writeTxOnly(self, scs_id, SMS_STS_RESPONSE_LEVEL, 1, [level])
+        self.invalidateShadow(scs_id, SMS_STS_RESPONSE_LEVEL, 1)
+        if result != COMM_SUCCESS:
+            return result, 0
+
+        txpacket = self.bufferPacket(scs_id, INST_READ, (SMS_STS_RESPONSE_LEVEL, 1))
+        rxpacket, result, error = self.txRxPacket(txpacket)
+        if result == COMM_SUCCESS and rxpacket[PKT_LENGTH] != 3:
+            # that was the status packet of the write, the one of the read follows
+            rxpacket, result = self.rxPacket()
+            error = rxpacket[PKT_ERROR] if result == COMM_SUCCESS else 0
+        if result != COMM_SUCCESS:
+            return result, error
+        if rxpacket[PKT_LENGTH] != 3 or rxpacket[PKT_PARAMETER0] != level:
+            return COMM_RX_CORRUPT, error
+
+        if level == SMS_STS_RESPONSE_READ:
+            self.no_ack_ids.add(scs_id)
+        else:
+            self.no_ack_ids.discard(scs_id)
+            self.no_ack_goals.pop(scs_id, None)
+        return COMM_SUCCESS, error
+
+    def rememberGoal(self, scs_id, address, length, data):
+        if address <= SMS_STS_GOAL_POSITION_L and SMS_STS_GOAL_POSITION_H < address + length:
+            offset = SMS_STS_GOAL_POSITION_L - address
+            self.no_ack_goals[scs_id] = self.scs_makeword(data[offset], data[offset + 1])
+
+    def VerifyGoals(self, scs_ids=None):
+        # batched readback of the goal block of servos written without acknowledgement,
+        # returns {scs_id: COMM_* result}. A servo whose goal differs from the last one sent
+        # gets COMM_RX_CORRUPT and its shadowed goal block is dropped, so the next write is
+        # sent in full; a matching block is what the servo holds and goes into the shadow.
+        if scs_ids is None:
+            scs_ids = list(self.no_ack_goals)
+        scs_ids = [scs_id for scs_id in scs_ids if scs_id in self.no_ack_goals]
+        if not scs_ids:
+            return {}
+
+        groupSyncRead = GroupSyncRead(self, SMS_STS_ACC, SMS_STS_POS_EX.size)
+        for scs_id in scs_ids:
+            groupSyncRead.addParam(scs_id)
+        groupSyncRead.txRxPacket()
+
+        results = {}
+        for scs_id in scs_ids:
+            result = groupSyncRead.getResult(scs_id)
+            if result == COMM_SUCCESS:
+                self.no_ack_stats['verified'] += 1
+                goal = groupSyncRead.getData(scs_id, SMS_STS_GOAL_POSITION_L, 2)
+                if goal != self.no_ack_goals[scs_id] & 0xFFFF:
+                    self.no_ack_stats['mismatches'] += 1
+                    self.invalidateShadow(scs_id, SMS_STS_ACC, SMS_STS_POS_EX.size)
+                    result = COMM_RX_CORRUPT
+                elif self.shadow_enabled:
+                    self.getShadow(scs_id).update(SMS_STS_ACC, groupSyncRead.data_dict[scs_id])
+            else:
+                self.no_ack_stats['lost'] += 1
+                self.shadowChecked(scs_id, result, 0)
+            results[scs_id] = result
+        return results
+
+    def getNoAckStats(self):
+        return dict(self.no_ack_stats)
+
+    def readTxRx(self, scs_id, address, length):
+        if self.isShadowed(scs_id, address, length):
+            shadow = self.getShadow(scs_id)
+            if shadow.isValid(address, length):
+                self.shadow_stats['reads_avoided'] += 1
+                return shadow.get(address, length), COMM_SUCCESS, 0
+
+        data, result, error = protocol_packet_handler.readTxRx(self, scs_id, address, length)
+        if self.shadow_enabled and scs_id < BROADCAST_ID:
+            self.shadowChecked(scs_id, result, error)
+            if result == COMM_SUCCESS and self.isShadowed(scs_id, address, length):
+                self.getShadow(scs_id).update(address, data)
+        return data, result, error
+
+    def shadowWrite(self, scs_id, address, length, data, write):
+        # send only data[first..last], the span of bytes the servo does not hold yet
+        dirty = self.getShadow(scs_id).dirtyRange(address, data[0: length])
+        if dirty is None:
+            self.shadow_stats['writes_avoided'] += 1
+            self.shadow_stats['bytes_avoided'] += length
+            return None
+        first, last = dirty
+        self.shadow_stats['bytes_avoided'] += length - (last - first + 1)
+        return write(self, scs_id, address + first, last - first + 1, data[first: last + 1])
+
+    def writeTxRx(self, scs_id, address, length, data):
+        if scs_id in self.no_ack_ids:
+            # no status packet will come back
+            return self.writeTxOnly(scs_id, address, length, data), 0
+
+        if not self.isShadowed(scs_id, address, length):
+            result, error = protocol_packet_handler.writeTxRx(self, scs_id, address, length, data)
+            if self.shadow_enabled and scs_id < BROADCAST_ID:
+                self.shadowChecked(scs_id, result, error)
+            return result, error
+
+        reply = self.shadowWrite(scs_id, address, length, data, protocol_packet_handler.writeTxRx)
+        if reply is None:
+            return COMM_SUCCESS, 0
+        result, error = reply
+        if result == COMM_SUCCESS:
+            self.shadowWritten(scs_id, address, length, data)
+        else:
+            # unknown whether the servo applied it
+            self.invalidateShadow(scs_id, address, length)
+        self.shadowChecked(scs_id, result, error)
+        return result, error
+
+    def writeTxOnly(self, scs_id, address, length, data):
+        if scs_id in self.no_ack_ids:
+            self.no_ack_stats['writes'] += 1
+            self.rememberGoal(scs_id, address, length, data)
+
+        if not self.isShadowed(scs_id, address, length):
+            return protocol_packet_handler.writeTxOnly(self, scs_id, address, length, data)
+
+        result = self.shadowWrite(scs_id, address, length, data, protocol_packet_handler.writeTxOnly)
+        if result is None:
+            return COMM_SUCCESS
+        self.shadowSent(scs_id, address, length, data)
+        return result
+
+    def regWriteTxOnly(self, scs_id, address, length, data):
+        # registered writes only take effect on ACTION
+        self.invalidateShadow(scs_id, address, length)
+        return protocol_packet_handler.regWriteTxOnly(self, scs_id, address, length, data)
+
+    def regWriteTxRx(self, scs_id, address, length, data):
+        self.invalidateShadow(scs_id, address, length)
+        if scs_id in self.no_ack_ids:
+            return protocol_packet_handler.regWriteTxOnly(self, scs_id, address, length, data), 0
+        return protocol_packet_handler.regWriteTxRx(self, scs_id, address, length, data)
+
+    def syncWriteTxOnly(self, start_address, data_length, param, param_length):
+        result = protocol_packet_handler.syncWriteTxOnly(self, start_address, data_length, param, param_length)
+        if self.shadow_enabled:
+            for idx in range(0, param_length, data_length + 1):
+                scs_id = param[idx]
+                if scs_id in self.no_ack_ids:
+                    self.rememberGoal(scs_id, start_address, data_length, param[idx + 1: idx + 1 + data_length])
+                self.shadowSent(scs_id, start_address, data_length, param[idx + 1: idx + 1 + data_length])
+        return result
+
+    def packPosEx(self, position, speed, acc):
+        return SMS_STS_POS_EX.pack(acc & 0xFF, position & 0xFFFF, 0, speed & 0xFFFF)
+
     def WritePosEx(self, scs_id, position, speed, acc):
-        txpacket = [acc, self.scs_lobyte(position), self.scs_hibyte(position), 0, 0, self.scs_lobyte(speed), self.scs_hibyte(speed)]
+        txpacket = self.packPosEx(position, speed, acc)
         return self.writeTxRx(scs_id, SMS_STS_ACC, len(txpacket), txpacket)
 
     def ReadPos(self, scs_id):
@@ -84,12 +373,85 @@ class sms_sts(protocol_packet_handler):
         moving, scs_comm_result, scs_error = self.read1ByteTxRx(scs_id, SMS_STS_MOVING)
         return moving, scs_comm_result, scs_error
 
+    def ReadSnapshot(self, scs_id):
+        data, scs_comm_result, scs_error = self.readTxRx(scs_id, SMS_STS_PRESENT_POSITION_L, SMS_STS_SNAPSHOT_LEN)
+        if scs_comm_result != COMM_SUCCESS or len(data) < SMS_STS_SNAPSHOT_LEN:
+            return None, scs_comm_result, scs_error
+        return self.decodeSnapshot(data), scs_comm_result, scs_error
+
+    def SyncReadSnapshots(self, scs_ids):
+        # snapshots of several servos with one sync read: ({scs_id: ServoSnapshot}, {scs_id: result})
+        groupSyncRead = GroupSyncRead(self, SMS_STS_PRESENT_POSITION_L, SMS_STS_SNAPSHOT_LEN)
+        for scs_id in scs_ids:
+            groupSyncRead.addParam(scs_id)
+        groupSyncRead.txRxPacket()
+
+        snapshots = {}
+        results = {}
+        for scs_id in scs_ids:
+            results[scs_id] = groupSyncRead.getResult(scs_id)
+            if results[scs_id] == COMM_SUCCESS:
+                snapshots[scs_id] = self.decodeSnapshot(groupSyncRead.data_dict[scs_id])
+        return snapshots, results
+
+    def SyncWritePositions(self, positions):
+        # positions: {scs_id: (position, speed, acc)}, sent as one sync write so every axis starts
+        # at the same instant
+        groupSyncWrite = GroupSyncWrite(self, SMS_STS_ACC, SMS_STS_POS_EX.size)
+        for scs_id, (position, speed, acc) in positions.items():
+            groupSyncWrite.addParam(scs_id, self.packPosEx(position, speed, acc))
+        return groupSyncWrite.txPacket()
+
+    def SyncWritePosExReadSnapshots(self, positions, scs_ids=None):
+        # SyncWritePositions followed by one sync read of the snapshots of scs_ids (default: the
+        # servos written). Bus time grows only by the bytes per servo, not by round trips.
+        write_result = self.SyncWritePositions(positions)
+        snapshots, results = self.SyncReadSnapshots(list(positions) if scs_ids is None else scs_ids)
+        return write_result, snapshots, results
+
+    def decodeSnapshot(self, data, offset=0):
+        def at(address):
+            return data[offset + address - SMS_STS_PRESENT_POSITION_L]
+
+        def word(address):
+            return self.scs_makeword(at(address), at(address + 1))
+
+        return ServoSnapshot(
+            position=self.scs_tohost(word(SMS_STS_PRESENT_POSITION_L), 15),
+            speed=self.scs_tohost(word(SMS_STS_PRESENT_SPEED_L), 15),
+            load=self.scs_tohost(word(SMS_STS_PRESENT_LOAD_L), 10),
+            voltage=at(SMS_STS_PRESENT_VOLTAGE),
+            temperature=at(SMS_STS_PRESENT_TEMPERATURE),
+            moving=at(SMS_STS_MOVING),
+            current=self.scs_tohost(word(SMS_STS_PRESENT_CURRENT_L), 15))
+
+    def WritePosExReadSnapshot(self, scs_id, position, speed, acc):
+        # move and telemetry in one round trip: the move goes out as a single-entry sync write
+        # (no status packet) right in front of the snapshot read
+        posex = self.packPosEx(position, speed, acc)
+        param = bytearray((scs_id,))
+        param.extend(posex)
+        write_packet = self.makePacket(BROADCAST_ID, INST_SYNC_WRITE, (SMS_STS_ACC, len(posex)), param, len(param))
+        read_packet = self.makePacket(scs_id, INST_READ, (SMS_STS_PRESENT_POSITION_L, SMS_STS_SNAPSHOT_LEN))
+
+        (_, write_result, _), (rxpacket, read_result, error) = self.txRxBatch([write_packet, read_packet])
+        if scs_id in self.no_ack_ids:
+            self.rememberGoal(scs_id, SMS_STS_ACC, len(posex), posex)
+        if self.shadow_enabled:
+            self.shadowSent(scs_id, SMS_STS_ACC, len(posex), posex)
+            self.shadowChecked(scs_id, read_result, error)
+
+        snapshot = None
+        if read_result == COMM_SUCCESS:
+            snapshot = self.decodeSnapshot(rxpacket, PKT_PARAMETER0)
+        return write_result, snapshot, read_result, error
+
     def SyncWritePosEx(self, scs_id, position, speed, acc):
-        txpacket = [acc, self.scs_lobyte(position), self.scs_hibyte(position), 0, 0, self.scs_lobyte(speed), self.scs_hibyte(speed)]
+        txpacket = self.packPosEx(position, speed, acc)
         return self.groupSyncWrite.addParam(scs_id, txpacket)
 
     def RegWritePosEx(self, scs_id, position, speed, acc):
-        txpacket = [acc, self.scs_lobyte(position), self.scs_hibyte(position), 0, 0, self.scs_lobyte(speed), self.scs_hibyte(speed)]
+        txpacket = self.packPosEx(position, speed, acc)
         return self.regWriteTxRx(scs_id, SMS_STS_ACC, len(txpacket), txpacket)
 
     def RegAction(self):
@@ -103,6 +465,73 @@ class sms_sts(protocol_packet_handler):
         txpacket = [acc, 0, 0, 0, 0, self.scs_lobyte(speed), self.scs_hibyte(speed)]
         return self.writeTxRx(scs_id, SMS_STS_ACC, len(txpacket), txpacket)
 
+    def FindBaudRate(self, scs_id, baudrates=None):
+        # switch the port through `baudrates` (default: every rate the servo supports, fastest
+        # first) until scs_id answers a ping; returns the rate, or None with the port left at
+        # its original rate
+        if baudrates is None:
+            baudrates = sorted(SMS_STS_BAUD_RATES.values(), reverse=True)
+        original = self.portHandler.getBaudRate()
+        for baudrate in [original] + [b for b in baudrates if b != original]:
+            if not self.portHandler.setBaudRate(baudrate):
+                continue
+            _, result, _ = self.ping(scs_id)
+            if result == COMM_SUCCESS:
+                return baudrate
+        self.portHandler.setBaudRate(original)
+        return None
+
+    def ChangeBaudRate(self, scs_id, baudrate, retries=3):
+        # Moves scs_id and the port to `baudrate`: probe at the current rate, store the new rate
+        # in EEPROM, follow with the port and ping. If the servo stays silent at the new rate the
+        # old one is restored on both ends. Other servos on the bus are left at the old rate.
+        codes = dict((bps, code) for code, bps in SMS_STS_BAUD_RATES.items())
+        if baudrate not in codes:
+            return COMM_NOT_AVAILABLE, 0
+        original = self.portHandler.getBaudRate()
+        if baudrate == original:
+            return COMM_SUCCESS, 0
+
+        _, result, error = self.ping(scs_id)
+        if result != COMM_SUCCESS:
+            return result, error
+        # make sure the host can follow before the servo is touched
+        if not self.portHandler.setBaudRate(baudrate) or not self.portHandler.setBaudRate(original):
+            self.portHandler.setBaudRate(original)
+            return COMM_NOT_AVAILABLE, 0
+
+        result, error = self.unLockEprom(scs_id)
+        if result != COMM_SUCCESS:
+            return result, error
+        # the status packet, if any, would be sent at either rate; do not wait for it
+        result = self.writeTxOnly(scs_id, SMS_STS_BAUD_RATE, 1, [codes[baudrate]])
+        self.invalidateShadow(scs_id)
+        if result != COMM_SUCCESS:
+            self.LockEprom(scs_id)
+            return result, 0
+        time.sleep(0.01)
+
+        self.portHandler.setBaudRate(baudrate)
+        for _ in range(retries):
+            _, result, error = self.ping(scs_id)
+            if result == COMM_SUCCESS:
+                return self.LockEprom(scs_id)
+
+        # roll back: the servo either never switched, or switched and cannot be heard at the new
+        # rate; in the latter case send the old rate blindly at the new one
+        self.portHandler.setBaudRate(original)
+        _, result, error = self.ping(scs_id)
+        if result != COMM_SUCCESS and original in codes:
+            self.portHandler.setBaudRate(baudrate)
+            for _ in range(retries):
+                self.writeTxOnly(scs_id, SMS_STS_BAUD_RATE, 1, [codes[original]])
+            time.sleep(0.01)
+            self.portHandler.setBaudRate(original)
+            _, result, error = self.ping(scs_id)
+        if result == COMM_SUCCESS:
+            self.LockEprom(scs_id)
+        return COMM_RX_TIMEOUT, error
+
     def LockEprom(self, scs_id):
         return self.write1ByteTxRx(scs_id, SMS_STS_LOCK, 1)
 
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+from .scservo_def import *
+
+INSTRUCTION_NAMES = {
+    INST_PING: 'ping',
+    INST_READ: 'read',
+    INST_WRITE: 'write',
+    INST_REG_WRITE: 'reg_write',
+    INST_ACTION: 'action',
+    INST_SYNC_READ: 'sync_read',
+    INST_SYNC_WRITE: 'sync_write',
+}
+
+RESULT_NAMES = {
+    COMM_SUCCESS: 'success',
+    COMM_PORT_BUSY: 'port_busy',
+    COMM_TX_FAIL: 'tx_fail',
+    COMM_RX_FAIL: 'rx_fail',
+    COMM_TX_ERROR: 'tx_error',
+    COMM_RX_WAITING: 'rx_waiting',
+    COMM_RX_TIMEOUT: 'rx_timeout',
+    COMM_RX_CORRUPT: 'rx_corrupt',
+    COMM_NOT_AVAILABLE: 'not_available',
+}
+
+LOG_HISTOGRAM_SUB_BITS = 5  # 16 sub-buckets per power of two, ~6% resolution
+
+
+class LogHistogram(object):
+    # HdrHistogram-style log-linear histogram of non-negative integers (here: microseconds).
+    # Values below 2**SUB_BITS are exact; above, every power of two is split into
+    # 2**(SUB_BITS-1) buckets, so recording is a couple of integer operations and a dict update.
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max = 0
+
+    def bucketOf(self, value):
+        shift = value.bit_length() - LOG_HISTOGRAM_SUB_BITS
+        if shift <= 0:
+            return value
+        return (shift << (LOG_HISTOGRAM_SUB_BITS - 1)) + (value >> shift)
+
+    def lowestOf(self, bucket):
+        half = 1 << (LOG_HISTOGRAM_SUB_BITS - 1)
+        if bucket < 2 * half:
+            return bucket
+        shift = (bucket >> (LOG_HISTOGRAM_SUB_BITS - 1)) - 1
+        return (bucket - shift * half) << shift
+
+    def record(self, value):
+        value = int(value)
+        bucket = self.bucketOf(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        rank = max(1, int(round(self.total * p / 100.0)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.lowestOf(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.total,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class TransactionStats(object):
+    # Observer for protocol_packet_handler.addObserver(): counts transactions per instruction
+    # and result, bytes on the wire, and keeps tx / wait / rx time histograms (microseconds).
+    # tx: writing the instruction packet, wait: until the first status byte, rx: rest of the
+    # status packet.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.busy = 0.0
+            self.tx_bytes = 0
+            self.rx_bytes = 0
+            self.instructions = {}
+            self.servos = {}
+
+    def onTransaction(self, instruction, scs_id, tx_bytes, rx_bytes, tx_time, wait_time, rx_time, result):
+        with self.lock:
+            self.busy += tx_time + wait_time + rx_time
+            self.tx_bytes += tx_bytes
+            self.rx_bytes += rx_bytes
+
+            entry = self.instructions.get(instruction)
+            if entry is None:
+                entry = self.instructions[instruction] = {
+                    'results': {},
+                    'tx': LogHistogram(),
+                    'wait': LogHistogram(),
+                    'rx': LogHistogram(),
+                }
+            entry['results'][result] = entry['results'].get(result, 0) + 1
+            entry['tx'].record(tx_time * 1000000.0)
+            entry['wait'].record(wait_time * 1000000.0)
+            entry['rx'].record(rx_time * 1000000.0)
+
+            servo = self.servos.get(scs_id)
+            if servo is None:
+                servo = self.servos[scs_id] = {}
+            servo[result] = servo.get(result, 0) + 1
+
+    def getStats(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            instructions = {}
+            for instruction, entry in self.instructions.items():
+                instructions[INSTRUCTION_NAMES.get(instruction, str(instruction))] = {
+                    'results': dict((RESULT_NAMES.get(r, str(r)), n) for r, n in entry['results'].items()),
+                    'tx_us': entry['tx'].summary(),
+                    'wait_us': entry['wait'].summary(),
+                    'rx_us': entry['rx'].summary(),
+                }
+            servos = {}
+            for scs_id, results in self.servos.items():
+                servos[str(scs_id)] = dict((RESULT_NAMES.get(r, str(r)), n) for r, n in results.items())
+            return {
+                'elapsed_s': round(elapsed, 3),
+                'utilization': round(self.busy / elapsed, 4) if elapsed > 0 else 0.0,
+                'tx_bytes': self.tx_bytes,
+                'rx_bytes': self.rx_bytes,
+                'instructions': instructions,
+                'servos': servos,
+            }
@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+#
+# Virtual SMS/STS servos behind a pseudo-terminal (POSIX only).
+#
+#   bus = VirtualServoBus(ids=(1,), link='/tmp/servo')
+#   bus.start()
+#   portHandler = PortHandler(bus.port_name)      # or PortHandler('/tmp/servo')
+#
+# or from a shell: python -m scservo_sdk.virtual_servo --link /dev/servo --id 1
+#
+
+import argparse
+import math
+import os
+import random
+import select
+import termios
+import threading
+import time
+import tty
+
+from .scservo_def import *
+from .protocol_packet_handler import *
+from .sms_sts import *
+
+VIRTUAL_SERVO_MODEL = 777  # STS3215
+VIRTUAL_SERVO_MAX_SPEED = 3400.0  # steps/s with GOAL_SPEED = 0
+VIRTUAL_SERVO_ACC_UNIT = 100.0  # steps/s^2 per ACC unit, ACC = 0 is the maximum below
+VIRTUAL_SERVO_MAX_ACC = 254 * VIRTUAL_SERVO_ACC_UNIT
+VIRTUAL_SERVO_STEP = 0.001  # motion integration step, s
+
+
+class VirtualServo(object):
+    # One servo: a full control table plus a trapezoidal speed/acceleration motion model.
+    # The model is advanced lazily, up to the time of each instruction.
+    def __init__(self, scs_id, position=2048, position_noise=0.0):
+        self.table = bytearray(256)
+        self.position = float(position)
+        self.velocity = 0.0
+        self.accel = 0.0
+        self.position_noise = position_noise
+        self.reg_write = None
+        self.last_time = time.monotonic()
+
+        t = self.table
+        t[SMS_STS_MODEL_L] = VIRTUAL_SERVO_MODEL & 0xFF
+        t[SMS_STS_MODEL_H] = VIRTUAL_SERVO_MODEL >> 8
+        t[SMS_STS_ID] = scs_id
+        t[SMS_STS_BAUD_RATE] = SMS_STS_1M
+        t[SMS_STS_RESPONSE_LEVEL] = SMS_STS_RESPONSE_ALL
+        t[SMS_STS_MAX_ANGLE_LIMIT_L] = 0xFF
+        t[SMS_STS_MAX_ANGLE_LIMIT_H] = 0x0F
+        t[SMS_STS_LOCK] = 1
+        t[SMS_STS_PRESENT_VOLTAGE] = 120
+        t[SMS_STS_PRESENT_TEMPERATURE] = 30
+        self.setWord(SMS_STS_GOAL_POSITION_L, position)
+        self.updateTelemetry()
+
+    def getWord(self, address):
+        return self.table[address] | (self.table[address + 1] << 8)
+
+    def setWord(self, address, value):
+        self.table[address] = value & 0xFF
+        self.table[address + 1] = (value >> 8) & 0xFF
+
+    def getSigned(self, address, bit):
+        value = self.getWord(address)
+        if value & (1 << bit):
+            return -(value & ~(1 << bit))
+        return value
+
+    def setSigned(self, address, value, bit):
+        value = int(round(value))
+        self.setWord(address, (-value) | (1 << bit) if value < 0 else value)
+
+    @property
+    def scs_id(self):
+        return self.table[SMS_STS_ID]
+
+    def advance(self, now):
+        dt = now - self.last_time
+        self.last_time = now
+        while dt > 0:
+            h = min(dt, VIRTUAL_SERVO_STEP)
+            if not self.step(h):
+                break  # at rest, nothing left to integrate
+            dt -= h
+
+    def step(self, h):
+        t = self.table
+        if not t[SMS_STS_TORQUE_ENABLE]:
+            self.velocity = 0.0
+            self.accel = 0.0
+            return False
+
+        max_acc = t[SMS_STS_ACC] * VIRTUAL_SERVO_ACC_UNIT or VIRTUAL_SERVO_MAX_ACC
+        if t[SMS_STS_MODE] == 1:
+            # wheel mode: GOAL_SPEED is a signed velocity
+            target = float(self.getSigned(SMS_STS_GOAL_SPEED_L, 15))
+            goal = None
+        else:
+            goal = self.getSigned(SMS_STS_GOAL_POSITION_L, 15)
+            min_limit = self.getWord(SMS_STS_MIN_ANGLE_LIMIT_L)
+            max_limit = self.getWord(SMS_STS_MAX_ANGLE_LIMIT_L)
+            if max_limit > min_limit:
+                goal = max(min_limit, min(max_limit, goal))
+            max_speed = abs(self.getSigned(SMS_STS_GOAL_SPEED_L, 15)) or VIRTUAL_SERVO_MAX_SPEED
+            distance = goal - self.position
+            if distance == 0 and self.velocity == 0:
+                self.accel = 0.0
+                return False
+            # fastest speed from which the servo can still stop at the goal
+            target = math.copysign(min(max_speed, math.sqrt(2.0 * max_acc * abs(distance))), distance)
+
+        dv = max(-max_acc * h, min(max_acc * h, target - self.velocity))
+        self.velocity += dv
+        self.accel = dv / h
+        previous = self.position
+        self.position += self.velocity * h
+
+        if goal is not None and (previous - goal) * (self.position - goal) <= 0 and abs(self.velocity) <= max_acc * h * 2:
+            self.position = float(goal)
+            self.velocity = 0.0
+        if goal is None:
+            self.position %= 4096
+        return True
+
+    def updateTelemetry(self):
+        t = self.table
+        position = self.position
+        if self.position_noise:
+            position += random.gauss(0.0, self.position_noise)
+        self.setSigned(SMS_STS_PRESENT_POSITION_L, position, 15)
+        self.setSigned(SMS_STS_PRESENT_SPEED_L, self.velocity, 15)
+        load = max(-1000, min(1000, self.accel / VIRTUAL_SERVO_MAX_ACC * 1000.0))
+        self.setSigned(SMS_STS_PRESENT_LOAD_L, load, 10)
+        self.setSigned(SMS_STS_PRESENT_CURRENT_L, abs(load) / 4.0, 15)
+        moving = self.velocity != 0.0
+        if not moving and t[SMS_STS_TORQUE_ENABLE] and t[SMS_STS_MODE] == 0:
+            moving = int(round(self.position)) != self.getSigned(SMS_STS_GOAL_POSITION_L, 15)
+        t[SMS_STS_MOVING] = 1 if moving else 0
+
+    def read(self, address, length, now):
+        self.advance(now)
+        self.updateTelemetry()
+        return self.table[address: address + length]
+
+    def write(self, address, data, now):
+        self.advance(now)
+        end = address + len(data)
+        torque_before = self.table[SMS_STS_TORQUE_ENABLE]
+        self.table[address: end] = data
+        if address <= SMS_STS_TORQUE_ENABLE < end and self.table[SMS_STS_TORQUE_ENABLE] and not torque_before:
+            # enabling torque holds the present position
+            self.setSigned(SMS_STS_GOAL_POSITION_L, self.position, 15)
+
+
+class VirtualServoBus(object):
+    # Serves one or more VirtualServo over the master side of a pty; the slave side is a
+    # regular tty for PortHandler. Faults: `latency` (s) before each status packet,
+    # `corrupt_rate` of status packets with a broken checksum, `drop_rate` of instruction
+    # packets left unanswered. With check_baud the servos ignore the host unless its tty runs
+    # at their SMS_STS_BAUD_RATE (rates without a termios constant are not checked).
+    def __init__(self, ids=(1,), latency=0.0, position_noise=0.0, corrupt_rate=0.0, drop_rate=0.0,
+                 check_baud=False, link=None, seed=None):
+        self.servos = dict((scs_id, VirtualServo(scs_id, position_noise=position_noise)) for scs_id in ids)
+        self.latency = latency
+        self.corrupt_rate = corrupt_rate
+        self.drop_rate = drop_rate
+        self.check_baud = check_baud
+        self.link = link
+        self.random = random.Random(seed)
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port_name = os.ttyname(self.slave)
+        if link is not None:
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(self.port_name, link)
+
+        self.stats = {
+            'packets': 0,
+            'bad_checksum': 0,
+            'replies': 0,
+            'corrupted': 0,
+            'dropped': 0,
+        }
+        self.rxbuf = bytearray()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='virtual-servo')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.link is not None and os.path.islink(self.link):
+            os.unlink(self.link)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def getServo(self, scs_id):
+        for servo in self.servos.values():
+            if servo.scs_id == scs_id:
+                return servo
+        return None
+
+    def run(self):
+        while self.running:
+            readable, _, _ = select.select([self.master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                self.rxbuf.extend(os.read(self.master, 1024))
+            except OSError:
+                break
+            while self.parse():
+                pass
+
+    def parse(self):
+        rxbuf = self.rxbuf
+        idx = rxbuf.find(PACKET_HEADER)
+        if idx < 0:
+            del rxbuf[:-1]
+            return False
+        del rxbuf[:idx]
+        if len(rxbuf) < 4 or len(rxbuf) < rxbuf[PKT_LENGTH] + 4:
+            return False
+
+        length = rxbuf[PKT_LENGTH] + 4
+        packet = bytes(rxbuf[:length])
+        if length < 6 or packet[-1] != ~sum(packet[2:-1]) & 0xFF:
+            # not a packet after all, resync on the next header
+            self.stats['bad_checksum'] += 1
+            del rxbuf[:2]
+            return True
+        del rxbuf[:length]
+
+        self.stats['packets'] += 1
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.stats['dropped'] += 1
+            return True
+        self.handle(packet[PKT_ID], packet[PKT_INSTRUCTION], packet[PKT_PARAMETER0:-1], time.monotonic())
+        return True
+
+    def isListening(self, servo):
+        if not self.check_baud:
+            return True
+        expected = getattr(termios, 'B%d' % SMS_STS_BAUD_RATES.get(servo.table[SMS_STS_BAUD_RATE], 0), None)
+        speed = termios.tcgetattr(self.slave)[4]
+        return expected is None or speed == getattr(termios, 'BOTHER', None) or speed == expected
+
+    def handle(self, scs_id, instruction, params, now):
+        if instruction == INST_SYNC_READ:
+            address, length = params[0], params[1]
+            for target in params[2:]:
+                servo = self.getServo(target)
+                if servo is not None and self.isListening(servo):
+                    self.reply(servo, servo.read(address, length, now))
+            return
+
+        if instruction == INST_SYNC_WRITE:
+            address, length = params[0], params[1]
+            for idx in range(2, len(params) - length, length + 1):
+                servo = self.getServo(params[idx])
+                if servo is not None and self.isListening(servo):
+                    servo.write(address, params[idx + 1: idx + 1 + length], now)
+            return
+
+        servos = list(self.servos.values()) if scs_id == BROADCAST_ID else [self.getServo(scs_id)]
+        for servo in servos:
+            if servo is None or not self.isListening(servo):
+                continue
+            ack = scs_id != BROADCAST_ID and servo.table[SMS_STS_RESPONSE_LEVEL] != SMS_STS_RESPONSE_READ
+            if instruction == INST_PING:
+                if scs_id != BROADCAST_ID:
+                    self.reply(servo)
+            elif instruction == INST_READ:
+                if scs_id != BROADCAST_ID:
+                    self.reply(servo, servo.read(params[0], params[1], now))
+            elif instruction == INST_WRITE:
+                # the status packet leaves before a new ID / baud rate takes effect
+                if ack:
+                    self.reply(servo)
+                servo.write(params[0], params[1:], now)
+            elif instruction == INST_REG_WRITE:
+                servo.reg_write = (params[0], bytes(params[1:]))
+                if ack:
+                    self.reply(servo)
+            elif instruction == INST_ACTION:
+                if servo.reg_write is not None:
+                    servo.write(servo.reg_write[0], servo.reg_write[1], now)
+                    servo.reg_write = None
+                if ack:
+                    self.reply(servo)
+
+    def reply(self, servo, params=b''):
+        if self.latency:
+            time.sleep(self.latency)
+        packet = bytearray((0xFF, 0xFF, servo.scs_id, len(params) + 2, 0))
+        packet.extend(params)
+        packet.append(~sum(packet[2:]) & 0xFF)
+        if self.corrupt_rate and self.random.random() < self.corrupt_rate:
+            packet[-1] ^= 0xFF
+            self.stats['corrupted'] += 1
+        self.stats['replies'] += 1
+        os.write(self.master, packet)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual SMS/STS servo bus on a pseudo-terminal")
+    parser.add_argument('--id', type=int, action='append', dest='ids', help="servo ID (repeatable, default 1)")
+    parser.add_argument('--link', help="symlink to the pty, e.g. /dev/servo")
+    parser.add_argument('--latency', type=float, default=0.0, help="delay before each status packet, s")
+    parser.add_argument('--noise', type=float, default=0.0, help="present position noise, steps (std dev)")
+    parser.add_argument('--corrupt', type=float, default=0.0, help="fraction of status packets with a bad checksum")
+    parser.add_argument('--drop', type=float, default=0.0, help="fraction of instruction packets left unanswered")
+    parser.add_argument('--check-baud', action='store_true', help="ignore the host at a different baud rate")
+    args = parser.parse_args()
+
+    bus = VirtualServoBus(ids=args.ids or (1,), latency=args.latency, position_noise=args.noise,
+                          corrupt_rate=args.corrupt, drop_rate=args.drop, check_baud=args.check_baud,
+                          link=args.link)
+    bus.start()
+    print("Virtual servo bus on %s%s, IDs %s" % (
+        bus.port_name, " (%s)" % args.link if args.link else "", sorted(bus.servos)))
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.stop()
+        print(bus.stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+#
+# *********     Packet codec microbenchmark      *********
+#
+# Measures how many ReadPos / ReadSnapshot / WritePosEx transactions per second the packet
+# layer can encode and decode, without a servo: the port is an in-memory
+# loopback that answers every instruction packet immediately.
+# "legacy" is the list-based codec the SDK used before (a new list per packet,
+# per-byte checksum and header search loops); "current" is the SDK as it is now,
+# built in the handler's tx buffer and parsed in its rx buffer, with everything else
+# it does per transaction (register shadow, latency tracking).
+# reads/packet counts readPort() calls; each is a poll + read system call on a real
+# port, which the loopback does not charge for.
+#
+
+import sys
+import time
+
+sys.path.append("..")
+from scservo_sdk import *                   # Uses SC Servo SDK library
+
+SCS_ID = 1
+BATCH = 1000                                # transactions per timed batch
+REPEAT = 50                                 # batches per measurement
+ROUNDS = 3
+
+
+class LoopbackPort(object):
+    def __init__(self):
+        self.is_using = False
+        self.table = bytearray(256)
+        self.table[SMS_STS_PRESENT_POSITION_L] = 0xFF
+        self.table[SMS_STS_PRESENT_POSITION_H] = 0x07
+        self.pending = b''
+        self.reads = 0
+
+    def clearPort(self):
+        pass
+
+    def writePort(self, packet):
+        packet = bytes(packet)
+        scs_id, instruction = packet[PKT_ID], packet[PKT_INSTRUCTION]
+        if instruction == INST_READ:
+            address, length = packet[PKT_PARAMETER0], packet[PKT_PARAMETER0 + 1]
+            params = bytes(self.table[address:address + length])
+        else:
+            params = b''
+        status = bytearray([0xFF, 0xFF, scs_id, len(params) + 2, 0]) + params + b'\x00'
+        status[-1] = ~sum(status[2:-1]) & 0xFF
+        self.pending = bytes(status)
+        return len(packet)
+
+    def readPort(self, length):
+        # every call is a poll + read on a real port
+        self.reads += 1
+        data, self.pending = self.pending[:length], self.pending[length:]
+        return data
+
+    def setPacketTimeout(self, packet_length, scs_id=None):
+        pass
+
+    def recordLatency(self, scs_id, packet_length):
+        pass
+
+    def recordTimeout(self, scs_id):
+        pass
+
+    def isPacketTimeout(self):
+        return True
+
+
+class LegacyHandler(sms_sts):
+    # the list-based codec as it was, down to txRxPacket(): only the register
+    # decoding (scs_makeword, decodeSnapshot) is shared with the current handler
+    def WritePosEx(self, scs_id, position, speed, acc):
+        txpacket = [acc, self.scs_lobyte(position), self.scs_hibyte(position), 0, 0, self.scs_lobyte(speed), self.scs_hibyte(speed)]
+        return self.writeTxRx(scs_id, SMS_STS_ACC, len(txpacket), txpacket)
+
+    def readTxRx(self, scs_id, address, length):
+        txpacket = [0] * 8
+        data = []
+
+        if scs_id >= BROADCAST_ID:
+            return data, COMM_NOT_AVAILABLE, 0
+
+        txpacket[PKT_ID] = scs_id
+        txpacket[PKT_LENGTH] = 4
+        txpacket[PKT_INSTRUCTION] = INST_READ
+        txpacket[PKT_PARAMETER0 + 0] = address
+        txpacket[PKT_PARAMETER0 + 1] = length
+
+        rxpacket, result, error = self.txRxPacket(txpacket)
+        if result == COMM_SUCCESS:
+            error = rxpacket[PKT_ERROR]
+            data.extend(rxpacket[PKT_PARAMETER0 : PKT_PARAMETER0+length])
+
+        return data, result, error
+
+    def writeTxRx(self, scs_id, address, length, data):
+        txpacket = [0] * (length + 7)
+
+        txpacket[PKT_ID] = scs_id
+        txpacket[PKT_LENGTH] = length + 3
+        txpacket[PKT_INSTRUCTION] = INST_WRITE
+        txpacket[PKT_PARAMETER0] = address
+
+        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+
+        rxpacket, result, error = self.txRxPacket(txpacket)
+
+        return result, error
+
+    def txPacket(self, txpacket):
+        checksum = 0
+        total_packet_length = txpacket[PKT_LENGTH] + 4
+
+        if self.portHandler.is_using:
+            return COMM_PORT_BUSY
+        self.portHandler.is_using = True
+
+        if total_packet_length > TXPACKET_MAX_LEN:
+            self.portHandler.is_using = False
+            return COMM_TX_ERROR
+
+        txpacket[PKT_HEADER0] = 0xFF
+        txpacket[PKT_HEADER1] = 0xFF
+        for idx in range(2, total_packet_length - 1):
+            checksum += txpacket[idx]
+        txpacket[total_packet_length - 1] = ~checksum & 0xFF
+
+        self.portHandler.clearPort()
+        written_packet_length = self.portHandler.writePort(txpacket)
+        if total_packet_length != written_packet_length:
+            self.portHandler.is_using = False
+            return COMM_TX_FAIL
+
+        return COMM_SUCCESS
+
+    def rxPacket(self):
+        rxpacket = []
+        result = COMM_TX_FAIL
+        checksum = 0
+        rx_length = 0
+        wait_length = 6
+
+        while True:
+            rxpacket.extend(self.portHandler.readPort(wait_length - rx_length))
+            rx_length = len(rxpacket)
+            if rx_length >= wait_length:
+                for idx in range(0, (rx_length - 1)):
+                    if (rxpacket[idx] == 0xFF) and (rxpacket[idx + 1] == 0xFF):
+                        break
+
+                if idx == 0:
+                    if (rxpacket[PKT_ID] > 0xFD) or (rxpacket[PKT_LENGTH] > RXPACKET_MAX_LEN) or (
+                            rxpacket[PKT_ERROR] > 0x7F):
+                        del rxpacket[0]
+                        rx_length -= 1
+                        continue
+
+                    if wait_length != (rxpacket[PKT_LENGTH] + PKT_LENGTH + 1):
+                        wait_length = rxpacket[PKT_LENGTH] + PKT_LENGTH + 1
+                        continue
+
+                    if rx_length < wait_length:
+                        if self.portHandler.isPacketTimeout():
+                            result = COMM_RX_TIMEOUT if rx_length == 0 else COMM_RX_CORRUPT
+                            break
+                        else:
+                            continue
+
+                    for i in range(2, wait_length - 1):
+                        checksum += rxpacket[i]
+                    checksum = ~checksum & 0xFF
+
+                    result = COMM_SUCCESS if rxpacket[wait_length - 1] == checksum else COMM_RX_CORRUPT
+                    break
+                else:
+                    del rxpacket[0: idx]
+                    rx_length -= idx
+            else:
+                if self.portHandler.isPacketTimeout():
+                    result = COMM_RX_TIMEOUT if rx_length == 0 else COMM_RX_CORRUPT
+                    break
+
+        self.portHandler.is_using = False
+        return rxpacket, result
+
+    def txRxPacket(self, txpacket):
+        rxpacket = None
+        error = 0
+
+        result = self.txPacket(txpacket)
+        if result != COMM_SUCCESS:
+            return rxpacket, result, error
+
+        if (txpacket[PKT_ID] == BROADCAST_ID):
+            self.portHandler.is_using = False
+            return rxpacket, result, error
+
+        if txpacket[PKT_INSTRUCTION] == INST_READ:
+            self.portHandler.setPacketTimeout(txpacket[PKT_PARAMETER0 + 1] + 6)
+        else:
+            self.portHandler.setPacketTimeout(6)
+
+        while True:
+            rxpacket, result = self.rxPacket()
+            if result != COMM_SUCCESS or txpacket[PKT_ID] == rxpacket[PKT_ID]:
+                break
+
+        if result == COMM_SUCCESS and txpacket[PKT_ID] == rxpacket[PKT_ID]:
+            error = rxpacket[PKT_ERROR]
+
+        return rxpacket, result, error
+
+
+def measure(packetHandler, transaction):
+    # fastest of REPEAT batches: the least disturbed by the rest of the machine
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for _ in range(BATCH):
+            transaction(packetHandler)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return BATCH / best
+
+
+def compare(transaction):
+    # best of ROUNDS alternating measurements, so that both sides see the same machine load
+    handlers = (("legacy", LegacyHandler(LoopbackPort())), ("current", sms_sts(LoopbackPort())))
+    rates = dict((name, 0.0) for name, _ in handlers)
+    for _ in range(ROUNDS):
+        for name, packetHandler in handlers:
+            rates[name] = max(rates[name], measure(packetHandler, transaction))
+    for name, packetHandler in handlers:
+        packetHandler.portHandler.reads = 0
+        transaction(packetHandler)
+        print("%-10s %-12s %10.0f packets/s %6d reads/packet" % (
+            name, transaction.__name__, rates[name], packetHandler.portHandler.reads))
+    print("%-10s %-12s %10.2fx" % ("speedup", transaction.__name__, rates["current"] / rates["legacy"]))
+
+
+def ReadPos(packetHandler):
+    packetHandler.ReadPos(SCS_ID)
+
+
+def ReadSnapshot(packetHandler):
+    packetHandler.ReadSnapshot(SCS_ID)
+
+
+def WritePosEx(packetHandler):
+    packetHandler.WritePosEx(SCS_ID, 2047, 500, 50)
+
+
+for transaction in (ReadPos, ReadSnapshot, WritePosEx):
+    compare(transaction)
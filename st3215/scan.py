@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+#
+# *********     Scan Example      *********
+#
+#
+# Lists every servo on the bus (ID, model number, firmware version) with one sweep of
+# back-to-back pings over IDs 0..252.
+# Available ST Servo model on this example : All models using Protocol ST
+# This example is tested with a ST Servo(ST3215/ST3020/ST3025), and an URT
+#
+
+import sys
+import os
+import time
+
+if os.name == 'nt':
+    import msvcrt
+    def getch():
+        return msvcrt.getch().decode()
+else:
+    import sys, tty, termios
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    def getch():
+        try:
+            tty.setraw(sys.stdin.fileno())
+            ch = sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        return ch
+
+sys.path.append("..")
+from scservo_sdk import *                   # Uses SC Servo SDK library
+
+# Default setting
+BAUDRATE                = 1000000           # SCServo default baudrate : 1000000
+DEVICENAME              = '/dev/ttyUSB0'    # Check which port is being used on your controller
+                                            # ex) Windows: "COM1"   Linux: "/dev/ttyUSB0" Mac: "/dev/tty.usbserial-*"
+
+# Initialize PortHandler instance
+# Set the port path
+# Get methods and members of PortHandlerLinux or PortHandlerWindows
+portHandler = PortHandler(DEVICENAME)
+
+# Initialize PacketHandler instance
+# Get methods and members of Protocol
+packetHandler = sms_sts(portHandler)
+# Open port
+if portHandler.openPort():
+    print("Succeeded to open the port")
+else:
+    print("Failed to open the port")
+    print("Press any key to terminate...")
+    getch()
+    quit()
+
+
+# Set port baudrate
+if portHandler.setBaudRate(BAUDRATE):
+    print("Succeeded to change the baudrate")
+else:
+    print("Failed to change the baudrate")
+    print("Press any key to terminate...")
+    getch()
+    quit()
+
+# Sweep the ID space
+start = time.time()
+servos = packetHandler.scanBus()
+print("Scan took %.3f s, %d servo(s) found" % (time.time() - start, len(servos)))
+for scs_id, (scs_model_number, firmware_major, firmware_minor) in sorted(servos.items()):
+    print("[ID:%03d] SCServo model number : %d, firmware : %d.%d" % (scs_id, scs_model_number, firmware_major, firmware_minor))
+
+# Close port
+portHandler.closePort()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#
+# async_sms_sts against VirtualServoBus (pty, POSIX event loop)
+#
+
+import asyncio
+
+from scservo_sdk import *
+from scservo_sdk.virtual_servo import VirtualServoBus, VIRTUAL_SERVO_MODEL
+
+
+def run_on_bus(ids, coroutine):
+    # runs coroutine(packetHandler) with the port open inside the event loop
+    bus = VirtualServoBus(ids=ids, seed=1).start()
+
+    async def main():
+        port = AsyncPortHandler(bus.port_name)
+        assert port.openPort()
+        try:
+            return await coroutine(async_sms_sts(port))
+        finally:
+            port.closePort()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        bus.stop()
+
+
+def test_ping():
+    async def ping(packetHandler):
+        return await packetHandler.ping(1), await packetHandler.ping(2)
+
+    (model_number, result, error), (_, missing_result, _) = run_on_bus((1,), ping)
+    assert (model_number, result, error) == (VIRTUAL_SERVO_MODEL, COMM_SUCCESS, 0)
+    assert missing_result == COMM_RX_TIMEOUT
+
+
+def test_read():
+    async def read(packetHandler):
+        result, error = await packetHandler.write1ByteTxRx(1, SMS_STS_TORQUE_ENABLE, 1)
+        assert result == COMM_SUCCESS
+        result, error = await packetHandler.WritePosEx(1, 1500, 0, 0)
+        assert result == COMM_SUCCESS
+        return (await packetHandler.read2ByteTxRx(1, SMS_STS_GOAL_POSITION_L),
+                await packetHandler.ReadPos(1),
+                await packetHandler.ReadSnapshot(1))
+
+    (goal, result, _), (position, pos_result, _), (snapshot, snap_result, _) = run_on_bus((1,), read)
+    assert (goal, result) == (1500, COMM_SUCCESS)
+    assert pos_result == COMM_SUCCESS
+    assert 1500 <= position <= 2048
+    assert snap_result == COMM_SUCCESS
+    assert snapshot.voltage == 120
+
+
+def test_sync_read_missing_servo():
+    async def sync_read(packetHandler):
+        return await packetHandler.SyncRead(SMS_STS_PRESENT_POSITION_L, 2, [1, 2, 3])
+
+    data, results = run_on_bus((1, 3), sync_read)
+    assert results == {1: COMM_SUCCESS, 2: COMM_RX_TIMEOUT, 3: COMM_SUCCESS}
+    assert sorted(data) == [1, 3]
+    assert data[1][0] | (data[1][1] << 8) == 2048
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+#
+# ProfileStore / MonopulseTable against a damaged profile file
+#
+
+import json
+
+from monopulse import MonopulseTable
+from profile_store import ProfileStore, PROFILE_VERSION
+
+
+def test_corrupt_sections_dropped(tmp_path):
+    path = tmp_path / 'tracker_profile.json'
+    path.write_text(json.dumps({
+        'version': PROFILE_VERSION,
+        'calibration': {'rssi_offset': 3.5},
+        'monopulse': [1, 2, 3],
+        'last_scan': ['scan'],
+        'bearing': {'position': 2048, 'time': 'yesterday'},
+    }))
+    data = ProfileStore(str(path)).load()
+    assert data['calibration'] == {'rssi_offset': 3.5}
+    assert 'monopulse' not in data
+    assert 'last_scan' not in data
+    assert 'bearing' not in data
+
+
+def test_bearing_kept(tmp_path):
+    store = ProfileStore(str(tmp_path / 'tracker_profile.json'))
+    assert store.save({'bearing': {'position': 2048, 'time': 1700000000.0}})
+    assert store.load()['bearing'] == {'position': 2048, 'time': 1700000000.0}
+
+
+def test_monopulse_table_rejects_bad_entries():
+    table = MonopulseTable()
+    good = {'differences': [-10.0, 0.0, 10.0], 'offsets': [-50.0, 0.0, 50.0]}
+    assert not table.load([1, 2, 3])
+    assert not table.load({'differences': ['a', 'b'], 'offsets': [1.0, 2.0]})
+    assert not table.load({'differences': [0.0, True], 'offsets': [1.0, 2.0]})
+    assert not table.load({'differences': 'ab', 'offsets': 'cd'})
+    assert not table.load(dict(good, timestamp='now'))
+    assert table.load(good)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+#
+# Auto-tracking controllers: timers start only when the tracker confirms the move
+#
+
+from monopulse import MonopulseTable
+from tracking_controller import StepController, MonopulseController
+
+
+def test_step_rejected_move_retried():
+    controller = StepController(threshold=15, deadband=0, cooldown=0.1)
+    assert controller.update(1000, 0, 2048, 10.0) == (2048 - controller.step_large, controller.speed + 400)
+    # move_servo failed, no confirm(): the command comes again on the next tick
+    assert controller.update(1000, 0, 2048, 10.02) is not None
+
+    controller.confirm(10.02)
+    assert controller.update(1000, 0, 2004, 10.04) is None
+    assert controller.update(1000, 0, 2004, 10.13) is not None
+
+
+def test_monopulse_hold_after_confirm():
+    controller = MonopulseController(MonopulseTable())
+    command = controller.update(1500, 500, 2048, 10.0)
+    assert command is not None and command[0] < 2048
+    assert controller.update(1500, 500, 2048, 10.01) == command
+
+    controller.confirm(10.01)
+    assert controller.update(1500, 500, command[0], 10.02) is None
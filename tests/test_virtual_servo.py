@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+#
+# sms_sts / PortHandler against VirtualServoBus (pty, POSIX only)
+#
+
+import time
+
+import pytest
+
+from scservo_sdk import *
+from scservo_sdk.virtual_servo import VirtualServoBus, VIRTUAL_SERVO_MODEL
+
+
+def open_bus(ids=(1,), shadow=False, rx_mode=RX_MODE_BLOCKING, **kwargs):
+    bus = VirtualServoBus(ids=ids, seed=1, **kwargs).start()
+    portHandler = PortHandler(bus.port_name, rx_mode)
+    assert portHandler.openPort()
+    return bus, portHandler, sms_sts(portHandler, shadow=shadow)
+
+
+@pytest.fixture
+def servos(request):
+    params = getattr(request, 'param', {})
+    bus, portHandler, packetHandler = open_bus(**params)
+    yield bus, packetHandler
+    portHandler.closePort()
+    bus.stop()
+
+
+@pytest.mark.parametrize('rx_mode', [RX_MODE_BLOCKING, RX_MODE_SPIN])
+def test_ping(rx_mode):
+    bus, portHandler, packetHandler = open_bus(rx_mode=rx_mode)
+    try:
+        model_number, result, error = packetHandler.ping(1)
+        assert result == COMM_SUCCESS
+        assert model_number == VIRTUAL_SERVO_MODEL
+        assert error == 0
+
+        _, result, _ = packetHandler.ping(2)
+        assert result == COMM_RX_TIMEOUT
+    finally:
+        portHandler.closePort()
+        bus.stop()
+
+
+def test_write_read(servos):
+    bus, packetHandler = servos
+    assert packetHandler.write1ByteTxRx(1, SMS_STS_TORQUE_ENABLE, 1)[0] == COMM_SUCCESS
+    result, error = packetHandler.WritePosEx(1, 1500, 0, 0)
+    assert result == COMM_SUCCESS
+    goal, result, _ = packetHandler.read2ByteTxRx(1, SMS_STS_GOAL_POSITION_L)
+    assert result == COMM_SUCCESS
+    assert goal == 1500
+    assert bus.getServo(1).getWord(SMS_STS_GOAL_POSITION_L) == 1500
+
+    # maximum speed and acceleration: well under a second for 548 steps
+    deadline = time.monotonic() + 1.0
+    while time.monotonic() < deadline:
+        position, result, _ = packetHandler.ReadPos(1)
+        if result == COMM_SUCCESS and position == 1500:
+            break
+        time.sleep(0.01)
+    assert (position, result) == (1500, COMM_SUCCESS)
+
+
+@pytest.mark.parametrize('servos', [{'ids': (1, 2)}], indirect=True)
+def test_batch(servos):
+    bus, packetHandler = servos
+    txpackets = [packetHandler.makePacket(scs_id, INST_READ, (SMS_STS_ID, 1)) for scs_id in (1, 3, 2)]
+    replies = packetHandler.txRxBatch(txpackets)
+    assert [result for _, result, _ in replies] == [COMM_SUCCESS, COMM_RX_TIMEOUT, COMM_SUCCESS]
+    assert replies[0][0][PKT_PARAMETER0] == 1
+    assert replies[2][0][PKT_PARAMETER0] == 2
+
+    # every status packet is a latency sample of its servo, the missing one a timeout
+    servos_stats = packetHandler.portHandler.getLatencyStats()['servos']
+    assert servos_stats['1']['samples'] == servos_stats['2']['samples'] == 1
+    assert servos_stats['3']['timeouts'] == 1
+
+
+@pytest.mark.parametrize('servos', [{'ids': (1, 2), 'corrupt_rate': 1.0}], indirect=True)
+def test_batch_corrupt_matched_by_id(servos):
+    bus, packetHandler = servos
+    txpackets = [packetHandler.makePacket(scs_id, INST_READ, (SMS_STS_ID, 1)) for scs_id in (1, 3, 2)]
+    # all three status packets outstanding at once: the pty has no bus collisions
+    replies = packetHandler.txRxBatch(txpackets, pipeline_depth=3)
+    assert [result for _, result, _ in replies] == [COMM_RX_CORRUPT, COMM_RX_TIMEOUT, COMM_RX_CORRUPT]
+    assert replies[2][0][PKT_ID] == 2
+
+
+@pytest.mark.parametrize('servos', [{'ids': (1, 3)}], indirect=True)
+def test_sync_read_missing_servo(servos):
+    bus, packetHandler = servos
+    snapshots, results = packetHandler.SyncReadSnapshots([1, 2, 3])
+    assert results == {1: COMM_SUCCESS, 2: COMM_RX_TIMEOUT, 3: COMM_SUCCESS}
+    assert sorted(snapshots) == [1, 3]
+    assert snapshots[1].position == 2048
+    assert snapshots[3].voltage == 120
+
+
+@pytest.mark.parametrize('servos', [{'shadow': True}], indirect=True)
+def test_shadow_lost_sync_write(servos):
+    # a sync write gets no status packet: the shadow must not treat it as delivered
+    bus, packetHandler = servos
+    assert packetHandler.PrefetchShadow(1)[0] == COMM_SUCCESS
+    assert packetHandler.SyncWritePositions({1: (1000, 0, 0)}) == COMM_SUCCESS
+    assert packetHandler.ReadPos(1)[1] == COMM_SUCCESS  # the bus handles packets in order
+    bus.getServo(1).setWord(SMS_STS_GOAL_POSITION_L, 2000)  # frame lost on the wire
+
+    packetHandler.WritePosEx(1, 1000, 0, 0)
+    assert bus.getServo(1).getWord(SMS_STS_GOAL_POSITION_L) == 1000
+
+    # an acknowledged write is remembered, the same write again is skipped
+    packetHandler.resetShadowStats()
+    packetHandler.WritePosEx(1, 1000, 0, 0)
+    assert packetHandler.getShadowStats()['writes_avoided'] == 1
+
+
+@pytest.mark.parametrize('servos', [{'shadow': True}], indirect=True)
+def test_no_ack_verify_goals(servos):
+    bus, packetHandler = servos
+    assert packetHandler.SetResponseLevel(1, SMS_STS_RESPONSE_READ)[0] == COMM_SUCCESS
+    replies = bus.stats['replies']
+    assert packetHandler.WritePosEx(1, 1500, 0, 0)[0] == COMM_SUCCESS
+    assert packetHandler.ReadPos(1)[1] == COMM_SUCCESS
+    assert bus.stats['replies'] == replies + 1  # only the read was answered
+    assert packetHandler.VerifyGoals() == {1: COMM_SUCCESS}
+
+    bus.getServo(1).setWord(SMS_STS_GOAL_POSITION_L, 1)
+    assert packetHandler.VerifyGoals() == {1: COMM_RX_CORRUPT}
+    packetHandler.WritePosEx(1, 1500, 0, 0)
+    assert packetHandler.ReadPos(1)[1] == COMM_SUCCESS
+    assert bus.getServo(1).getWord(SMS_STS_GOAL_POSITION_L) == 1500
+
+    assert packetHandler.SetResponseLevel(1, SMS_STS_RESPONSE_ALL)[0] == COMM_SUCCESS
+    assert not packetHandler.no_ack_ids
+
+
+@pytest.mark.parametrize('servos', [{'check_baud': True}], indirect=True)
+def test_change_baud_rate(servos):
+    bus, packetHandler = servos
+    portHandler = packetHandler.portHandler
+    assert packetHandler.ChangeBaudRate(1, 500000)[0] == COMM_SUCCESS
+    assert portHandler.getBaudRate() == 500000
+    assert bus.getServo(1).table[SMS_STS_BAUD_RATE] == SMS_STS_0_5M
+
+    # the servo no longer listens at the old rate
+    portHandler.setBaudRate(1000000)
+    assert packetHandler.ping(1)[1] == COMM_RX_TIMEOUT
+    assert packetHandler.FindBaudRate(1) == 500000
+
+
+@pytest.mark.parametrize('servos', [{'ids': (1, 5, 6)}], indirect=True)
+def test_scan_bus(servos):
+    bus, packetHandler = servos
+    stats = TransactionStats()
+    packetHandler.addObserver(stats)
+    servos_found = packetHandler.scanBus(range(0, 10))
+    assert sorted(servos_found) == [1, 5, 6]
+    assert all(model == VIRTUAL_SERVO_MODEL for model, _, _ in servos_found.values())
+
+    # the sweep is reported as one broadcast ping, the confirmations per servo
+    sweep = stats.getStats()['servos'][str(BROADCAST_ID)]
+    assert sweep == {'success': 1}
+    assert stats.tx_bytes >= 10 * 6
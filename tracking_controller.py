@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Регуляторы автослежения
+
+Регулятор получает отфильтрованные RSSI левой и правой антенн, последнюю
+заданную позицию сервопривода и время (time.monotonic()) и возвращает
+команду (позиция, скорость) или None, если двигаться не нужно. Когда
+команда ушла на привод, трекер вызывает confirm(now): отсчеты, которые
+зависят от движения, начинаются только с подтвержденной команды.
+Левая антенна сильнее - цель левее, позиция уменьшается.
+"""
+
+from typing import Optional, Tuple
+
+Command = Optional[Tuple[int, int]]
+
+
+class StepController:
+    """Прежний регулятор: шаг из таблицы по порогам разницы RSSI"""
+
+    name = 'step'
+
+    def __init__(self, speed: int = 500, threshold: float = 15, deadband: float = 500,
+                 step_small: int = 11, step_medium: int = 22, step_large: int = 44,
+                 cooldown: float = 0.1):
+        self.speed = speed
+        self.threshold = threshold  # Минимальная разница для движения
+        self.deadband = deadband  # Мертвая зона, где движение не требуется
+        self.step_small = step_small  # Малый шаг (1 градус) для точной подстройки
+        self.step_medium = step_medium  # Средний шаг (2 градуса)
+        self.step_large = step_large  # Большой шаг (4 градуса) для быстрого наведения
+        self.cooldown = cooldown  # Минимальный интервал между движениями
+        self.reset()
+
+    def reset(self):
+        self.last_move_time = 0.0
+        self.last_difference = 0.0
+
+    def update(self, left_rssi: float, right_rssi: float, position: int, now: float) -> Command:
+        # Проверяем время с последнего движения
+        if now - self.last_move_time < self.cooldown:
+            return None
+
+        # Вычисляем разницу
+        difference = left_rssi - right_rssi
+        abs_difference = abs(difference)
+        self.last_difference = difference
+
+        # Если разница в пределах мертвой зоны - не двигаемся
+        if abs_difference < self.deadband or abs_difference < self.threshold:
+            return None
+
+        # Определяем размер шага в зависимости от разницы RSSI
+        if abs_difference < self.threshold * 2:
+            step, speed = self.step_small, self.speed
+        elif abs_difference < self.threshold * 4:
+            step, speed = self.step_medium, self.speed + 200
+        else:
+            step, speed = self.step_large, self.speed + 400
+
+        return (position - step if difference > 0 else position + step), speed
+
+    def confirm(self, now: float):
+        # Пауза отсчитывается от отправленной команды: после ошибки шины повтор сразу
+        self.last_move_time = now
+
+    def get_state(self) -> dict:
+        return {'name': self.name, 'difference': round(self.last_difference, 1)}
+
+
+class PIDController:
+    """PID по нормированной разнице (L-R)/(L+R); выход - угловая скорость (единиц/с)
+
+    Позиция - интеграл скорости, поэтому для неподвижной цели хватает P, а
+    интегральная часть убирает отставание от равномерно движущейся цели.
+    - anti-windup: интеграл не растет, пока выход упирается в ограничение скорости,
+      и ограничен integral_limit;
+    - производная по ошибке через фильтр первого порядка (derivative_tau);
+    - ограничение скорости max_rate и ускорения max_accel;
+    - gain scheduling: при слабом сигнале (L+R ниже strong_total) усиление падает
+      пропорционально, но не ниже min_gain_scale; ниже min_total сигнала нет - стоим.
+    """
+
+    name = 'pid'
+
+    def __init__(self, kp: float = 1500.0, ki: float = 600.0, kd: float = 40.0,
+                 derivative_tau: float = 0.1, integral_limit: float = 400.0,
+                 max_rate: float = 1200.0, max_accel: float = 8000.0,
+                 min_total: float = 200.0, strong_total: float = 2000.0,
+                 min_gain_scale: float = 0.3, speed: int = 1500, min_move: int = 2):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.derivative_tau = derivative_tau
+        self.integral_limit = integral_limit
+        self.max_rate = max_rate
+        self.max_accel = max_accel
+        self.min_total = min_total
+        self.strong_total = strong_total
+        self.min_gain_scale = min_gain_scale
+        self.speed = speed  # Скорость сервопривода; темп задает сама цель
+        self.min_move = min_move  # move_servo игнорирует меньшие смещения
+        self.reset()
+
+    def reset(self):
+        self.target = None  # Непрерывная (дробная) целевая позиция
+        self.last_output = None
+        self.last_time = None
+        self.integral = 0.0
+        self.prev_error = 0.0
+        self.derivative = 0.0
+        self.rate = 0.0
+        self.error = 0.0
+        self.gain_scale = 0.0
+
+    def update(self, left_rssi: float, right_rssi: float, position: int, now: float) -> Command:
+        if self.target is None or (self.last_output is not None and position != self.last_output):
+            # Первый вызов или позицию изменил кто-то другой (ручной режим, лимиты) - начинаем с нее
+            self.reset()
+            self.target = float(position)
+            self.last_time = now
+            self.last_output = position
+            return None
+
+        dt = min(max(now - self.last_time, 1e-3), 0.5)
+        self.last_time = now
+
+        total = left_rssi + right_rssi
+        if total < self.min_total:
+            # Нет сигнала - стоим, состояние не накапливаем
+            self.rate = 0.0
+            self.integral = 0.0
+            self.error = 0.0
+            self.gain_scale = 0.0
+            return None
+
+        # Без мертвой зоны: при ненулевом интеграле она дает дрейф; шум сглаживает сам интеграл
+        error = (left_rssi - right_rssi) / total
+        self.error = error
+        self.gain_scale = max(self.min_gain_scale, min(1.0, total / self.strong_total))
+
+        self.derivative += dt / (self.derivative_tau + dt) * ((error - self.prev_error) / dt - self.derivative)
+        self.prev_error = error
+
+        integral = self.integral + self.ki * error * dt
+        integral = max(-self.integral_limit, min(self.integral_limit, integral))
+        rate = self.gain_scale * (self.kp * error + integral + self.kd * self.derivative)
+
+        limited = max(-self.max_rate, min(self.max_rate, rate))
+        limited = max(self.rate - self.max_accel * dt, min(self.rate + self.max_accel * dt, limited))
+        if limited == rate or abs(integral) < abs(self.integral):
+            # Интегрируем только без насыщения (или когда интеграл уменьшается)
+            self.integral = integral
+        self.rate = limited
+
+        # Ошибка > 0 - левая антенна сильнее, идем к меньшим позициям
+        self.target -= limited * dt
+        if abs(self.target - position) < self.min_move:
+            return None
+
+        self.last_output = int(round(self.target))
+        return self.last_output, self.speed
+
+    def confirm(self, now: float):
+        # Неотправленная команда видна по позиции != last_output: регулятор начнет с нее
+        pass
+
+    def get_state(self) -> dict:
+        return {
+            'name': self.name,
+            'error': round(self.error, 4),
+            'rate': round(self.rate, 1),
+            'integral': round(self.integral, 1),
+            'gain_scale': round(self.gain_scale, 2),
+        }
+
+
+class PredictiveController:
+    """Наведение в прогноз пеленга BearingEstimator на lead секунд вперед
+
+    Фильтр обновляет владелец (трекер или стенд) фактической позицией
+    сервопривода; регулятор только читает оценку и не двигается, пока ее
+    СКО больше max_sigma.
+    """
+
+    name = 'kalman'
+
+    def __init__(self, estimator, lead: float = 0.15, max_sigma: float = 60.0,
+                 speed: int = 1500, min_move: int = 2):
+        self.estimator = estimator
+        self.lead = lead  # Запаздывание сервопривода: команда + разгон
+        self.max_sigma = max_sigma
+        self.speed = speed
+        self.min_move = min_move
+        self.reset()
+
+    def reset(self):
+        self.last_target = None
+
+    def update(self, left_rssi: float, right_rssi: float, position: int, now: float) -> Command:
+        if not self.estimator.initialized or self.estimator.sigma() > self.max_sigma:
+            return None
+        bearing, rate = self.estimator.predict(now + self.lead)
+        self.last_target = int(round(bearing))
+        if abs(self.last_target - position) < self.min_move:
+            return None
+        return self.last_target, self.speed
+
+    def confirm(self, now: float):
+        pass
+
+    def get_state(self) -> dict:
+        return {'name': self.name, 'target': self.last_target}
+
+
+class MonopulseController:
+    """Прыжок сразу в пеленг по таблице моноимпульса (monopulse.MonopulseTable)
+
+    Смещение цели от оси берется из таблицы по (L-R)/(L+R); большое смещение
+    (больше jump_units и трех СКО шума rssi_noise, пересчитанного через
+    таблицу) отрабатывается одной командой, малое - с усилением fine_gain,
+    чтобы шум у оси не дергал привод. Пока привод едет (время по
+    скорости и ускорению плюс settle), измерения не используются: на ходу
+    разница RSSI относится к промежуточной позиции.
+    """
+
+    name = 'monopulse'
+
+    def __init__(self, table, min_total: float = 200.0, rssi_noise: float = 30.0,
+                 jump_units: int = 33, fine_gain: float = 0.3, speed: int = 1500,
+                 accel: float = 3000.0, settle: float = 0.05, min_move: int = 2):
+        self.table = table
+        self.min_total = min_total
+        self.rssi_noise = rssi_noise  # СКО шума одного канала RSSI
+        self.jump_units = jump_units
+        self.fine_gain = fine_gain
+        self.speed = speed
+        self.accel = accel  # Ускорение привода, единиц/с^2 (auto_acc = 30 -> 3000)
+        self.settle = settle
+        self.min_move = min_move
+        self.reset()
+
+    def reset(self):
+        self.hold_until = 0.0
+        self.travel = 0.0
+        self.last_offset = 0.0
+        self.jumps = 0
+
+    def travel_time(self, distance: float) -> float:
+        """Время переезда по трапециевидному профилю скорости"""
+        distance = abs(distance)
+        if distance * self.accel >= self.speed * self.speed:
+            return distance / self.speed + self.speed / self.accel
+        return 2.0 * (distance / self.accel) ** 0.5
+
+    def update(self, left_rssi: float, right_rssi: float, position: int, now: float) -> Command:
+        if now < self.hold_until:
+            return None
+        total = left_rssi + right_rssi
+        if total < self.min_total:
+            return None
+
+        difference = (left_rssi - right_rssi) / total
+        offset = self.table.offset(difference)
+        self.last_offset = offset
+        noise = abs(self.table.slope(difference)) * self.rssi_noise * 2 ** 0.5 / total
+        if abs(offset) > max(self.jump_units, 3.0 * noise):
+            self.jumps += 1
+        else:
+            offset *= self.fine_gain
+        if abs(offset) < self.min_move:
+            return None
+
+        self.travel = self.travel_time(offset) + self.settle
+        return int(round(position + offset)), self.speed
+
+    def confirm(self, now: float):
+        # Измерения на ходу не используются - но только если привод действительно поехал
+        self.hold_until = now + self.travel
+
+    def get_state(self) -> dict:
+        return {
+            'name': self.name,
+            'offset': round(self.last_offset, 1),
+            'jumps': self.jumps,
+            'calibrated': self.table.calibrated,
+        }
+
+
+CONTROLLERS = {
+    StepController.name: StepController,
+    PIDController.name: PIDController,
+    PredictiveController.name: PredictiveController,
+    MonopulseController.name: MonopulseController,
+}